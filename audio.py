@@ -2,6 +2,9 @@ import time
 from pathlib import Path
 import threading
 
+# 流式播放时每次交给混音器的音频长度 (秒)：太短会在片段之间出现断续，太长会推迟首次发声
+STREAM_BLOCK_SECONDS = 0.2
+
 class AudioPlayer:
     """负责音频播放，使用 Pygame Mixer。"""
     def __init__(self):
@@ -55,8 +58,11 @@ class AudioPlayer:
             print("❌ 音频文件无效或为空，跳过播放。")
             return
             
-        if stop_event is None:
+        owns_event = stop_event is None
+        if owns_event:
+            # 之前的 stop() 可能在播放使用外部事件时设置了内部事件，开始新的播放前清除
             stop_event = self._stop_event
+            stop_event.clear()
         
         try:
             # 强制检查并重新初始化，确保播放总是有效
@@ -69,11 +75,11 @@ class AudioPlayer:
             self._pygame.mixer.music.play()
             
             while self._pygame.mixer.music.get_busy():
-                if stop_event.is_set():
+                # Event.wait 会在停止信号到来时立即返回，保证毫秒级的打断延迟
+                if stop_event.wait(0.05):
                     self._pygame.mixer.music.stop()
                     print("⏹️ 播放被中断。")
                     break
-                time.sleep(0.1)
             
             if not stop_event.is_set():
                 print("✅ 音频播放结束。")
@@ -81,18 +87,122 @@ class AudioPlayer:
         except self._pygame.error as e:
             print(f"❌ 音频播放失败: {e}")
         finally:
-            # 清除停止事件，为下一次播放做准备
+            # 清除内部停止事件，为下一次播放做准备；外部传入的事件由调用方管理
+            if owns_event:
+                stop_event.clear()
+
+    def _to_sound(self, data: bytes, sample_rate: int):
+        """把 16 位单声道 PCM 转换为混音器格式 (采样率、声道数) 的 Sound。"""
+        import numpy as np
+        frequency, _size, channels = self._pygame.mixer.get_init()
+        samples = np.frombuffer(data, dtype=np.int16)
+        if sample_rate != frequency and len(samples):
+            count = int(len(samples) * frequency / sample_rate)
+            positions = np.arange(count) * (sample_rate / frequency)
+            samples = np.interp(positions, np.arange(len(samples)), samples).astype(np.int16)
+        if channels > 1:
+            samples = np.repeat(samples[:, None], channels, axis=1)
+        return self._pygame.mixer.Sound(buffer=np.ascontiguousarray(samples).tobytes())
+
+    def play_stream(self, chunks, sample_rate: int, stop_event: threading.Event = None):
+        """
+        边接收边播放 16 位单声道的原始 PCM，收到第一段音频即开始发声。
+
+        片段攒够 STREAM_BLOCK_SECONDS 后交给混音器通道，通道上最多一段在播放、一段在排队，
+        内存占用与音频总长度无关。
+
+        :param chunks: bytes 片段的迭代器，迭代结束表示音频结束。
+        :param sample_rate: PCM 的采样率。
+        :param stop_event: 用于从外部停止播放的线程事件。
+        """
+        owns_event = stop_event is None
+        if owns_event:
+            stop_event = self._stop_event
             stop_event.clear()
+        block_bytes = max(2, int(sample_rate * STREAM_BLOCK_SECONDS) * 2)
+        pending = bytearray()
+        channel = None
+
+        def enqueue(data: bytes) -> bool:
+            # 通道上已有一段在排队时等待，返回 False 表示被中断
+            while channel.get_queue() is not None:
+                if stop_event.wait(0.01):
+                    return False
+            channel.queue(self._to_sound(data, sample_rate))
+            return True
+
+        try:
+            if not self._pygame.mixer.get_init():
+                print("⚠️ 音频混合器未初始化，正在尝试重新初始化...")
+                self._pygame.mixer.init(frequency=44100, size=-16, channels=2, buffer=2048)
+            channel = self._pygame.mixer.find_channel(True)
+            print(f"🎧 正在流式播放 ({sample_rate}Hz)")
+            for chunk in chunks:
+                pending += chunk
+                while len(pending) >= block_bytes and not stop_event.is_set():
+                    if not enqueue(bytes(pending[:block_bytes])):
+                        break
+                    del pending[:block_bytes]
+                if stop_event.is_set():
+                    break
+            # 剩余不足一段的音频 (丢弃可能不完整的最后一个字节)
+            tail = len(pending) - len(pending) % 2
+            if tail and not stop_event.is_set():
+                enqueue(bytes(pending[:tail]))
+            while channel.get_busy():
+                if stop_event.wait(0.05):
+                    break
+            if stop_event.is_set():
+                channel.stop()
+                print("⏹️ 播放被中断。")
+            else:
+                print("✅ 音频播放结束。")
+        except self._pygame.error as e:
+            print(f"❌ 音频播放失败: {e}")
+        finally:
+            if owns_event:
+                stop_event.clear()
 
     def stop(self):
-        """停止当前正在播放的音频。"""
+        """停止当前正在播放的音频，直接停止混音器而不等待播放循环轮询。"""
         self._stop_event.set()
+        try:
+            if self._pygame.mixer.get_init():
+                self._pygame.mixer.music.stop()
+                self._pygame.mixer.stop()
+        except self._pygame.error as e:
+            print(f"⚠️ 停止播放失败: {e}")
 
     def quit(self):
         """退出 Pygame，释放资源。"""
         print("正在关闭音频播放器...")
         self._pygame.quit()
 
+class NullAudioPlayer:
+    """
+    不输出任何声音的播放器，接口与 AudioPlayer 相同。
+    用于基准测试和无音频设备的环境。
+    """
+    def __init__(self):
+        self._stop_event = threading.Event()
+
+    def play(self, audio_file: str, stop_event: threading.Event = None):
+        """只检查文件有效性，立即返回。"""
+        if not Path(audio_file).exists() or Path(audio_file).stat().st_size == 0:
+            print("❌ 音频文件无效或为空，跳过播放。")
+
+    def play_stream(self, chunks, sample_rate: int, stop_event: threading.Event = None):
+        """消耗所有 PCM 片段后立即返回。"""
+        for _chunk in chunks:
+            if stop_event is not None and stop_event.is_set():
+                break
+
+    def stop(self):
+        self._stop_event.set()
+
+    def quit(self):
+        pass
+
 if __name__ == '__main__':
     # 用于直接测试音频播放功能
     # 前提：需要先有一个音频文件，例如通过 tts.py 生成
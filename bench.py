@@ -0,0 +1,769 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+无界面的端到端延迟基准测试：截图 -> OCR -> TTS -> 播放。
+
+通过注入替身组件驱动 OcrAndTtsProcessor：
+- 图片源：依次返回合成语料中的图片，代替交互式截图。
+- 静音播放器：NullAudioPlayer，不占用音频设备。
+- OCR / TTS：默认使用几乎零开销的替身 (只测量流水线本身)，
+  也可以用 --real-ocr / --real-tts 换成真实的 EasyOCR 和 Piper。
+
+结果以 JSON 输出 (各阶段 p50/p95、首句音频延迟、峰值 RSS)，并可与之前提交
+保存的结果比较，发现性能回退时以非零状态码退出。
+
+用法:
+    python3 bench.py                                 # 替身引擎
+    python3 bench.py --real-ocr --real-tts -n 3      # 真实引擎，每张图 3 轮
+    python3 bench.py -o new.json --compare old.json  # 与基线比较
+    python3 bench.py --suite onnx                    # ONNX Runtime 与 torch 的一致性和延迟
+    python3 bench.py --suite quantization --runtime onnx  # int8 量化的加速比与 CER 变化
+    python3 bench.py --suite piper                   # Piper 冷启动与常驻语音模型的合成延迟
+    python3 bench.py --suite edge-stream --recording edge.json  # 替身服务上 Edge TTS 流式播放的首段音频延迟
+    python3 bench.py --suite tts-failover            # 在线 TTS 变慢/断开时切换到离线 TTS 的耗时
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+import wave
+
+from corpus import SIZES, build_corpus
+from metrics import metrics, percentile
+from ocr import EasyOcrEngine, OcrEngine
+from tts import TtsEngine
+
+# 参与比较的阶段
+STAGES = ["capture", "ocr", "tts_sentence", "playback", "time_to_first_audio", "pipeline_total"]
+# 默认的回退判定阈值：比基线慢 20% 且绝对差值超过 5ms
+DEFAULT_THRESHOLD = 0.2
+MIN_ABS_REGRESSION_S = 0.005
+MIN_ABS_REGRESSION_MB = 10.0
+# onnx 套件：ONNX Runtime 与 torch 输出之间允许的字符错误率
+ONNX_PARITY_MAX_CER = 0.02
+# tts-failover 套件中离线 TTS 替身每句话的合成耗时 (秒)
+FAILOVER_FALLBACK_S = 0.3
+
+
+# --- 替身组件 ---
+class ImageSource:
+    """代替 Screenshotter 的图片源，返回预先设置的图片。"""
+
+    def __init__(self):
+        self.next_image = None
+
+    def take_screenshot(self, save_to_file: bool = False):
+        return self.next_image
+
+
+class CorpusOcrEngine(OcrEngine):
+    """返回语料真值的 OCR 替身，用于单独测量流水线的开销。"""
+
+    def __init__(self, samples):
+        self._truth = {id(sample.image): (sample.text, sample.lang) for sample in samples}
+
+    def recognize(self, image) -> tuple[str, str]:
+        return self._truth.get(id(image), ("", "en"))
+
+
+class SilentTtsEngine(TtsEngine):
+    """写出静音 WAV 的 TTS 替身，时长与文本长度成正比。"""
+    audio_suffix = '.wav'
+    SAMPLE_RATE = 16000
+    SECONDS_PER_CHAR = 0.05
+
+    async def synthesize(self, text: str, output_path: str, lang: str = 'auto'):
+        frames = int(len(text) * self.SECONDS_PER_CHAR * self.SAMPLE_RATE)
+        with wave.open(output_path, "wb") as wav:
+            wav.setnchannels(1)
+            wav.setsampwidth(2)
+            wav.setframerate(self.SAMPLE_RATE)
+            wav.writeframes(b"\0\0" * max(frames, 1))
+
+
+class ProjectionReader:
+    """
+    代替 easyocr.Reader 的文字框替身：按墨迹的水平/垂直投影切出单词框，文字固定为 'w'。
+    不识别文字，只用来检验分块识别的接缝合并是否与整图的结果一致。
+    """
+
+    def readtext(self, image, detail=1, paragraph=False, **kwargs):
+        import numpy as np
+        from preprocess import background_level, estimate_text_height, ink_mask, to_gray
+        gray = to_gray(image)
+        mask = ink_mask(gray, background_level(gray))
+        min_gap = max(2, int(estimate_text_height(mask) * 0.35))
+        rows = np.diff(np.concatenate(([0], mask.any(axis=1).astype(np.int8), [0])))
+        results = []
+        for y0, y1 in zip(np.flatnonzero(rows == 1), np.flatnonzero(rows == -1)):
+            cols = np.flatnonzero(mask[y0:y1].any(axis=0))
+            if cols.size == 0:
+                continue
+            # 相邻墨迹列的间距超过 min_gap 时断开为不同的单词
+            breaks = np.flatnonzero(np.diff(cols) > min_gap)
+            for start, end in zip(np.concatenate(([0], breaks + 1)), np.concatenate((breaks, [cols.size - 1]))):
+                x0, x1 = int(cols[start]), int(cols[end]) + 1
+                results.append(([[x0, int(y0)], [x1, int(y0)], [x1, int(y1)], [x0, int(y1)]], "w", 1.0))
+        if paragraph:
+            from ocr_tiling import TextBox, reading_order
+            return reading_order([TextBox.from_easyocr(result) for result in results])
+        return results
+
+
+class ProjectionOcrEngine(EasyOcrEngine):
+    """使用 ProjectionReader 的 EasyOcrEngine，不加载模型。"""
+
+    def __init__(self, tile_threshold_px: int = 0, tile_size: int = None):
+        self.preprocess = False
+        self.tile_threshold_px = tile_threshold_px
+        self.tile_size = tile_size
+        self.tile_workers = min(4, os.cpu_count() or 1)
+        self.batch_size, self.workers = 1, 0
+        self.reader = ProjectionReader()
+        self.router = None
+        self._pool = None
+        self.policy = None
+
+
+# --- 统计与报告 ---
+def summarize(values) -> dict:
+    """耗时样本 (秒) 的摘要。"""
+    return {
+        "count": len(values),
+        "mean": sum(values) / len(values) if values else 0.0,
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+    }
+
+
+def peak_rss_mb() -> float:
+    """当前进程的峰值常驻内存 (MB)。Linux 上 ru_maxrss 以 KB 为单位。"""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def current_rss_mb() -> float:
+    """当前进程的常驻内存 (MB)。"""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024.0 * 1024.0)
+    except (OSError, ValueError):
+        return 0.0
+
+
+def run_metadata(args) -> dict:
+    """记录足以区分不同提交和机器的元数据。"""
+    def git(*cmd):
+        try:
+            return subprocess.run(["git", *cmd], capture_output=True, text=True, timeout=5,
+                                  cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+        except (OSError, subprocess.SubprocessError):
+            return ""
+    return {
+        "commit": git("rev-parse", "--short", "HEAD"),
+        "dirty": bool(git("status", "--porcelain", "--untracked-files=no")),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "options": {k: v for k, v in vars(args).items() if k not in ("output", "compare", "func")},
+    }
+
+
+def _new_samples(name: str, before: dict) -> list:
+    return metrics.samples(name)[before.get(name, 0):]
+
+
+# --- 基准套件 ---
+def run_e2e(args) -> dict:
+    """端到端套件：通过 OcrAndTtsProcessor 处理语料中的每张图片。"""
+    from audio import NullAudioPlayer
+    from core import OcrAndTtsProcessor
+    from scheduler import RequestContext
+
+    samples = build_corpus(sizes=args.sizes, langs=args.langs)
+    if not samples:
+        raise SystemExit("语料为空，无法运行基准测试。")
+
+    if args.real_ocr:
+        from ocr import EasyOcrEngine
+        ocr_engine = EasyOcrEngine()
+    else:
+        ocr_engine = CorpusOcrEngine(samples)
+    if args.real_tts:
+        from tts import PiperTtsEngine
+        tts_engine = PiperTtsEngine()
+    else:
+        tts_engine = SilentTtsEngine()
+
+    source = ImageSource()
+    processor = OcrAndTtsProcessor(screenshotter=source, ocr_engine=ocr_engine,
+                                   tts_engine=tts_engine, audio_player=NullAudioPlayer())
+    if not args.ocr_cache:
+        # 每轮处理的是同样的图片，启用缓存时第二轮起全部命中，测不到真实的 OCR
+        processor.ocr_cache = None
+    by_size = {}
+    try:
+        # 预热一轮，不计入结果
+        for sample in samples[:args.warmup]:
+            source.next_image = sample.image
+            processor.run_full_process(RequestContext(0))
+        metrics.reset(max_samples=1_000_000)
+
+        request_id = 0
+        for _ in range(args.iterations):
+            for sample in samples:
+                request_id += 1
+                before = {name: len(metrics.samples(name)) for name in STAGES}
+                source.next_image = sample.image
+                processor.run_full_process(RequestContext(request_id))
+                size_stats = by_size.setdefault(sample.size, {name: [] for name in STAGES})
+                for name in STAGES:
+                    size_stats[name].extend(_new_samples(name, before))
+    finally:
+        processor.cleanup()
+
+    return {
+        "stages": {name: summarize(metrics.samples(name)) for name in STAGES},
+        "by_size": {size: {name: summarize(values) for name, values in stats.items() if values}
+                    for size, stats in by_size.items()},
+        "samples": [{"name": s.name, "shape": list(s.image.shape)} for s in samples],
+    }
+
+
+def run_ocr_cache(args) -> dict:
+    """
+    OCR 缓存套件：查找开销，以及框选偏移 (平移/裁掉几个像素) 与改动文字时是否命中。
+    期望偏移全部命中、改动文字全部未命中。
+    """
+    from corpus import TEXTS, find_font, render_text_image
+    from ocr_cache import OcrResultCache
+
+    pad = 8
+    langs = args.langs or ["en", "zh"]
+    sizes = args.sizes or list(SIZES)
+    variants = {
+        "shift_y1": lambda img, w, h: img[pad + 1:pad + 1 + h, pad:pad + w],
+        "shift_x1_narrower": lambda img, w, h: img[pad:pad + h, pad + 1:pad + w],
+        "shift_x-3_y+2": lambda img, w, h: img[pad + 2:pad + 2 + h, pad - 3:pad - 3 + w],
+    }
+    by_size, lookup_s = {}, []
+    for lang in langs:
+        font = find_font(lang)
+        if lang == "zh" and font is None:
+            continue
+        edited_text = TEXTS[lang].replace("fox", "cat") if lang == "en" else TEXTS[lang].replace("继续", "确定")
+        for size in sizes:
+            width, height, font_size = SIZES[size]
+            repeat = max(1, (width * height) // 400_000)
+            joiner = " " if lang == "en" else ""
+            base, _ = render_text_image(joiner.join([TEXTS[lang]] * repeat), width + 2 * pad, height + 2 * pad, font_size, font)
+            edited, _ = render_text_image(joiner.join([edited_text] * repeat), width + 2 * pad, height + 2 * pad, font_size, font)
+            original = base[pad:pad + height, pad:pad + width]
+            for _ in range(args.iterations):
+                cache = OcrResultCache()
+                start = time.perf_counter()
+                query = cache.query(original)
+                cache.lookup(query)
+                lookup_s.append(time.perf_counter() - start)
+                cache.store(query, ("text", lang))
+                results = by_size.setdefault(f"{lang}-{size}", {"offset_hits": 0, "offset_total": 0,
+                                                               "edited_false_hits": 0, "edited_total": 0})
+                for make in variants.values():
+                    results["offset_total"] += 1
+                    results["offset_hits"] += cache.lookup(cache.query(make(base, width, height))) is not None
+                results["edited_total"] += 1
+                results["edited_false_hits"] += cache.lookup(cache.query(edited[pad:pad + height, pad:pad + width])) is not None
+
+    return {
+        "stages": {"ocr_cache_lookup": summarize(lookup_s)},
+        "by_size": by_size,
+    }
+
+
+def run_preprocess(args) -> dict:
+    """
+    预处理套件：每张图片的预处理耗时与节省的像素数。
+    使用 --real-ocr 时同时比较 EasyOCR 在原图和预处理后图片上的延迟与字符错误率。
+    """
+    from corpus import char_error_rate
+    from preprocess import preprocess
+
+    samples = build_corpus(sizes=args.sizes, langs=args.langs)
+    if not samples:
+        raise SystemExit("语料为空，无法运行基准测试。")
+    engines = {}
+    if args.real_ocr:
+        from ocr import EasyOcrEngine
+        engines = {"ocr_raw": EasyOcrEngine(preprocess=False), "ocr_preprocessed": EasyOcrEngine(preprocess=True)}
+        for engine in engines.values():
+            engine.recognize(samples[0].image)  # 预热
+
+    stages = {name: [] for name in ["preprocess", *engines]}
+    by_size = {}
+    for sample in samples:
+        result = None
+        for _ in range(args.iterations):
+            start = time.perf_counter()
+            result = preprocess(sample.image)
+            stages["preprocess"].append(time.perf_counter() - start)
+        entry = by_size.setdefault(sample.name, {
+            "pixels_in": result.pixels_in,
+            "pixels_out": result.pixels_out,
+            "pixels_saved": result.pixels_saved,
+            "text_height": result.text_height,
+            "scale": round(result.scale, 3),
+        })
+        for name, engine in engines.items():
+            times, text = [], ""
+            for _ in range(args.iterations):
+                start = time.perf_counter()
+                text, _lang = engine.recognize(sample.image)
+                times.append(time.perf_counter() - start)
+            stages[name].extend(times)
+            entry[name] = summarize(times)
+            entry[f"{name}_cer"] = round(char_error_rate(sample.text, text), 4)
+    for engine in engines.values():
+        engine.close()
+
+    return {
+        "stages": {name: summarize(values) for name, values in stages.items()},
+        "by_size": by_size,
+    }
+
+
+def _iou(a, b) -> float:
+    """两个 TextBox 的交并比。"""
+    inter = (max(0.0, min(a.x1, b.x1) - max(a.x0, b.x0))
+             * max(0.0, min(a.y1, b.y1) - max(a.y0, b.y0)))
+    return inter / (a.width * a.height + b.width * b.height - inter) if inter else 0.0
+
+
+def run_tiling(args) -> dict:
+    """
+    分块识别套件：比较整图识别与分块并行识别的延迟。
+    默认使用 ProjectionOcrEngine 检验接缝合并 (分块得到的文字框与整图一一对应)；
+    使用 --real-ocr 时比较 EasyOCR 的延迟与字符错误率。
+    """
+    from corpus import char_error_rate
+    from ocr_tiling import TextBox, merge_tiles, plan_tiles
+
+    samples = build_corpus(sizes=args.sizes or ["page", "hidpi"], langs=args.langs)
+    if not samples:
+        raise SystemExit("语料为空，无法运行基准测试。")
+    if args.real_ocr:
+        engine = EasyOcrEngine(preprocess=False, tile_size=args.tile_size)
+        engine.recognize(samples[0].image)  # 预热
+    else:
+        engine = ProjectionOcrEngine(tile_size=args.tile_size)
+
+    stages = {"ocr_single": [], "ocr_tiled": []}
+    by_size = {}
+    for sample in samples:
+        entry = by_size.setdefault(sample.name, {
+            "tiles": len(plan_tiles(*sample.image.shape[:2], args.tile_size)),
+        })
+        for name, threshold in (("ocr_single", 0), ("ocr_tiled", 1)):
+            engine.tile_threshold_px = threshold
+            times, paragraphs = [], []
+            for _ in range(args.iterations):
+                start = time.perf_counter()
+                paragraphs = engine.read_paragraphs(sample.image)
+                times.append(time.perf_counter() - start)
+            stages[name].extend(times)
+            entry[name] = summarize(times)
+            entry[f"{name}_paragraphs"] = len(paragraphs)
+            if args.real_ocr:
+                entry[f"{name}_cer"] = round(char_error_rate(sample.text, "\n".join(paragraphs)), 4)
+        if not args.real_ocr:
+            # 分块合并后的文字框应与整图的文字框一一对应
+            full = [TextBox.from_easyocr(r) for r in engine.reader.readtext(sample.image)]
+            tiles = plan_tiles(*sample.image.shape[:2], args.tile_size)
+            tiled = merge_tiles([TextBox.from_easyocr(r, x0, y0, index)
+                                 for index, (x0, y0, x1, y1) in enumerate(tiles)
+                                 for r in engine.reader.readtext(sample.image[y0:y1, x0:x1])])
+            matched = sum(any(_iou(box, other) >= 0.7 for other in full) for box in tiled)
+            entry.update(boxes_single=len(full), boxes_tiled=len(tiled), boxes_matched=matched)
+    engine.close()
+
+    return {
+        "stages": {name: summarize(values) for name, values in stages.items()},
+        "by_size": by_size,
+    }
+
+
+def run_onnx(args) -> dict:
+    """
+    ONNX Runtime 套件：在固定语料上比较 torch 与 ONNX Runtime 两种运行方式的
+    冷加载时间、识别延迟、内存增量和字符错误率，并检查两者输出的一致性。
+    先测 ONNX Runtime，记录它是否导入了 torch；需要 easyocr、torch 和已导出的 ONNX 模型。
+    """
+    from corpus import char_error_rate
+
+    samples = build_corpus(sizes=args.sizes or ["label", "dialog", "page"], langs=args.langs)
+    if not samples:
+        raise SystemExit("语料为空，无法运行基准测试。")
+    stages, runtimes, texts = {}, {}, {}
+    for runtime in ("onnx", "torch"):
+        rss_before = current_rss_mb()
+        start = time.perf_counter()
+        engine = EasyOcrEngine(preprocess=False, runtime=runtime, quantize=False)
+        load_seconds = time.perf_counter() - start
+        engine.recognize(samples[0].image)  # 预热
+        times, errors, texts[runtime] = [], [], {}
+        for sample in samples:
+            for _ in range(args.iterations):
+                start = time.perf_counter()
+                text, _lang = engine.recognize(sample.image)
+                times.append(time.perf_counter() - start)
+            texts[runtime][sample.name] = text
+            errors.append(char_error_rate(sample.text, text))
+        stages[f"ocr_{runtime}"] = summarize(times)
+        runtimes[runtime] = {
+            "load_s": round(load_seconds, 3),
+            "rss_delta_mb": round(current_rss_mb() - rss_before, 1),
+            "torch_imported": "torch" in sys.modules,
+            "cer": round(sum(errors) / len(errors), 4),
+        }
+        engine.close()
+
+    # 一致性：以 torch 的输出为参考的字符错误率
+    parity = {name: round(char_error_rate(texts["torch"][name], texts["onnx"][name]), 4)
+              for name in texts["torch"]}
+    parity_ok = all(value <= ONNX_PARITY_MAX_CER for value in parity.values())
+    if not parity_ok:
+        print(f"⚠️ ONNX Runtime 的输出与 torch 不一致 (CER 上限 {ONNX_PARITY_MAX_CER}): {parity}", file=sys.stderr)
+    return {"stages": stages, "runtimes": runtimes, "parity_cer": parity, "parity_ok": parity_ok}
+
+
+def run_quantization(args) -> dict:
+    """
+    int8 量化套件：在合成的中英文语料上比较浮点与 int8 动态量化识别模型的
+    识别阶段延迟和字符错误率，报告加速比和 CER 的变化。运行方式由 --runtime 选择。
+    """
+    from corpus import char_error_rate
+
+    samples = build_corpus(sizes=args.sizes or ["label", "dialog", "page"], langs=args.langs)
+    if not samples:
+        raise SystemExit("语料为空，无法运行基准测试。")
+    stages, variants = {}, {}
+    by_sample = {sample.name: {} for sample in samples}
+    for name, quantize in (("float", False), ("int8", True)):
+        start = time.perf_counter()
+        engine = EasyOcrEngine(preprocess=False, runtime=args.runtime, quantize=quantize)
+        load_seconds = time.perf_counter() - start
+        engine.recognize(samples[0].image)  # 预热
+        recognize_times, totals, errors = [], [], []
+        for sample in samples:
+            for _ in range(args.iterations):
+                result = engine.recognize_batch([sample.image])[0]
+                recognize_times.append(result.timings.get("recognize", result.seconds))
+                totals.append(result.seconds)
+            cer = char_error_rate(sample.text, result.text)
+            by_sample[sample.name][f"cer_{name}"] = round(cer, 4)
+            errors.append(cer)
+        stages[f"recognize_{name}"] = summarize(recognize_times)
+        stages[f"ocr_{name}"] = summarize(totals)
+        variants[name] = {"load_s": round(load_seconds, 3), "cer": round(sum(errors) / len(errors), 4)}
+        engine.close()
+
+    for entry in by_sample.values():
+        entry["cer_delta"] = round(entry["cer_int8"] - entry["cer_float"], 4)
+    int8_p50 = stages["recognize_int8"]["p50"]
+    return {
+        "stages": stages,
+        "variants": variants,
+        "by_sample": by_sample,
+        "speedup": round(stages["recognize_float"]["p50"] / int8_p50, 3) if int8_p50 else 0.0,
+        "cer_delta": round(variants["int8"]["cer"] - variants["float"]["cer"], 4),
+    }
+
+
+def run_piper(args) -> dict:
+    """
+    Piper 套件：比较每句话启动一个 piper 进程 (旧方式) 与常驻语音模型的合成延迟。
+    常驻方式的第一句 (包含加载模型) 记为冷启动，之后的句子记为预热后。
+    另外对一段长文本比较流式合成的首个 PCM 片段延迟与整段写成 WAV 的耗时，并记录流式合成前后的 RSS。
+    需要 piper 和 models/ 下的语音模型。
+    """
+    import asyncio
+    import tempfile
+    from corpus import TEXTS
+    from pipeline import split_sentences
+    from tts import PiperTtsEngine
+
+    async def measure(engine, lang: str, sentences: list[str], directory: str) -> list[float]:
+        times = []
+        for index, sentence in enumerate(sentences):
+            start = time.perf_counter()
+            await engine.synthesize(sentence, os.path.join(directory, f"{lang}-{index}.wav"), lang=lang)
+            times.append(time.perf_counter() - start)
+        return times
+
+    async def run() -> tuple[dict, list]:
+        spawn, cold, warm, whole, first_chunk, streams = [], [], [], [], [], []
+        with tempfile.TemporaryDirectory() as directory:
+            for lang in args.langs or ["zh", "en"]:
+                sentences = (split_sentences(TEXTS[lang]) * args.iterations)[:max(2, args.iterations)]
+                engine = PiperTtsEngine(resident=False)
+                await engine.start()
+                spawn += await measure(engine, lang, sentences, directory)
+                # preload 为空：第一句话包含加载模型的时间
+                engine = PiperTtsEngine(resident=True, preload=[])
+                await engine.start()
+                times = await measure(engine, lang, sentences, directory)
+                cold.append(times[0])
+                warm += times[1:]
+
+                # 长文本：流式合成的首个片段 vs 整段合成到文件
+                text = (" " if lang == "en" else "").join([TEXTS[lang]] * 10)
+                start = time.perf_counter()
+                await engine.synthesize(text, os.path.join(directory, f"{lang}-long.wav"), lang=lang)
+                whole.append(time.perf_counter() - start)
+                rss_before, total = current_rss_mb(), 0
+                start = time.perf_counter()
+                async for chunk in engine.stream_pcm(text, lang=lang):
+                    if total == 0:
+                        first_chunk.append(time.perf_counter() - start)
+                    total += len(chunk)
+                streams.append({"lang": lang, "pcm_bytes": total,
+                                "rss_delta_mb": round(current_rss_mb() - rss_before, 1)})
+                await engine.aclose()
+        return {"piper_spawn": summarize(spawn), "piper_resident_cold": summarize(cold),
+                "piper_resident_warm": summarize(warm), "piper_long_file": summarize(whole),
+                "piper_long_first_chunk": summarize(first_chunk)}, streams
+
+    try:
+        stages, streams = asyncio.run(run())
+    except (FileNotFoundError, ImportError) as e:
+        raise SystemExit(f"❌ 无法运行 Piper 套件: {e}")
+    warm_p50 = stages["piper_resident_warm"]["p50"]
+    return {"stages": stages, "streams": streams,
+            "speedup": round(stages["piper_spawn"]["p50"] / warm_p50, 3) if warm_p50 else 0.0}
+
+
+def run_edge_stream(args) -> dict:
+    """
+    Edge TTS 流式套件：由 edge_standin 的替身服务按录制的节奏重放 Edge TTS 的音频片段 (不需要网络)，
+    比较整段下载完才能播放 (synthesize) 与边下载边解码 (stream_pcm) 的首段音频延迟，
+    同时记录首字节延迟。需要 --recording (edge_standin.py record 生成) 和 ffmpeg。
+    """
+    import asyncio
+    import tempfile
+    from edge_standin import load_recording, serve
+    from tts import EdgeTtsEngine
+
+    if not args.recording:
+        raise SystemExit("❌ edge-stream 套件需要 --recording (由 edge_standin.py record 生成)")
+    chunks = load_recording(args.recording)
+
+    async def run() -> dict:
+        server = await serve(chunks, port=0)
+        port = server.sockets[0].getsockname()[1]
+        engine = EdgeTtsEngine(endpoint=f"http://127.0.0.1:{port}")
+        if not engine.supports_pcm_stream:
+            raise SystemExit("❌ 流式解码需要 ffmpeg")
+        metrics.reset(max_samples=1_000_000)
+        whole, first_audio, total = [], [], []
+        with tempfile.TemporaryDirectory() as directory:
+            for index in range(args.iterations):
+                start = time.perf_counter()
+                await engine.synthesize("bench", os.path.join(directory, f"{index}.mp3"), lang="zh")
+                whole.append(time.perf_counter() - start)
+                start, first = time.perf_counter(), True
+                async for _pcm in engine.stream_pcm("bench", lang="zh"):
+                    if first:
+                        first_audio.append(time.perf_counter() - start)
+                        first = False
+                total.append(time.perf_counter() - start)
+        server.close()
+        await server.wait_closed()
+        return {"edge_save": summarize(whole), "edge_first_byte": summarize(metrics.samples('edge_first_byte')),
+                "edge_first_audio": summarize(first_audio), "edge_stream_total": summarize(total)}
+
+    stages = asyncio.run(run())
+    return {"stages": stages, "recording": {"chunks": len(chunks), "last_chunk_s": chunks[-1][0] if chunks else 0.0}}
+
+
+def run_tts_failover(args) -> dict:
+    """
+    TTS 切换套件：替身服务模拟在线 TTS 的几种网络状况 (正常、慢、断开、不稳定)，备用引擎是
+    固定耗时的静音替身 (代替 Piper)，记录每种状况下每句话的耗时、主备获胜次数和熔断次数。
+    作为对照，还测量断网时不经过 TtsRouter 的 EdgeTtsEngine (自身重试 3 次) 多久才报错。
+    以文件合成方式运行，不需要网络和 ffmpeg；--recording 可选，默认使用合成的片段节奏。
+    """
+    import asyncio
+    import tempfile
+    from edge_standin import Faults, load_recording, serve, synthetic_chunks
+    from tts import EdgeTtsEngine
+    from tts_router import TtsRouter
+
+    class OfflineStandIn(SilentTtsEngine):
+        """固定耗时的离线 TTS 替身。"""
+
+        async def synthesize(self, text: str, output_path: str, lang: str = 'auto'):
+            await asyncio.sleep(FAILOVER_FALLBACK_S)
+            await super().synthesize(text, output_path, lang=lang)
+
+    chunks = load_recording(args.recording) if args.recording else synthetic_chunks()
+    scenarios = {
+        "healthy": Faults(),
+        "slow": Faults(latency_s=1.0),
+        "down": Faults(error_rate=1.0),
+        "flaky": Faults(error_rate=0.5, seed=1),
+    }
+    counters = ["tts_router_primary_wins", "tts_router_fallback_wins", "tts_router_hedged",
+                "tts_router_deadline_exceeded", "tts_router_primary_failures", "tts_router_bypassed",
+                "tts_breaker_trips"]
+
+    async def measure(engine, edge, faults: Faults, path: str, iterations: int) -> list[float]:
+        """engine 是被测的引擎，edge 是其中连接替身服务的 EdgeTtsEngine。"""
+        server = await serve(chunks, port=0, faults=faults)
+        edge.endpoint = f"http://127.0.0.1:{server.sockets[0].getsockname()[1]}"
+        times = []
+        try:
+            for _ in range(iterations):
+                start = time.perf_counter()
+                try:
+                    await engine.synthesize("bench", path, lang="zh")
+                except RuntimeError as e:
+                    print(f"⚠️ 合成失败: {e}", file=sys.stderr)
+                times.append(time.perf_counter() - start)
+        finally:
+            server.close()
+            await server.wait_closed()
+        return times
+
+    async def run() -> tuple[dict, dict]:
+        stages, outcomes = {}, {}
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "sentence.mp3")
+            for name, faults in scenarios.items():
+                metrics.reset()
+                edge = EdgeTtsEngine(stream=False, retries=1)
+                times = await measure(TtsRouter(edge, OfflineStandIn()), edge, faults, path, args.iterations)
+                stages[f"failover_{name}"] = summarize(times)
+                outcomes[name] = {counter: metrics.counter(counter) for counter in counters}
+            # 对照：旧的行为，断网时 Edge 自身重试 (2 秒、4 秒) 之后才报错
+            edge = EdgeTtsEngine(stream=False)
+            times = await measure(edge, edge, Faults(error_rate=1.0), path, 1)
+            stages["edge_retry_down"] = summarize(times)
+        return stages, outcomes
+
+    stages, outcomes = asyncio.run(run())
+    return {"stages": stages, "outcomes": outcomes}
+
+
+SUITES = {
+    "e2e": run_e2e,
+    "edge-stream": run_edge_stream,
+    "ocr-cache": run_ocr_cache,
+    "onnx": run_onnx,
+    "piper": run_piper,
+    "preprocess": run_preprocess,
+    "quantization": run_quantization,
+    "tiling": run_tiling,
+    "tts-failover": run_tts_failover,
+}
+
+
+# --- 比较 ---
+def _flatten(result: dict) -> dict:
+    """提取参与比较的指标：各阶段 p50/p95 以及峰值内存。"""
+    flat = {}
+    for name, stats in result.get("stages", {}).items():
+        for key in ("p50", "p95"):
+            if stats.get("count"):
+                flat[f"{name}.{key}"] = stats[key]
+    if "peak_rss_mb" in result:
+        flat["peak_rss_mb"] = result["peak_rss_mb"]
+    return flat
+
+
+def compare(baseline: dict, current: dict, threshold: float = DEFAULT_THRESHOLD) -> list[str]:
+    """
+    与基线比较，返回回退项的描述列表 (为空表示没有回退)。
+    同时打印每个指标的变化。
+    """
+    old, new = _flatten(baseline), _flatten(current)
+    regressions = []
+    print(f"\n与基线 {baseline.get('meta', {}).get('commit', '?')} 比较:")
+    for key in sorted(set(old) & set(new)):
+        before, after = old[key], new[key]
+        delta = after - before
+        ratio = (after / before - 1.0) if before else 0.0
+        min_abs = MIN_ABS_REGRESSION_MB if key == "peak_rss_mb" else MIN_ABS_REGRESSION_S
+        flag = ""
+        if ratio > threshold and delta > min_abs:
+            flag = "  ⚠️ 回退"
+            regressions.append(f"{key}: {before:.4f} -> {after:.4f} (+{ratio:.0%})")
+        print(f"  {key:<28} {before:>10.4f} -> {after:>10.4f}  ({ratio:+.0%}){flag}")
+    return regressions
+
+
+def print_summary(result: dict):
+    print(f"\n{'阶段':<24}{'次数':>6}{'p50 (ms)':>12}{'p95 (ms)':>12}")
+    for name, stats in result.get("stages", {}).items():
+        if stats.get("count"):
+            print(f"{name:<24}{stats['count']:>6}{stats['p50'] * 1000:>12.1f}{stats['p95'] * 1000:>12.1f}")
+    print(f"峰值 RSS: {result['peak_rss_mb']:.1f} MB")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="A.M.D-HELPER 端到端延迟基准测试")
+    parser.add_argument("--suite", choices=sorted(SUITES), default="e2e", help="要运行的基准套件")
+    parser.add_argument("-n", "--iterations", type=int, default=5, help="每张图片的轮数")
+    parser.add_argument("--warmup", type=int, default=1, help="预热的图片数 (不计入结果)")
+    parser.add_argument("--sizes", nargs="+", choices=list(SIZES), help="只测试这些尺寸档位")
+    parser.add_argument("--langs", nargs="+", choices=["en", "zh"], help="只测试这些语言")
+    parser.add_argument("--real-ocr", action="store_true", help="使用真实的 EasyOCR 引擎")
+    parser.add_argument("--real-tts", action="store_true", help="使用真实的 Piper 引擎")
+    parser.add_argument("--ocr-cache", action="store_true", help="e2e 套件中保留 OCR 结果缓存 (默认关闭)")
+    parser.add_argument("--tile-size", type=int, default=1024, help="tiling 套件的分块边长")
+    parser.add_argument("--runtime", choices=["torch", "onnx"], default="torch",
+                        help="quantization 套件中 EasyOCR 的运行方式")
+    parser.add_argument("--recording", help="edge-stream 套件重放的 Edge TTS 录音 (edge_standin.py record)")
+    parser.add_argument("-o", "--output", help="将 JSON 结果写入文件 (默认输出到标准输出)")
+    parser.add_argument("--compare", help="与之前保存的 JSON 结果比较")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="判定为回退的相对变慢比例 (默认 0.2)")
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    result = SUITES[args.suite](args)
+    result["suite"] = args.suite
+    result["meta"] = run_metadata(args)
+    result["peak_rss_mb"] = peak_rss_mb()
+
+    print_summary(result)
+    payload = json.dumps(result, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(payload)
+        print(f"结果已写入: {args.output}")
+    else:
+        print(payload)
+
+    if result.get("parity_ok") is False:
+        return 1
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, result, args.threshold)
+        if regressions:
+            print("\n检测到性能回退:", file=sys.stderr)
+            for line in regressions:
+                print(f"  - {line}", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+可在后台并发加载的核心组件 (截图、OCR、TTS、音频)。
+
+每个组件都有一个就绪状态：
+    pending  -> 尚未开始加载
+    loading  -> 正在后台加载
+    ready    -> 可以使用
+    failed   -> 加载失败 (保留异常，get() 时抛出)
+    unloaded -> 已卸载，下次使用时重新加载
+
+调用方只等待自己需要的组件，例如截图阶段不必等 OCR 模型加载完。
+"""
+
+import logging
+import threading
+import time
+import traceback
+
+logger = logging.getLogger("AMD-HELPER")
+
+PENDING = "pending"
+LOADING = "loading"
+READY = "ready"
+FAILED = "failed"
+UNLOADED = "unloaded"
+
+
+class ComponentUnavailableError(RuntimeError):
+    """组件加载失败，或在等待期间被取消。"""
+    pass
+
+
+class LazyComponent:
+    """
+    一个延迟加载的组件。
+
+    :param name: 组件名称，用于日志和状态报告。
+    :param factory: 无参数的阻塞函数，返回组件实例。
+    :param on_change: 状态变化时调用的回调，签名为 on_change(component)。
+    """
+
+    def __init__(self, name: str, factory, on_change=None):
+        self.name = name
+        self._factory = factory
+        self._on_change = on_change
+        self._cond = threading.Condition()
+        self._state = PENDING
+        self._value = None
+        self._error = None
+        self._load_seconds = None
+        self._thread = None
+        # 成功加载的次数 (大于 1 表示卸载后重新加载过) 和最近一次使用的时间
+        self.load_count = 0
+        self.last_used = time.monotonic()
+
+    @classmethod
+    def ready(cls, name: str, value, on_change=None) -> "LazyComponent":
+        """创建一个已就绪的组件 (例如调用方注入的实例)。"""
+        component = cls(name, lambda: value, on_change=on_change)
+        component._state = READY
+        component._value = value
+        component._load_seconds = 0.0
+        component.load_count = 1
+        return component
+
+    @property
+    def state(self) -> str:
+        with self._cond:
+            return self._state
+
+    @property
+    def error(self):
+        with self._cond:
+            return self._error
+
+    @property
+    def load_seconds(self):
+        """最近一次加载的耗时 (秒)，尚未加载完成时为 None。"""
+        with self._cond:
+            return self._load_seconds
+
+    def start(self) -> bool:
+        """
+        在后台线程中开始加载。已在加载或已就绪时不做任何事。
+
+        :return: 是否真正开始了一次新的加载。
+        """
+        with self._cond:
+            if self._state not in (PENDING, UNLOADED):
+                return False
+            self._state = LOADING
+            self._error = None
+            self._thread = threading.Thread(target=self._load, name=f"load-{self.name}", daemon=True)
+            self._thread.start()
+        self._notify()
+        return True
+
+    def _load(self):
+        start = time.perf_counter()
+        try:
+            value = self._factory()
+        except BaseException as e:
+            logger.error(f"组件 {self.name} 加载失败: {e}")
+            logger.debug(traceback.format_exc())
+            with self._cond:
+                self._state = FAILED
+                self._error = e
+                self._load_seconds = time.perf_counter() - start
+                self._cond.notify_all()
+        else:
+            with self._cond:
+                self._state = READY
+                self._value = value
+                self._load_seconds = time.perf_counter() - start
+                self.load_count += 1
+                self.last_used = time.monotonic()
+                self._cond.notify_all()
+            logger.info(f"组件 {self.name} 已就绪 ({self._load_seconds:.2f}s)")
+        self._notify()
+
+    def _notify(self):
+        if self._on_change is None:
+            return
+        try:
+            self._on_change(self)
+        except Exception as e:
+            logger.warning(f"组件状态回调失败: {e}")
+
+    def wait(self, timeout: float = None) -> bool:
+        """等待组件离开 pending/loading 状态，返回是否已经结束加载 (就绪、失败或已卸载)。"""
+        with self._cond:
+            return self._cond.wait_for(lambda: self._state not in (PENDING, LOADING), timeout)
+
+    def get(self, timeout: float = None, stop_event: threading.Event = None):
+        """
+        返回组件实例，必要时启动加载并等待。
+
+        :param timeout: 最长等待时间 (秒)，None 表示一直等待。
+        :param stop_event: 等待期间被设置时放弃等待。
+        :raises ComponentUnavailableError: 加载失败、超时或被取消。
+        """
+        self.start()
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        with self._cond:
+            while self._state not in (READY, FAILED):
+                if stop_event is not None and stop_event.is_set():
+                    raise ComponentUnavailableError(f"等待组件 {self.name} 时被取消")
+                remaining = None if deadline is None else deadline - time.perf_counter()
+                if remaining is not None and remaining <= 0:
+                    raise ComponentUnavailableError(f"等待组件 {self.name} 超时")
+                # 有停止信号时分段等待，以便及时响应取消
+                step = 0.1 if stop_event is not None else remaining
+                if step is not None and remaining is not None:
+                    step = min(step, remaining)
+                self._cond.wait(step)
+            if self._state == FAILED:
+                raise ComponentUnavailableError(f"组件 {self.name} 不可用: {self._error}") from self._error
+            self.last_used = time.monotonic()
+            return self._value
+
+    def peek(self):
+        """不等待、不触发加载，已就绪时返回实例，否则返回 None。"""
+        with self._cond:
+            return self._value if self._state == READY else None
+
+    def touch(self):
+        """记录一次使用，推迟空闲卸载。"""
+        self.last_used = time.monotonic()
+
+    @property
+    def idle_seconds(self) -> float:
+        return time.monotonic() - self.last_used
+
+    def unload(self):
+        """
+        卸载已就绪的组件：丢弃实例并进入 unloaded 状态，下次 get() 时重新加载。
+
+        :return: 被卸载的实例 (由调用方负责释放其资源)；未就绪时返回 None。
+        """
+        with self._cond:
+            if self._state != READY:
+                return None
+            value, self._value = self._value, None
+            self._state = UNLOADED
+        self._notify()
+        return value
+
+    def replace(self, value):
+        """用新的实例替换当前实例并标记为就绪，返回旧实例 (未就绪时为 None)。"""
+        with self._cond:
+            old = self._value if self._state == READY else None
+            self._value = value
+            self._state = READY
+            self._error = None
+            self._cond.notify_all()
+        self._notify()
+        return old
+
+    def status(self) -> dict:
+        """可序列化的状态描述。"""
+        with self._cond:
+            status = {
+                "state": self._state,
+                "load_seconds": self._load_seconds,
+                "load_count": self.load_count,
+                "idle_seconds": round(time.monotonic() - self.last_used, 1),
+            }
+            if self._error is not None:
+                status["error"] = repr(self._error)
+            return status
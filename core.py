@@ -5,9 +5,12 @@ import tempfile
 import os
 import asyncio
 import threading
+import time
 from threading import Event
 import logging
 import traceback
+import concurrent.futures
+from concurrent.futures import ThreadPoolExecutor
 
 import json
 import os
@@ -20,9 +23,16 @@ logger = logging.getLogger("AMD-HELPER")
 
 # Import existing components
 from screenshot import Screenshotter
-from ocr import EasyOcrEngine
-from tts import get_tts_engine, PiperTtsEngine
+from ocr import get_ocr_engine
+from tts import get_tts_engine
 from audio import AudioPlayer
+from pipeline import ProcessingPipeline
+from scheduler import RequestScheduler, RequestContext
+from metrics import metrics
+from components import LazyComponent, ComponentUnavailableError, READY, UNLOADED
+from memory import MemoryManager, DEFAULT_IDLE_TIMEOUT_S, DEFAULT_MEMORY_BUDGET_MB
+from ocr_cache import CachedOcrEngine, build_ocr_cache
+from tts_cache import build_tts_cache, wrap_tts_cache
 
 # --- 路径处理 ---
 # 用户特定的配置文件路径（与 tray.py 中的定义保持一致）
@@ -41,119 +51,324 @@ def get_core_config():
         print("⚠️ core.py: 无法读取用户配置文件，将使用默认设置。")
         return {}
 
+# 常驻事件循环使用的线程池大小 (截图、OCR、播放等阻塞阶段在其中运行)
+EXECUTOR_WORKERS = 4
+
 class OcrAndTtsProcessor:
-    """一个为服务模式设计的处理器，一次性加载模型。"""
+    """
+    一个为服务模式设计的处理器，一次性加载模型。
+
+    处理器拥有一个运行在专用线程上的常驻 asyncio 事件循环，所有请求都通过
+    submit() 提交到这个循环上执行，因此引擎可以跨请求保留异步资源
+    (例如常驻的子进程或网络连接)。
+
+    截图、OCR、TTS 和音频四个组件在后台并发加载，构造函数不会阻塞。
+    请求只等待自己需要的组件：截图可以在 OCR 模型加载期间就开始。
+    """
+
+    # 组件名称，也是 status() 中的键
+    COMPONENTS = ("screenshot", "ocr", "tts", "audio")
     
-    def __init__(self):
-        """在初始化时，一次性加载所有重量级引擎。"""
-        print("🔄 正在初始化所有核心引擎 (这应该只在服务启动时发生一次)...")
-        self.screenshotter = Screenshotter()
-        self.ocr_engine = EasyOcrEngine()
+    def __init__(self, screenshotter=None, ocr_engine=None, tts_engine=None, audio_player=None,
+                 on_status_change=None):
+        """
+        创建处理器并在后台开始加载所有重量级引擎。
+
+        各组件都可以由调用方注入 (例如基准测试中的图片源和静音播放器)，
+        注入的组件直接处于就绪状态，未注入的组件在后台按默认方式创建。
+
+        :param on_status_change: 任一组件状态变化时调用的回调，签名为 on_status_change(status: dict)。
+        """
+        print("🔄 正在后台初始化所有核心引擎 (这应该只在服务启动时发生一次)...")
+        self._started = time.perf_counter()
+        self._on_status_change = on_status_change
+        self._executor = ThreadPoolExecutor(max_workers=EXECUTOR_WORKERS, thread_name_prefix="processor")
+        self._loop = asyncio.new_event_loop()
+        self._loop.set_default_executor(self._executor)
+        self._loop_thread = threading.Thread(target=self._run_loop, name="processor-loop", daemon=True)
+        self._loop_thread.start()
+
+        self.config = get_core_config()
+        # OCR 结果缓存放在组件之外，模型被卸载后依然有效，命中时不必等待模型重新加载
+        self.ocr_cache = build_ocr_cache(self.config)
+        # TTS 音频缓存同样独立于组件，切换 TTS 引擎后旧引擎的音频按键区分，不会被误用
+        self.tts_cache = build_tts_cache(self.config)
+        injected = {"screenshot": screenshotter, "ocr": ocr_engine, "tts": tts_engine, "audio": audio_player}
+        factories = {
+            "screenshot": Screenshotter,
+            "ocr": self._create_ocr_engine,
+            "tts": self._create_tts_engine,
+            "audio": AudioPlayer,
+        }
+        # 启动耗时只记录一次；注入的 OCR 引擎不计入
+        self._ocr_ready_recorded = ocr_engine is not None
+        self._ready_announced = False
+        self.components = {}
+        for name in self.COMPONENTS:
+            if injected[name] is not None:
+                self.components[name] = LazyComponent.ready(name, injected[name], on_change=self._component_changed)
+            else:
+                self.components[name] = LazyComponent(name, factories[name], on_change=self._component_changed)
+
+        # 所有触发都经过调度器：single-flight、合并重复触发、新请求抢占旧请求
+        self.scheduler = RequestScheduler(self.run_full_process, submit=self.submit, on_stop=self._stop_audio)
+        # 空闲或超出内存预算时卸载 OCR / TTS 模型，下次请求时在后台重新加载
+        self.memory = MemoryManager(
+            self.components,
+            release=self._release_component,
+            is_busy=lambda: not self.scheduler.wait_idle(0),
+            idle_timeout_s=float(self.config.get("model_idle_timeout_s", DEFAULT_IDLE_TIMEOUT_S)),
+            memory_budget_mb=float(self.config.get("memory_budget_mb", DEFAULT_MEMORY_BUDGET_MB)),
+        )
+
+        # 并发启动所有未就绪组件的加载
+        for component in self.components.values():
+            component.start()
+        self._announce_if_ready()
+        self.memory.start()
+
+    def _create_ocr_engine(self):
+        # 后端由 config.json 的 ocr_backend 选择，见 ocr.get_ocr_engine
+        engine = get_ocr_engine(self.config)
+        if self.config.get("ocr_warmup", True):
+            # 仍在后台加载线程中：首次推理的延迟初始化不落在用户的第一次请求上
+            try:
+                engine.warmup()
+            except Exception as e:
+                # 预热只是优化，失败时引擎仍然可用
+                logger.warning(f"⚠️ OCR 预热失败: {e}")
+        return engine
+
+    def _create_tts_engine(self):
         # 在初始化时，根据文件加载一次引擎
-        self.tts_engine = get_tts_engine() 
-        self.audio_player = AudioPlayer()
-        self._temp_files = []
-        self._stop_event = Event()
-        print("✅ 所有核心引擎初始化完毕，服务就绪。")
+        engine = get_tts_engine()
+        self.submit(engine.start()).result()
+        return engine
+
+    def _component_changed(self, component: LazyComponent):
+        """组件状态变化：记录启动耗时指标，并通知监听者。"""
+        state = component.state
+        metrics.set_gauge(f"component_{component.name}", state)
+        if state == READY and component.load_seconds:
+            # 卸载后的重新加载单独记录，便于评估空闲卸载的代价
+            kind = "reload" if component.load_count > 1 else "load"
+            metrics.observe(f"{kind}_{component.name}", component.load_seconds)
+        if component.name == "ocr" and state == READY and not self._ocr_ready_recorded:
+            self._ocr_ready_recorded = True
+            elapsed = time.perf_counter() - self._started
+            metrics.observe('startup_to_ocr_ready', elapsed)
+            logger.info(f"启动后 {elapsed:.2f}s OCR 可用")
+        self._announce_if_ready()
+        if self._on_status_change is not None:
+            try:
+                self._on_status_change(self.status())
+            except Exception as e:
+                logger.warning(f"状态回调失败: {e}")
+
+    def _announce_if_ready(self):
+        if not self._ready_announced and self.is_ready():
+            self._ready_announced = True
+            print("✅ 所有核心引擎初始化完毕，服务就绪。")
+
+    # --- 组件访问 (必要时等待加载完成) ---
+    @property
+    def screenshotter(self):
+        return self.components["screenshot"].get()
+
+    @property
+    def ocr_engine(self):
+        return self.components["ocr"].get()
+
+    @property
+    def tts_engine(self):
+        return self.components["tts"].get()
+
+    @property
+    def audio_player(self):
+        return self.components["audio"].get()
+
+    def is_ready(self) -> bool:
+        """所有组件都已就绪 (已卸载的组件视为可用，使用时会重新加载)。"""
+        return all(c.state in (READY, UNLOADED) for c in self.components.values())
+
+    def wait_ready(self, timeout: float = None) -> bool:
+        """
+        等待所有组件结束加载 (成功或失败)。
+
+        :return: 是否在超时前全部结束加载。
+        """
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        for component in self.components.values():
+            remaining = None if deadline is None else max(0.0, deadline - time.perf_counter())
+            if not component.wait(remaining):
+                return False
+        return True
+
+    def status(self) -> dict:
+        """各组件的就绪状态，用于 D-Bus 和托盘菜单。"""
+        components = {name: c.status() for name, c in self.components.items()}
+        return {
+            "ready": self.is_ready(),
+            "uptime_seconds": time.perf_counter() - self._started,
+            "components": components,
+            "memory": self.memory.status(),
+        }
+
+    def _release_component(self, name: str, value):
+        """释放被内存管理器卸载的组件实例。"""
+        if name == "tts":
+            self.submit(value.aclose()).result(timeout=5)
+        elif hasattr(value, "close"):
+            value.close()
+
+    def _stop_audio(self):
+        # 音频播放器尚未加载完成时没有需要停止的播放
+        player = self.components["audio"].peek()
+        if player is not None:
+            player.stop()
+
+    def _run_loop(self):
+        """常驻事件循环线程的入口。"""
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_forever()
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        """处理器的常驻事件循环。"""
+        return self._loop
+
+    def submit(self, work, *args) -> concurrent.futures.Future:
+        """
+        将工作提交到常驻事件循环上执行。
+
+        :param work: 协程对象，或一个阻塞的可调用对象 (将在处理器线程池中运行)。
+        :param args: 当 work 为可调用对象时传给它的参数。
+        :return: concurrent.futures.Future，可在任意线程中等待结果。
+        """
+        if asyncio.iscoroutine(work):
+            return asyncio.run_coroutine_threadsafe(work, self._loop)
+        if not callable(work):
+            raise TypeError(f"submit() 需要协程或可调用对象，收到: {type(work).__name__}")
+
+        async def _call_blocking():
+            return await self._loop.run_in_executor(None, work, *args)
+
+        return asyncio.run_coroutine_threadsafe(_call_blocking(), self._loop)
 
     def reload_tts_engine(self, new_config: dict):
         """根据传入的最新配置重新加载TTS引擎。"""
         print("🔄 正在根据新配置重新加载TTS引擎...")
         # 直接使用传入的配置，不再读取文件，避免竞态条件
-        self.tts_engine = get_tts_engine(config=new_config)
+        new_engine = get_tts_engine(config=new_config)
+        self.submit(new_engine.start()).result()
+        old_engine = self.components["tts"].replace(new_engine)
+        if old_engine is not None:
+            self.submit(old_engine.aclose())
         print("✅ TTS引擎已更新。")
 
-    def _cleanup_files(self):
-        """清理所有临时文件。"""
-        if not self._temp_files:
-            return
-        print("🧹 清理临时文件...")
-        for f in self._temp_files:
-            try:
-                if os.path.exists(f):
-                    os.remove(f)
-            except OSError as e:
-                print(f"  - 删除临时文件失败: {f}, 原因: {e}")
-        self._temp_files.clear()
-
-    def run_full_process(self):
-        """执行截图 -> OCR -> TTS -> 音频播放的完整流程。"""
-        logger.info("=== (核心) 收到请求，开始处理流程 ===")
-        logger.debug(f"当前 TTS 引擎类型: {type(self.tts_engine).__name__}")
+    def request(self) -> int:
+        """触发一次截图识别请求 (经过调度器)，返回请求编号。"""
+        # 已卸载的模型立即开始在后台重新加载，与用户框选截图区域并行
+        self.memory.prefetch()
+        return self.scheduler.trigger()
+
+    def stop(self):
+        """停止当前请求和等待中的请求，立即停止播放。"""
+        self.scheduler.stop()
+
+    def run_full_process(self, ctx: RequestContext = None):
+        """
+        执行截图 -> OCR -> 分句流式 TTS -> 音频播放的完整流程。
+
+        :param ctx: 本次请求的上下文，携带独立的停止信号。直接调用时自动创建。
+        """
+        if ctx is None:
+            ctx = RequestContext(0)
+        logger.info(f"=== (核心) 收到请求 #{ctx.request_id}，开始处理流程 ===")
         
         try:
-            # 1. 立即进行截图
+            # 1. 立即进行截图 (只需要截图组件，OCR 模型可以仍在加载)
             logger.debug("步骤1: 开始截图...")
-            image_path = self.screenshotter.take_screenshot()
+            screenshotter = self._require("screenshot", ctx)
+            # 截图以内存数组的形式直接交给 OCR，不再经过 PNG 临时文件
+            with metrics.timer('capture'):
+                image = screenshotter.take_screenshot()
 
-            if not image_path:
+            if image is None:
                 logger.info("流程中断：用户取消了截图。")
                 return
-            self._temp_files.append(image_path)
-            logger.debug(f"截图完成: {image_path}")
-
-            # 2. OCR 识别
-            logger.debug("步骤2: 开始 OCR 识别...")
-            text, ocr_lang = self.ocr_engine.recognize(image_path)
-            if not text:
-                logger.info("流程中断：未识别到文字。")
+            logger.debug(f"截图完成: {image.shape[1]}x{image.shape[0]}")
+            if ctx.cancelled:
+                logger.info("流程中断：请求已被取消。")
                 return
-            
-            logger.info(f"OCR 识别语言: {ocr_lang}，识别文字: {text[:50]}...")
-            logger.debug(f"完整识别文字: {text}")
-
-            # 3. TTS 合成
-            logger.debug(f"步骤3: 开始 TTS 合成，使用引擎: {type(self.tts_engine).__name__}")
-            audio_suffix = '.wav' if isinstance(self.tts_engine, PiperTtsEngine) else '.mp3'
-            logger.debug(f"音频格式: {audio_suffix}")
-            
-            with tempfile.NamedTemporaryFile(suffix=audio_suffix, delete=False) as temp_audio_file:
-                audio_path = temp_audio_file.name
-            self._temp_files.append(audio_path)
-            logger.debug(f"临时音频文件: {audio_path}")
-            
-            # 直接使用 OCR 识别出的语言进行合成
-            try:
-                logger.debug(f"调用 TTS synthesize: text={text[:30]}..., path={audio_path}, lang={ocr_lang}")
-                # 为每次调用创建新的事件循环，确保干净的环境
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-                try:
-                    loop.run_until_complete(self.tts_engine.synthesize(text, audio_path, lang=ocr_lang))
-                finally:
-                    loop.close()
-                logger.debug(f"TTS 合成完成，检查文件是否存在: {os.path.exists(audio_path)}, 大小: {os.path.getsize(audio_path) if os.path.exists(audio_path) else 'N/A'}")
-            except Exception as tts_error:
-                logger.error(f"TTS 合成失败: {tts_error}")
-                logger.error(f"TTS 错误详情:\n{traceback.format_exc()}")
-                raise
-
-            # 4. 播放音频
-            logger.debug("步骤4: 开始播放音频...")
-            self.audio_player.play(audio_path, stop_event=self._stop_event)
+
+            # 2. OCR -> 分句 -> 合成 -> 播放，第一句合成完成即开始朗读
+            if self.ocr_cache is not None:
+                ocr_engine = CachedOcrEngine(lambda: self._require("ocr", ctx), self.ocr_cache)
+            else:
+                ocr_engine = self._require("ocr", ctx)
+            tts_engine = self._require("tts", ctx)
+            if self.tts_cache is not None:
+                tts_engine = wrap_tts_cache(tts_engine, self.tts_cache)
+            audio_player = self._require("audio", ctx)
+            logger.debug(f"当前 TTS 引擎类型: {type(tts_engine).__name__}")
+            pipeline = ProcessingPipeline(ocr_engine, tts_engine, audio_player, loop=self._loop,
+                                          stream_audio=self.config.get("tts_stream", True))
+            pipeline.run(image, stop_event=ctx.stop_event)
             logger.debug("音频播放完成")
 
+        except ComponentUnavailableError as e:
+            logger.info(f"流程中断：{e}")
         except Exception as e:
             logger.error(f"处理过程中出现错误: {e}")
             logger.error(f"错误详情:\n{traceback.format_exc()}")
         finally:
-            self._cleanup_files()
-            logger.info("=== (核心) 流程结束 ===")
+            # 空闲时间从请求结束时开始计算
+            for name in self.memory.evictable:
+                self.components[name].touch()
+            logger.info(f"=== (核心) 请求 #{ctx.request_id} 流程结束 ===")
+
 
+    def _require(self, name: str, ctx: RequestContext):
+        """取得请求需要的组件，尚未就绪时等待 (请求被取消时放弃等待)。"""
+        component = self.components[name]
+        if component.state != READY:
+            logger.info(f"等待组件 {name} 加载完成...")
+            with metrics.timer(f"wait_{name}"):
+                return component.get(stop_event=ctx.stop_event)
+        return component.get()
 
     def cleanup(self):
         """清理资源"""
         print("🧹 清理处理器资源...")
-        self._stop_event.set()
-        if self.audio_player:
-            self.audio_player.stop()
-        self._cleanup_files()
+        self.memory.close()
+        self.scheduler.close()
+        # 只关闭已加载的组件，不为了清理而等待仍在加载的组件
+        tts_engine = self.components["tts"].peek()
+        if tts_engine is not None:
+            try:
+                self.submit(tts_engine.aclose()).result(timeout=5)
+            except Exception as e:
+                logger.warning(f"关闭 TTS 引擎资源失败: {e}")
+        ocr_engine = self.components["ocr"].peek()
+        if ocr_engine is not None:
+            try:
+                ocr_engine.close()
+            except Exception as e:
+                logger.warning(f"关闭 OCR 引擎失败: {e}")
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._loop_thread.join(timeout=5)
+        if not self._loop_thread.is_alive():
+            self._loop.close()
+        self._executor.shutdown(wait=False)
         print("✅ 资源清理完成")
 
 if __name__ == '__main__':
     # 用于直接测试 core.py 的功能
     print("--- 直接测试 OcrAndTtsProcessor ---")
     processor = OcrAndTtsProcessor()
+    processor.wait_ready()
+    print(json.dumps(processor.status(), indent=2, ensure_ascii=False))
     processor.run_full_process()
     processor.cleanup()
     print("--- 测试结束 ---")
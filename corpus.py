@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+合成的中英文文本图片语料，用于基准测试和引擎校准。
+
+图片由 Pillow 渲染，内容固定，因此同一台机器上不同提交之间的结果可以直接比较。
+"""
+
+import os
+import glob
+
+# 固定的参考文本
+TEXTS = {
+    "en": (
+        "The quick brown fox jumps over the lazy dog. "
+        "Please save your work before closing this window. "
+        "Your changes will be lost if you don't save them. "
+        "Click Continue to install the update now, or Cancel to be reminded later."
+    ),
+    "zh": (
+        "欢迎使用屏幕朗读助手。请选择需要识别的区域，程序会自动朗读其中的文字。"
+        "如果您在关闭窗口之前没有保存，所做的更改将会丢失。"
+        "点击继续立即安装更新，或者点击取消稍后提醒。"
+    ),
+}
+
+# 截图尺寸档位: 名称 -> (宽, 高, 字号)
+SIZES = {
+    "label": (360, 48, 18),
+    "dialog": (800, 300, 20),
+    "page": (1920, 1080, 22),
+    "hidpi": (3840, 2160, 44),
+}
+
+# 常见的字体位置，按优先级排列
+_CJK_FONT_PATTERNS = [
+    "/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc",
+    "/usr/share/fonts/noto-cjk/NotoSansCJK-Regular.ttc",
+    "/usr/share/fonts/truetype/wqy/wqy-microhei.ttc",
+    "/usr/share/fonts/truetype/wqy/wqy-zenhei.ttc",
+    "/usr/share/fonts/truetype/droid/DroidSansFallbackFull.ttf",
+    "/usr/share/fonts/**/*CJK*.tt[cf]",
+    "/usr/share/fonts/**/*[Hh]ei*.tt[cf]",
+]
+_LATIN_FONT_PATTERNS = [
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+    "/usr/share/fonts/dejavu/DejaVuSans.ttf",
+    "/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf",
+    "/usr/share/fonts/**/*Sans*.ttf",
+]
+
+
+def find_font(lang: str) -> str | None:
+    """查找可以渲染指定语言的字体文件，找不到时返回 None。"""
+    patterns = _CJK_FONT_PATTERNS if lang == "zh" else _LATIN_FONT_PATTERNS + _CJK_FONT_PATTERNS
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern, recursive=True))
+        if matches:
+            return matches[0]
+    return None
+
+
+def _wrap(draw, text: str, font, max_width: int) -> list[str]:
+    """按像素宽度折行，英文在空格处断行，中文逐字断行。"""
+    tokens = text.split(" ") if text.isascii() else list(text)
+    joiner = " " if text.isascii() else ""
+    lines, current = [], ""
+    for token in tokens:
+        candidate = f"{current}{joiner}{token}" if current else token
+        if draw.textlength(candidate, font=font) <= max_width:
+            current = candidate
+        else:
+            if current:
+                lines.append(current)
+            current = token
+    if current:
+        lines.append(current)
+    return lines
+
+
+def render_text_image(text: str, width: int, height: int, font_size: int, font_path: str = None,
+                      margin: int = None, background=(255, 255, 255), foreground=(0, 0, 0)):
+    """
+    渲染一张文本图片。
+
+    :return: (RGB NumPy 数组, 实际绘制的文本)。放不下的行会被省略，
+             返回的文本只包含真正出现在图片里的部分。
+    """
+    import numpy as np
+    from PIL import Image, ImageDraw, ImageFont
+
+    font = ImageFont.truetype(font_path, font_size) if font_path else ImageFont.load_default()
+    if margin is None:
+        margin = max(4, font_size // 2)
+    image = Image.new("RGB", (width, height), background)
+    draw = ImageDraw.Draw(image)
+    line_height = int(font_size * 1.5)
+    drawn = []
+    y = margin
+    for line in _wrap(draw, text, font, width - 2 * margin):
+        if y + font_size > height - margin // 2:
+            break
+        draw.text((margin, y), line, font=font, fill=foreground)
+        drawn.append(line)
+        y += line_height
+    joiner = " " if text.isascii() else ""
+    return np.asarray(image), joiner.join(drawn)
+
+
+class Sample:
+    """语料中的一张图片。"""
+
+    def __init__(self, name: str, lang: str, size: str, image, text: str):
+        self.name = name
+        self.lang = lang
+        self.size = size
+        self.image = image
+        self.text = text
+
+    def __repr__(self):
+        h, w = self.image.shape[:2]
+        return f"Sample({self.name}, {w}x{h})"
+
+
+def build_corpus(sizes=None, langs=None) -> list[Sample]:
+    """
+    生成语料。找不到中文字体时跳过中文样本。
+
+    :param sizes: 要生成的尺寸档位名称列表，默认全部。
+    :param langs: 要生成的语言列表，默认 ['en', 'zh']。
+    """
+    sizes = sizes or list(SIZES)
+    langs = langs or ["en", "zh"]
+    samples = []
+    for lang in langs:
+        font_path = find_font(lang)
+        if lang == "zh" and font_path is None:
+            print("⚠️ 未找到中文字体，跳过中文样本。")
+            continue
+        for size in sizes:
+            width, height, font_size = SIZES[size]
+            # 大尺寸档位重复文本以填满页面
+            repeat = max(1, (width * height) // 400_000)
+            text = (" " if lang == "en" else "").join([TEXTS[lang]] * repeat)
+            image, drawn = render_text_image(text, width, height, font_size, font_path)
+            samples.append(Sample(f"{lang}-{size}", lang, size, image, drawn))
+    return samples
+
+
+def char_error_rate(reference: str, hypothesis: str) -> float:
+    """字符错误率 (忽略空白)：编辑距离 / 参考文本长度。"""
+    ref = "".join(reference.split())
+    hyp = "".join(hypothesis.split())
+    if not ref:
+        return 0.0 if not hyp else 1.0
+    previous = list(range(len(hyp) + 1))
+    for i, rc in enumerate(ref, 1):
+        current = [i] + [0] * len(hyp)
+        for j, hc in enumerate(hyp, 1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (rc != hc))
+        previous = current
+    return previous[-1] / len(ref)
+
+
+if __name__ == '__main__':
+    # 将语料导出为 PNG，便于人工检查
+    # 使用方法: python3 corpus.py /path/to/output_dir
+    import sys
+    from PIL import Image
+    out_dir = sys.argv[1] if len(sys.argv) > 1 else "corpus_out"
+    os.makedirs(out_dir, exist_ok=True)
+    for sample in build_corpus():
+        path = os.path.join(out_dir, f"{sample.name}.png")
+        Image.fromarray(sample.image).save(path)
+        print(f"{sample} -> {path}")
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+简单的磁盘缓存层。
+
+每个条目是 CACHE_ROOT/<名称>/<键前两位>/<键> 下的一个文件，写入是原子的
+(先写临时文件再 rename)，进程崩溃不会留下半个条目。
+按文件修改时间做 LRU：命中时更新 mtime，超出容量时删除最旧的条目。
+"""
+
+import logging
+import os
+import tempfile
+import threading
+
+logger = logging.getLogger("AMD-HELPER")
+
+CACHE_ROOT = os.path.expanduser(os.path.join("~", ".cache", "a.m.d-helper"))
+
+
+def atomic_write(path: str, data: bytes):
+    """原子地写入文件：写入同目录下的临时文件后 rename。"""
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+class DiskTier:
+    """
+    以键 (十六进制字符串) 存取字节串的磁盘缓存。
+
+    :param name: 子目录名，例如 'ocr'。
+    :param max_bytes: 总容量上限，超出时按 LRU 删除。
+    :param root: 缓存根目录，默认 ~/.cache/a.m.d-helper。
+    """
+
+    def __init__(self, name: str, max_bytes: int, root: str = None):
+        self.directory = os.path.join(root or CACHE_ROOT, name)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # 本进程写入的字节数超过容量的 1/8 时检查一次总容量
+        self._written = 0
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key)
+
+    def get(self, key: str) -> bytes | None:
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+        try:
+            os.utime(path)  # 记录最近使用
+        except OSError:
+            pass
+        return data
+
+    def put(self, key: str, data: bytes):
+        try:
+            atomic_write(self._path(key), data)
+        except OSError as e:
+            logger.warning(f"写入磁盘缓存失败: {e}")
+            return
+        with self._lock:
+            self._written += len(data)
+            if self._written < self.max_bytes // 8:
+                return
+            self._written = 0
+        self.evict()
+
+    def evict(self):
+        """删除最久未使用的条目，直到总大小不超过容量。"""
+        entries = []
+        total = 0
+        for dirpath, _dirs, files in os.walk(self.directory):
+            for filename in files:
+                path = os.path.join(dirpath, filename)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+                total += st.st_size
+        if total <= self.max_bytes:
+            return
+        entries.sort()
+        for _mtime, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+
+    def clear(self):
+        for dirpath, _dirs, files in os.walk(self.directory):
+            for filename in files:
+                try:
+                    os.remove(os.path.join(dirpath, filename))
+                except OSError:
+                    pass
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Edge TTS 的本地替身服务，用于离线测试流式播放。
+
+先在线录制一次 Edge TTS 的音频片段和每个片段到达的时间，之后由替身服务按录制的节奏
+重放 (HTTP chunked 响应)，EdgeTtsEngine 通过配置 edge_endpoint 连接它，不需要网络。
+替身不做合成：无论请求什么文本都重放同一段录音。
+还可以注入首字节延迟和错误 (HTTP 503)，用来测试 tts_router 的截止时间、对冲和熔断策略。
+
+    python3 edge_standin.py record "要朗读的文字" -o edge.json   # 录制 (需要网络)
+    python3 edge_standin.py serve edge.json --port 8765           # 重放
+    python3 edge_standin.py serve edge.json --latency 2 --error-rate 0.3   # 慢且不稳定的网络
+    # config.json: "edge_endpoint": "http://127.0.0.1:8765"
+
+协议：POST 任意路径，请求体为 {"text", "voice"}，响应体为 MP3 (Transfer-Encoding: chunked)。
+"""
+
+import asyncio
+import base64
+import json
+import logging
+import random
+import time
+import urllib.parse
+
+logger = logging.getLogger("AMD-HELPER")
+
+DEFAULT_PORT = 8765
+
+
+async def record(text: str, voice: str) -> dict:
+    """在线合成一次，记录每个音频片段及其相对于请求开始的到达时间 (秒)。"""
+    import edge_tts
+    chunks = []
+    start = time.perf_counter()
+    async for message in edge_tts.Communicate(text, voice).stream():
+        if message["type"] == "audio":
+            chunks.append({"t": round(time.perf_counter() - start, 4),
+                           "data": base64.b64encode(message["data"]).decode("ascii")})
+    return {"text": text, "voice": voice, "chunks": chunks}
+
+
+def load_recording(path: str) -> list[tuple[float, bytes]]:
+    with open(path, "r", encoding="utf-8") as f:
+        recording = json.load(f)
+    return [(chunk["t"], base64.b64decode(chunk["data"])) for chunk in recording["chunks"]]
+
+
+def synthetic_chunks(count: int = 20, interval_s: float = 0.05, size: int = 2048) -> list[tuple[float, bytes]]:
+    """没有录音时使用的片段：只有节奏，数据不是有效的 MP3 (不能解码播放，只用于文件合成)。"""
+    return [(round(index * interval_s, 4), bytes(size)) for index in range(count)]
+
+
+class Faults:
+    """
+    注入的故障，可以在服务运行中修改。
+
+    :param latency_s: 每个响应在首字节之前额外等待的时间。
+    :param error_rate: 以这个概率直接返回 503。
+    """
+
+    def __init__(self, latency_s: float = 0.0, error_rate: float = 0.0, seed: int = None):
+        self.latency_s = latency_s
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+
+    def should_fail(self) -> bool:
+        return self.error_rate > 0 and self._random.random() < self.error_rate
+
+
+async def serve(chunks: list[tuple[float, bytes]], host: str = "127.0.0.1", port: int = DEFAULT_PORT,
+                speed: float = 1.0, faults: Faults = None) -> asyncio.AbstractServer:
+    """
+    启动替身服务，返回 asyncio 的 Server (port 为 0 时由系统分配端口)。
+
+    :param chunks: [(到达时间, MP3 数据), ...]
+    :param speed: 重放速度，2.0 表示所有间隔减半。
+    :param faults: 注入的延迟和错误，默认不注入。
+    """
+    faults = faults or Faults()
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            await reader.readline()
+            length = 0
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _sep, value = line.decode("latin-1").partition(":")
+                if name.strip().lower() == "content-length":
+                    length = int(value.strip())
+            if length:
+                await reader.readexactly(length)
+            if faults.latency_s > 0:
+                await asyncio.sleep(faults.latency_s)
+            if faults.should_fail():
+                writer.write(b"HTTP/1.1 503 Service Unavailable\r\nContent-Length: 0\r\nConnection: close\r\n\r\n")
+                await writer.drain()
+                return
+            writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: audio/mpeg\r\n"
+                         b"Transfer-Encoding: chunked\r\nConnection: close\r\n\r\n")
+            start = time.perf_counter()
+            for offset, data in chunks:
+                delay = offset / speed - (time.perf_counter() - start)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                writer.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+                await writer.drain()
+            writer.write(b"0\r\n\r\n")
+            await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError) as e:
+            logger.debug(f"替身服务连接中断: {e}")
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(handle, host, port)
+
+
+async def stream_from(endpoint: str, text: str, voice: str):
+    """向替身服务请求合成，逐块产出收到的 MP3 数据。"""
+    url = urllib.parse.urlsplit(endpoint)
+    reader, writer = await asyncio.open_connection(url.hostname, url.port or 80)
+    try:
+        body = json.dumps({"text": text, "voice": voice}, ensure_ascii=False).encode("utf-8")
+        writer.write(f"POST {url.path or '/'} HTTP/1.1\r\nHost: {url.netloc}\r\n"
+                     f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n"
+                     f"Connection: close\r\n\r\n".encode("latin-1") + body)
+        await writer.drain()
+        status = await reader.readline()
+        if b" 200 " not in status:
+            raise RuntimeError(f"替身服务返回错误: {status.decode('latin-1').strip()}")
+        while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+            pass
+        while True:
+            size = int((await reader.readline()).split(b";")[0].strip() or b"0", 16)
+            if size == 0:
+                break
+            data = await reader.readexactly(size)
+            await reader.readexactly(2)
+            yield data
+    finally:
+        writer.close()
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Edge TTS 本地替身服务")
+    commands = parser.add_subparsers(dest="command", required=True)
+    record_parser = commands.add_parser("record", help="在线录制一段 Edge TTS 音频及其到达时间")
+    record_parser.add_argument("text")
+    record_parser.add_argument("-o", "--output", default="edge_recording.json")
+    record_parser.add_argument("--voice", default="zh-CN-XiaoxiaoNeural")
+    serve_parser = commands.add_parser("serve", help="按录制的节奏重放")
+    serve_parser.add_argument("recording")
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    serve_parser.add_argument("--speed", type=float, default=1.0, help="重放速度")
+    serve_parser.add_argument("--latency", type=float, default=0.0, help="首字节之前额外的延迟 (秒)")
+    serve_parser.add_argument("--error-rate", type=float, default=0.0, help="返回 503 的概率")
+    args = parser.parse_args()
+
+    if args.command == "record":
+        recording = asyncio.run(record(args.text, args.voice))
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(recording, f, ensure_ascii=False)
+        chunks = recording["chunks"]
+        print(f"✅ 已录制 {len(chunks)} 个片段，首个片段 {chunks[0]['t'] if chunks else 0:.3f}s，"
+              f"最后一个 {chunks[-1]['t'] if chunks else 0:.3f}s: {args.output}")
+    else:
+        async def main():
+            server = await serve(load_recording(args.recording), args.host, args.port, args.speed,
+                                 Faults(args.latency, args.error_rate))
+            print(f"✅ Edge TTS 替身服务已启动: http://{args.host}:{args.port}")
+            async with server:
+                await server.serve_forever()
+        try:
+            asyncio.run(main())
+        except KeyboardInterrupt:
+            pass
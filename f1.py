@@ -26,6 +26,7 @@ import asyncio
 import json
 import os
 import re
+import shutil
 import sys
 import tempfile
 import time
@@ -43,6 +44,9 @@ from PyQt6.QtWidgets import QApplication, QWidget
 from jeepney import new_method_call
 from jeepney.io.asyncio import open_dbus_connection
 
+from tts import PiperVoicePool
+from tts_cache import CachedTtsEngine, build_tts_cache
+
 # --- 配置 ---
 HALO_BASE_COLOR = QColor(10, 132, 255, 70)
 HALO_PROGRESS_COLOR = QColor(255, 214, 10, 90)
@@ -62,20 +66,31 @@ def _get_config():
         with open("config.json", "r", encoding="utf-8") as f: return json.load(f)
     except (FileNotFoundError, json.JSONDecodeError): return {}
 
+def _find_piper():
+    executable = shutil.which("piper")
+    if not executable: raise FileNotFoundError("piper executable not found in PATH.")
+    return executable
+
 class LocalPiperTtsEngine:
+    """语音模型在第一次使用时加载并常驻，之后每次悬停只有推理的开销。"""
+    def __init__(self):
+        self.voices = PiperVoicePool(_find_piper)
+
+    def _model_key(self, lang, config):
+        piper_models = config.get("piper_models", {})
+        return lang if lang in piper_models else config.get("active_piper_model", "zh")
+
+    def voice(self, lang='zh'):
+        config = _get_config()
+        return os.path.basename(config.get("piper_models", {}).get(self._model_key(lang, config), lang))
+
     async def synthesize(self, text: str, output_path: str, lang: str = 'zh'):
         config = _get_config()
-        piper_models = config.get("piper_models", {})
-        model_key = lang if lang in piper_models else config.get("active_piper_model", "zh")
-        model_path = piper_models.get(model_key)
+        model_key = self._model_key(lang, config)
+        model_path = config.get("piper_models", {}).get(model_key)
         if not model_path or not os.path.exists(model_path):
             raise FileNotFoundError(f"Piper model for key '{model_key}' not found.")
-        command = ["piper", "--model", model_path, "--output_file", output_path]
-        process = await asyncio.create_subprocess_exec(
-            *command, stdin=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
-        _, stderr = await process.communicate(input=text.encode('utf-8'))
-        if process.returncode != 0:
-            raise RuntimeError(f"Piper-TTS failed: {stderr.decode()}")
+        await self.voices.synthesize(model_path, text, output_path)
 
 class HaloWindow(QWidget):
     def __init__(self):
@@ -119,6 +134,11 @@ class HoverReader:
         self.communicator = Communicator()
         self.dbus_conn = None
         self.tts_task = None
+        self.piper = LocalPiperTtsEngine()
+        # 悬停朗读的多是反复出现的界面标签，缓存合成的音频
+        tts_cache = build_tts_cache(_get_config())
+        if tts_cache is not None:
+            self.piper = CachedTtsEngine(self.piper, tts_cache)
         self.last_accessible_path = None
         self.last_x, self.last_y = -1, -1
         self.keyboard_device = None
@@ -285,9 +305,8 @@ class HoverReader:
 
     async def _tts_offline_piper(self, text):
         self.halo.set_progress(1.0)
-        engine = LocalPiperTtsEngine()
         with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as audio_f: audio_fname = audio_f.name
-        await engine.synthesize(text, audio_fname)
+        await self.piper.synthesize(text, audio_fname)
         data, fs = sd.read(audio_fname, dtype='float32')
         await self.loop.run_in_executor(None, sd.play, data, fs)
         await self.loop.run_in_executor(None, sd.wait)
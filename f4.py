@@ -1,34 +1,47 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-import asyncio
+# 每次按下快捷键都会启动这个脚本，因此这里只做一次同步的 D-Bus 方法调用：
+# 使用轻量的 jeepney 阻塞连接，不导入 asyncio / dbus_next，也不做内省往返。
+# 不要在这里导入任何重量级模块 (importtime_report.py 会检查这一点)。
+
 import sys
-from dbus_next.aio import MessageBus
-from dbus_next.constants import BusType
+from jeepney import DBusAddress, MessageType, new_method_call
+from jeepney.io.blocking import open_dbus_connection
 
 # D-Bus 配置，必须与 tray.py 中的定义完全一致
 DBUS_SERVICE_NAME = "org.amd_helper.Service"
 DBUS_INTERFACE_NAME = "org.amd_helper.Interface"
 DBUS_OBJECT_PATH = "/org/amd_helper/Main"
 
-async def main():
+# 方法调用的超时 (秒)；服务端方法只是把请求交给调度器，会立即返回
+CALL_TIMEOUT = 5
+
+def call(method_name: str):
+    """调用服务的一个无参数方法，返回回复的消息体。"""
+    address = DBusAddress(DBUS_OBJECT_PATH, bus_name=DBUS_SERVICE_NAME, interface=DBUS_INTERFACE_NAME)
+    with open_dbus_connection(bus="SESSION") as conn:
+        reply = conn.send_and_get_reply(new_method_call(address, method_name), timeout=CALL_TIMEOUT)
+    # 错误回复的消息体是错误描述
+    if reply.header.message_type == MessageType.error:
+        raise RuntimeError(reply.body[0] if reply.body else "D-Bus 调用失败")
+    return reply.body
+
+def main():
     """连接到D-Bus服务并调用方法。"""
     try:
-        bus = await MessageBus(bus_type=BusType.SESSION).connect()
-        
-        # 1. 手动进行“内省”，获取远程服务的XML定义
-        introspection = await bus.introspect(DBUS_SERVICE_NAME, DBUS_OBJECT_PATH)
-        
-        # 2. 使用内省数据来获取远程对象的代理
-        proxy = bus.get_proxy_object(DBUS_SERVICE_NAME, DBUS_OBJECT_PATH, introspection)
-        
-        # 3. 从代理中获取我们感兴趣的接口
-        interface = proxy.get_interface(DBUS_INTERFACE_NAME)
-        
-        # 4. 直接调用方法 (方法名前加上 'call_')
-        print(f"正在调用 D-Bus 方法: {DBUS_INTERFACE_NAME}.trigger_ocr")
-        await interface.call_trigger_ocr()
-        print("方法调用成功，截图识别流程已在后台触发。")
+        # 传入 "stop" 参数时停止当前朗读，传入 "status" 时打印各组件的就绪状态，
+        # 否则触发截图识别
+        if len(sys.argv) > 1 and sys.argv[1] == "stop":
+            print(f"正在调用 D-Bus 方法: {DBUS_INTERFACE_NAME}.stop")
+            call("stop")
+            print("方法调用成功，朗读已停止。")
+        elif len(sys.argv) > 1 and sys.argv[1] == "status":
+            print(call("get_status")[0])
+        else:
+            print(f"正在调用 D-Bus 方法: {DBUS_INTERFACE_NAME}.trigger_ocr")
+            call("trigger_ocr")
+            print("方法调用成功，截图识别流程已在后台触发。")
 
     except Exception as e:
         print(f"错误：无法连接到 A.M.D-HELPER 服务或调用方法。", file=sys.stderr)
@@ -37,4 +50,4 @@ async def main():
         sys.exit(1)
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    main()
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+启动导入耗时报告 (基于 python -X importtime)。
+
+对每个入口模块在新的解释器中导入若干次，取中位数，并检查：
+- 导入耗时是否超出预算；
+- 是否导入了不应在启动路径上出现的重量级模块。
+
+f4.py 在每次按键时都会运行，它的预算最严格，且不允许导入 asyncio 和任何大型库。
+
+无法测量的入口 (例如缺少依赖) 同样以非零状态码退出，除非指定 --allow-missing。
+托盘依赖的原生 GUI 绑定 (PyGObject) 在无图形界面的环境中通常没有安装，
+此时换成空模块后测量，它们的耗时不计入，报告中会注明。
+
+用法:
+    python3 importtime_report.py                         # 打印报告，超出预算或无法测量时以非零状态码退出
+    python3 importtime_report.py -n 10 -o importtime_report.md
+    python3 importtime_report.py --allow-missing         # 只检查能够测量的入口
+"""
+
+import argparse
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# 绝不应出现在启动路径上的模块 (按需在后台加载或只在菜单操作中使用)
+HEAVY_MODULES = ["torch", "easyocr", "cv2", "pygame", "mss", "numpy", "requests", "edge_tts", "piper"]
+
+# 入口: (导入语句, 导入耗时预算 (ms), 禁止导入的模块)
+TARGETS = {
+    "f4": ("import f4", 40, HEAVY_MODULES + ["asyncio", "dbus_next", "PIL"]),
+    # 处理器的常驻事件循环需要 asyncio (约占一半)
+    "core": ("import core", 150, HEAVY_MODULES + ["PIL"]),
+    # 托盘启动本身需要 dbus_next、pystray 和 Pillow (托盘图标)
+    "tray": ("import tray", 400, HEAVY_MODULES),
+}
+
+# 入口 -> 未安装时换成空模块的原生 GUI 绑定 (pystray 的 appindicator 后端需要 gi)
+STUB_MODULES = {
+    "tray": ["gi"],
+}
+
+# 在被测量的解释器中安装空模块：任意属性和下标都返回空模块，调用时返回自身，可以作为基类
+_STUB_PRELUDE = """
+import importlib.abc, importlib.machinery, sys, types
+class _Stub(types.ModuleType):
+    __path__ = []
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return _Stub(self.__name__ + "." + name)
+    def __call__(self, *args, **kwargs):
+        return self
+    def __getitem__(self, key):
+        return self
+    def __mro_entries__(self, bases):
+        return (object,)
+class _StubFinder(importlib.abc.MetaPathFinder, importlib.abc.Loader):
+    def find_spec(self, fullname, path, target=None):
+        if fullname.split(".")[0] in {roots!r}:
+            return importlib.machinery.ModuleSpec(fullname, self, is_package=True)
+    def create_module(self, spec):
+        return _Stub(spec.name)
+    def exec_module(self, module):
+        pass
+sys.meta_path.insert(0, _StubFinder())
+"""
+
+
+def parse_importtime(stderr: str) -> list[tuple[str, int, int, int]]:
+    """
+    解析 -X importtime 的输出。
+
+    :return: [(模块名, 层级, 自身耗时 us, 累计耗时 us)]，层级 0 为顶层导入。
+    """
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # 表头
+        name = fields[2].rstrip()
+        level = (len(name) - len(name.lstrip()) - 1) // 2
+        entries.append((name.strip(), level, int(fields[0]), int(fields[1])))
+    return entries
+
+
+def missing_stubs(name: str) -> list[str]:
+    """入口需要换成空模块的原生绑定：只包括本机没有安装的。"""
+    import importlib.util
+    return [module for module in STUB_MODULES.get(name, []) if importlib.util.find_spec(module) is None]
+
+
+def measure(statement: str, stubs: list[str] = ()):
+    """
+    在新的解释器中执行一次导入。
+
+    :param stubs: 导入前换成空模块的模块。
+
+    :return: (导入条目列表, 进程总耗时秒数, 错误信息或 None)
+    """
+    start = time.perf_counter()
+    if stubs:
+        statement = _STUB_PRELUDE.format(roots=set(stubs)) + statement
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", statement],
+                          cwd=SCRIPT_DIR, capture_output=True, text=True, timeout=120)
+    elapsed = time.perf_counter() - start
+    error = None
+    if proc.returncode != 0:
+        tail = [line for line in proc.stderr.splitlines() if not line.startswith("import time:")]
+        error = tail[-1] if tail else f"exit code {proc.returncode}"
+    return parse_importtime(proc.stderr), elapsed, error
+
+
+def report_target(name: str, statement: str, budget_ms: float, forbidden: list[str], runs: int) -> dict:
+    """多次测量一个入口，返回中位数结果。"""
+    module = statement.split()[-1]
+    stubs = missing_stubs(name)
+    totals, walls, heaviest, imported = [], [], {}, set()
+    for _ in range(runs):
+        entries, wall, error = measure(statement, stubs)
+        if error:
+            return {"name": name, "statement": statement, "budget_ms": budget_ms, "error": error}
+        walls.append(wall)
+        # 输出是后序的：子模块的行出现在父模块之前
+        children = []
+        for mod, level, _self, cumulative in entries:
+            imported.add(mod)
+            if level == 1:
+                children.append((mod, cumulative))
+            elif level == 0:
+                if mod == module:
+                    totals.append(cumulative / 1000.0)
+                    for child, child_us in children:
+                        heaviest.setdefault(child, []).append(child_us / 1000.0)
+                children = []
+    baseline = statistics.median(measure("pass")[1] for _ in range(runs))
+    top = sorted(((statistics.median(v), k) for k, v in heaviest.items()), reverse=True)[:8]
+    total_ms = statistics.median(totals) if totals else 0.0
+    violations = sorted(m for m in forbidden if m in imported)
+    return {
+        "name": name,
+        "statement": statement,
+        "budget_ms": budget_ms,
+        "import_ms": total_ms,
+        "process_ms": statistics.median(walls) * 1000.0,
+        "interpreter_ms": baseline * 1000.0,
+        "top": top,
+        "forbidden_imported": violations,
+        "stubbed": stubs,
+        "ok": total_ms <= budget_ms and not violations,
+    }
+
+
+def render_markdown(results: list[dict], runs: int) -> str:
+    lines = [
+        "# 启动导入耗时报告",
+        "",
+        "由 `python3 importtime_report.py -o importtime_report.md` 生成，"
+        f"每个入口在新的解释器中导入 {runs} 次取中位数。",
+        "",
+        f"- Python {platform.python_version()} / {platform.platform()} / {os.cpu_count()} CPU",
+        f"- 生成时间: {time.strftime('%Y-%m-%d %H:%M:%S')}",
+        "",
+        "| 入口 | 预算 (ms) | 导入 (ms) | 进程总耗时 (ms) | 空解释器 (ms) | 结果 |",
+        "|---|---:|---:|---:|---:|---|",
+    ]
+    for r in results:
+        if "error" in r:
+            lines.append(f"| `{r['statement']}` | {r['budget_ms']} | - | - | - | 未测量: {r['error']} |")
+            continue
+        verdict = "✅" if r["ok"] else "❌"
+        if r["forbidden_imported"]:
+            verdict += " 导入了: " + ", ".join(r["forbidden_imported"])
+        if r["stubbed"]:
+            verdict += " (未安装、以空模块代替: " + ", ".join(r["stubbed"]) + ")"
+        lines.append(f"| `{r['statement']}` | {r['budget_ms']} | {r['import_ms']:.1f} | "
+                     f"{r['process_ms']:.1f} | {r['interpreter_ms']:.1f} | {verdict} |")
+    for r in results:
+        if "error" in r or not r["top"]:
+            continue
+        lines += ["", f"## {r['name']}: 最重的直接依赖", "", "| 模块 | 累计 (ms) |", "|---|---:|"]
+        lines += [f"| `{mod}` | {ms:.1f} |" for ms, mod in r["top"]]
+    lines.append("")
+    return "\n".join(lines)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="启动导入耗时报告")
+    parser.add_argument("targets", nargs="*", metavar="TARGET",
+                        help=f"要测量的入口 ({', '.join(TARGETS)})，默认全部")
+    parser.add_argument("-n", "--runs", type=int, default=5, help="每个入口的测量次数")
+    parser.add_argument("-o", "--output", help="将 Markdown 报告写入文件")
+    parser.add_argument("--allow-missing", action="store_true",
+                        help="无法测量的入口 (例如缺少依赖) 不算失败")
+    args = parser.parse_args(argv)
+    unknown = [name for name in args.targets if name not in TARGETS]
+    if unknown:
+        parser.error(f"未知的入口: {', '.join(unknown)}")
+
+    results = []
+    for name in args.targets or list(TARGETS):
+        statement, budget_ms, forbidden = TARGETS[name]
+        print(f"⏱️  正在测量 {statement} ...", file=sys.stderr)
+        results.append(report_target(name, statement, budget_ms, forbidden, args.runs))
+
+    markdown = render_markdown(results, args.runs)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(markdown)
+        print(f"报告已写入: {args.output}", file=sys.stderr)
+    else:
+        print(markdown)
+    # 未能测量的入口没有 ok 字段：除非指定 --allow-missing，否则同样算失败
+    return 0 if all(r.get("ok", args.allow_missing) for r in results) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
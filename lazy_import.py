@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+延迟导入。
+
+托盘启动时只需要 D-Bus、pystray 和 Pillow；requests、pyperclip 等只在少见的菜单操作
+中用到。用 lazy_import() 得到的模块对象在第一次访问属性时才真正执行导入，
+模块级的名字 (例如 `requests.post`) 保持不变。
+
+注意：`from x import y` 会立即访问属性，因此对延迟模块只能使用 `import x` 的形式。
+"""
+
+import importlib.util
+import sys
+
+
+def lazy_import(name: str):
+    """
+    返回一个延迟加载的模块。
+
+    :raises ModuleNotFoundError: 找不到该模块 (不会执行模块代码)。
+    """
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ModuleNotFoundError(f"No module named '{name}'", name=name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
+
+def try_lazy_import(name: str):
+    """与 lazy_import 相同，但找不到模块时返回 None，用于可选依赖。"""
+    try:
+        return lazy_import(name)
+    except ImportError:
+        return None
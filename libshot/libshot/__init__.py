@@ -17,7 +17,8 @@ __version__ = "0.2.0"  # Bump version for new features
 __author__ = "Your Name"
 
 import os
-from .backends import WaylandBackend, X11Backend, GnomeWaylandBackend
+# The backends (and the capture libraries they depend on) are imported on
+# first use in _get_backend(), so `import libshot` stays cheap.
 from .exceptions import LibshotError, UnsupportedError, PermissionDeniedError, InvalidRegionError
 
 # This global variable will hold the singleton instance of the detected backend.
@@ -45,6 +46,8 @@ def _get_backend():
     if _backend_instance is not None:
         return _backend_instance
 
+    from .backends import WaylandBackend, X11Backend, GnomeWaylandBackend
+
     session_type = os.environ.get("XDG_SESSION_TYPE", "").lower()
     desktop_env = os.environ.get("XDG_CURRENT_DESKTOP", "").lower()
 
@@ -73,7 +76,18 @@ def _get_backend():
         f"libshot currently supports Wayland and X11."
     )
 
-def capture(*, region=None, monitor=1):
+def preload():
+    """Selects and initializes the backend ahead of the first capture.
+
+    Useful for long-running services that want the first interactive
+    screenshot to start without the backend import and setup cost.
+
+    Returns:
+        The initialized backend instance.
+    """
+    return _get_backend()
+
+def capture(*, region=None, monitor=1, as_array=False):
     """Captures a screenshot of a given region or the full screen.
 
     Args:
@@ -82,14 +96,18 @@ def capture(*, region=None, monitor=1):
                                   monitor. Defaults to None.
         monitor (int, optional): The monitor number to capture, starting from 1.
                                  Note: This is ignored on Wayland. Defaults to 1.
+        as_array (bool, optional): Return an RGB NumPy array of shape
+                                   (height, width, 3) instead of a Pillow Image.
+                                   Requires numpy. Defaults to False.
 
     Returns:
-        A Pillow Image object of the captured screen area, or None if failed.
+        A Pillow Image object (or NumPy array) of the captured screen area,
+        or None if failed.
     """
     backend = _get_backend()
-    return backend.capture(region=region, monitor=monitor)
+    return backend.capture(region=region, monitor=monitor, as_array=as_array)
 
-def capture_interactive():
+def capture_interactive(*, as_array=False):
     """
     Performs an interactive screenshot session.
 
@@ -99,11 +117,18 @@ def capture_interactive():
     - On other Wayland desktops: Uses the xdg-desktop-portal.
     - On X11: Uses a custom Pygame-based overlay for selection.
 
+    Args:
+        as_array (bool, optional): Return an RGB NumPy array of shape
+                                   (height, width, 3) instead of a Pillow Image.
+                                   On X11 the array is built straight from the
+                                   raw capture buffer. Defaults to False.
+
     Returns:
-        A Pillow Image object of the captured screen area, or None if cancelled.
+        A Pillow Image object (or NumPy array) of the captured screen area,
+        or None if cancelled.
     """
     backend = _get_backend()
-    return backend.capture_interactive()
+    return backend.capture_interactive(as_array=as_array)
 
 def list_monitors():
     """Lists available display monitors.
@@ -15,19 +15,44 @@ from urllib.request import url2pathname
 import subprocess
 import io
 
-import mss
+# mss and Pillow are imported where they are used: importing libshot (or just
+# selecting a backend) should not pay for the capture libraries up front.
 from jeepney.io.blocking import open_dbus_connection
 from jeepney.wrappers import MessageGenerator, new_method_call
-from PIL import Image
 
 from .exceptions import InvalidRegionError, UnsupportedError
 
 
+def _from_mss(sct_img, as_array=False):
+    """
+    Converts an mss screenshot into a Pillow Image or an RGB NumPy array.
+
+    The array path reads the raw BGRA buffer directly, so no intermediate
+    Pillow image or encoded file is created.
+    """
+    if not as_array:
+        from PIL import Image
+        return Image.frombytes("RGB", sct_img.size, sct_img.bgra, "raw", "BGRX")
+    import numpy as np
+    width, height = sct_img.size
+    bgra = np.frombuffer(sct_img.bgra, dtype=np.uint8).reshape(height, width, 4)
+    return np.ascontiguousarray(bgra[:, :, 2::-1])
+
+
+def _from_pil(img, as_array=False):
+    """Converts a loaded Pillow Image into RGB, optionally as a NumPy array."""
+    rgb = img.convert("RGB")
+    if not as_array:
+        return rgb
+    import numpy as np
+    return np.asarray(rgb)
+
+
 class BaseBackend(ABC):
     """Abstract base class for a screenshot backend."""
 
     @abstractmethod
-    def capture(self, *, region=None, monitor=1):
+    def capture(self, *, region=None, monitor=1, as_array=False):
         """Capture a screenshot."""
         pass
 
@@ -37,7 +62,7 @@ class BaseBackend(ABC):
         pass
 
     @abstractmethod
-    def capture_interactive(self):
+    def capture_interactive(self, *, as_array=False):
         """Perform an interactive screenshot session."""
         pass
 
@@ -75,10 +100,11 @@ class GnomeWaylandBackend(BaseBackend):
         if hasattr(self, 'conn') and self.conn:
             self.conn.close()
 
-    def capture(self, *, region=None, monitor=1):
+    def capture(self, *, region=None, monitor=1, as_array=False):
         # This backend is primarily for interactive capture.
         if region:
             # Re-route to the main capture method which can handle regions
+            import mss
             with mss.mss() as sct:
                 capture_area = {
                     "top": region[1], "left": region[0],
@@ -86,7 +112,7 @@ class GnomeWaylandBackend(BaseBackend):
                     "mon": monitor
                 }
                 sct_img = sct.grab(capture_area)
-                return Image.frombytes("RGB", sct_img.size, sct_img.bgra, "raw", "BGRX")
+                return _from_mss(sct_img, as_array)
         else:
             raise UnsupportedError("Non-interactive, full-screen capture is not implemented for the GNOME backend yet.")
 
@@ -94,10 +120,11 @@ class GnomeWaylandBackend(BaseBackend):
         # Same as generic Wayland backend
         return [{'left': 0, 'top': 0, 'width': 1920, 'height': 1080}]
 
-    def capture_interactive(self):
+    def capture_interactive(self, *, as_array=False):
         """
         Uses org.gnome.Shell.Screenshot for a seamless interactive capture.
         """
+        from PIL import Image
         try:
             # Step 1: Call SelectArea to let the user select a region. This is a blocking call.
             select_area_msg = new_method_call(self.screenshot_iface, "SelectArea")
@@ -130,7 +157,7 @@ class GnomeWaylandBackend(BaseBackend):
             with Image.open(filepath) as img:
                 img.load()
                 os.remove(filepath)  # Clean up the temp file
-                return img.convert("RGB")
+                return _from_pil(img, as_array)
 
         except Exception as e:
             print(f"INFO: GNOME-specific backend failed ({e}). Falling back to gnome-screenshot.")
@@ -151,7 +178,7 @@ class GnomeWaylandBackend(BaseBackend):
                     with Image.open(filepath) as img:
                         img.load()
                         os.remove(filepath)
-                        return img.convert("RGB")
+                        return _from_pil(img, as_array)
                 else:
                     print("INFO: User cancelled screenshot via gnome-screenshot or it failed.")
                     if os.path.exists(filepath):
@@ -198,7 +225,8 @@ class WaylandBackend(BaseBackend):
 
         return response_signal.body[1]
 
-    def capture(self, *, region=None, monitor=1):
+    def capture(self, *, region=None, monitor=1, as_array=False):
+        from PIL import Image
         handle_token = f"libshot_{uuid.uuid4().hex}"
         options = {
             "handle_token": ('s', handle_token),
@@ -224,7 +252,7 @@ class WaylandBackend(BaseBackend):
             try:
                 with Image.open(image_path) as img:
                     img.load()
-                    return img.convert("RGB")
+                    return _from_pil(img, as_array)
             except FileNotFoundError:
                 time.sleep(0.1)
         
@@ -233,15 +261,16 @@ class WaylandBackend(BaseBackend):
     def list_monitors(self):
         return [{'left': 0, 'top': 0, 'width': 1920, 'height': 1080}]
 
-    def capture_interactive(self):
+    def capture_interactive(self, *, as_array=False):
         """Uses the portal's interactive mode. Passing any region triggers it."""
-        return self.capture(region=(1, 1, 1, 1))
+        return self.capture(region=(1, 1, 1, 1), as_array=as_array)
 
 
 class X11Backend(BaseBackend):
     """Screenshot backend for X11 using the 'mss' library."""
 
-    def capture(self, *, region=None, monitor=1):
+    def capture(self, *, region=None, monitor=1, as_array=False):
+        import mss
         try:
             with mss.mss() as sct:
                 if monitor <= 0 or monitor >= len(sct.monitors):
@@ -257,20 +286,23 @@ class X11Backend(BaseBackend):
                     capture_area = sct.monitors[monitor]
 
                 sct_img = sct.grab(capture_area)
-                return Image.frombytes("RGB", sct_img.size, sct_img.bgra, "raw", "BGRX")
+                return _from_mss(sct_img, as_array)
         except mss.exception.ScreenShotError as e:
             raise InvalidRegionError(f"Failed to capture screen with mss: {e}") from e
 
     def list_monitors(self):
+        import mss
         with mss.mss() as sct:
             return sct.monitors[1:]
 
-    def capture_interactive(self):
+    def capture_interactive(self, *, as_array=False):
         """Provides an interactive region selection overlay using pygame for X11."""
         try:
             import pygame
         except ImportError:
             raise ImportError("Pygame is required for interactive screenshots on X11. Please install it.")
+        import mss
+        from PIL import Image
 
         pygame.init()
         try:
@@ -330,6 +362,6 @@ class X11Backend(BaseBackend):
             pygame.quit()
 
         if selection_rect:
-            return self.capture(region=selection_rect)
+            return self.capture(region=selection_rect, as_array=as_array)
         
         return None
\ No newline at end of file
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+常驻服务的内存管理：空闲卸载模型，并遵守内存预算。
+
+- 空闲超时：OCR / TTS 模型超过 model_idle_timeout_s 秒未被使用时卸载。
+- 内存预算：进程 RSS 超过 memory_budget_mb 时，按最近最少使用的顺序卸载模型，
+  即使它们还没有到空闲超时。
+- 卸载后执行垃圾回收并调用 glibc 的 malloc_trim，把空闲的堆内存还给操作系统。
+- 下一次请求到来时在后台重新加载 (与用户框选截图区域并行)，并记录重新加载耗时。
+
+请求正在运行时不会卸载任何模型。
+"""
+
+import ctypes
+import ctypes.util
+import gc
+import logging
+import os
+import sys
+import threading
+
+from components import READY
+from metrics import metrics as default_metrics
+
+logger = logging.getLogger("AMD-HELPER")
+
+# 默认值与 config.json 保持一致；0 表示不启用
+DEFAULT_IDLE_TIMEOUT_S = 600
+DEFAULT_MEMORY_BUDGET_MB = 0
+# 检查间隔的上限 (秒)
+MAX_CHECK_INTERVAL_S = 30
+
+_libc = None
+
+
+def rss_mb() -> float:
+    """当前进程的常驻内存 (MB)。"""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def trim_allocator():
+    """执行垃圾回收，并尽可能把空闲内存归还给操作系统。"""
+    global _libc
+    gc.collect()
+    # torch 已经加载时，同时释放 CUDA 缓存 (只检查，不主动导入 torch)
+    torch = sys.modules.get("torch")
+    if torch is not None:
+        try:
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
+        except Exception:
+            pass
+    try:
+        if _libc is None:
+            _libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6")
+        _libc.malloc_trim(0)
+    except (OSError, AttributeError):
+        # 非 glibc 系统没有 malloc_trim
+        pass
+
+
+class MemoryManager:
+    """
+    监视组件的使用情况，在空闲或超出预算时卸载模型。
+
+    :param components: 名称 -> LazyComponent 的字典 (OcrAndTtsProcessor.components)。
+    :param evictable: 可以卸载的组件名称。
+    :param release: 释放被卸载实例的回调，签名为 release(name, value)。
+    :param is_busy: 返回当前是否有请求正在运行的函数，运行期间不卸载。
+    :param idle_timeout_s: 空闲超时 (秒)，0 表示不按空闲时间卸载。
+    :param memory_budget_mb: 内存预算 (MB)，0 表示不限制。
+    """
+
+    def __init__(self, components: dict, evictable=("ocr", "tts"), release=None, is_busy=None,
+                 idle_timeout_s: float = DEFAULT_IDLE_TIMEOUT_S,
+                 memory_budget_mb: float = DEFAULT_MEMORY_BUDGET_MB, metrics=None):
+        self.components = components
+        self.evictable = [name for name in evictable if name in components]
+        self._release = release
+        self._is_busy = is_busy or (lambda: False)
+        self.idle_timeout_s = idle_timeout_s
+        self.memory_budget_mb = memory_budget_mb
+        self.metrics = metrics or default_metrics
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.idle_timeout_s or self.memory_budget_mb)
+
+    def start(self):
+        """启动后台检查线程 (空闲超时和预算都未启用时不启动)。"""
+        if not self.enabled or self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="memory-manager", daemon=True)
+        self._thread.start()
+        logger.info(f"内存管理已启用: 空闲超时 {self.idle_timeout_s}s, 预算 {self.memory_budget_mb or '不限'} MB")
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+
+    def _check_interval(self) -> float:
+        interval = MAX_CHECK_INTERVAL_S
+        if self.idle_timeout_s:
+            interval = min(interval, max(1.0, self.idle_timeout_s / 4))
+        return interval
+
+    def _run(self):
+        while not self._stop.wait(self._check_interval()):
+            try:
+                self.check()
+            except Exception as e:
+                logger.warning(f"内存检查失败: {e}")
+
+    def loaded(self) -> list[str]:
+        """当前已加载的可卸载组件。"""
+        return [name for name in self.evictable if self.components[name].state == READY]
+
+    def prefetch(self):
+        """在后台重新加载已卸载的组件 (请求到来时调用，与截图并行)。"""
+        for name in self.evictable:
+            if self.components[name].start():
+                logger.info(f"后台重新加载组件 {name}...")
+
+    def check(self) -> list[str]:
+        """
+        执行一次检查，卸载空闲或超出预算时最久未使用的组件。
+
+        :return: 本次卸载的组件名称。
+        """
+        with self._lock:
+            current = rss_mb()
+            self.metrics.set_gauge('rss_mb', round(current, 1))
+            if self._is_busy():
+                return []
+            unloaded = []
+            if self.idle_timeout_s:
+                for name in self.loaded():
+                    if self.components[name].idle_seconds >= self.idle_timeout_s:
+                        if self._unload(name, "空闲超时"):
+                            unloaded.append(name)
+            if self.memory_budget_mb and current > self.memory_budget_mb:
+                # 按最近最少使用的顺序卸载，直到回到预算以内
+                for name in sorted(self.loaded(), key=lambda n: self.components[n].last_used):
+                    if rss_mb() <= self.memory_budget_mb or self._is_busy():
+                        break
+                    if self._unload(name, f"RSS {rss_mb():.0f} MB 超出预算 {self.memory_budget_mb} MB"):
+                        unloaded.append(name)
+            if unloaded:
+                after = rss_mb()
+                self.metrics.set_gauge('rss_mb', round(after, 1))
+                logger.info(f"已卸载 {', '.join(unloaded)}，RSS {current:.0f} MB -> {after:.0f} MB")
+            return unloaded
+
+    def _unload(self, name: str, reason: str) -> bool:
+        # 再检查一次，缩小与刚到达的请求之间的竞争窗口
+        if self._is_busy():
+            return False
+        value = self.components[name].unload()
+        if value is None:
+            return False
+        logger.info(f"卸载组件 {name} ({reason})")
+        if self._release is not None:
+            try:
+                self._release(name, value)
+            except Exception as e:
+                logger.warning(f"释放组件 {name} 失败: {e}")
+        del value
+        trim_allocator()
+        self.metrics.incr(f'unload_{name}')
+        return True
+
+    def status(self) -> dict:
+        return {
+            "rss_mb": round(rss_mb(), 1),
+            "memory_budget_mb": self.memory_budget_mb,
+            "idle_timeout_s": self.idle_timeout_s,
+            "loaded": self.loaded(),
+        }
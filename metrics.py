@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+进程内的轻量级指标收集：计数器、仪表值和耗时样本。
+
+所有方法都是线程安全的，可以在 D-Bus 线程、托盘线程和处理线程中同时调用。
+模块级的 `metrics` 是全局默认实例。
+"""
+
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# 每个耗时指标保留的最近样本数
+MAX_SAMPLES = 512
+
+
+def percentile(values, pct: float) -> float:
+    """计算百分位数 (线性插值)，空列表返回 0.0。"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    if len(ordered) == 1:
+        return float(ordered[0])
+    rank = (len(ordered) - 1) * pct / 100.0
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return float(ordered[low] + (ordered[high] - ordered[low]) * (rank - low))
+
+
+class Metrics:
+    """指标注册表。"""
+
+    def __init__(self, max_samples: int = MAX_SAMPLES):
+        self._lock = threading.Lock()
+        self._max_samples = max_samples
+        self._counters = {}
+        self._gauges = {}
+        self._samples = {}
+
+    def incr(self, name: str, amount: int = 1):
+        """增加一个计数器。"""
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def set_gauge(self, name: str, value):
+        """设置一个仪表值 (例如队列深度)。"""
+        with self._lock:
+            self._gauges[name] = value
+
+    def observe(self, name: str, seconds: float):
+        """记录一次耗时样本 (秒)。"""
+        with self._lock:
+            samples = self._samples.get(name)
+            if samples is None:
+                samples = self._samples[name] = deque(maxlen=self._max_samples)
+            samples.append(seconds)
+
+    @contextmanager
+    def timer(self, name: str):
+        """以上下文管理器的方式记录一段代码的耗时。"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def counter(self, name: str) -> int:
+        with self._lock:
+            return self._counters.get(name, 0)
+
+    def gauge(self, name: str, default=None):
+        with self._lock:
+            return self._gauges.get(name, default)
+
+    def samples(self, name: str) -> list:
+        """返回某个耗时指标的全部已保留样本。"""
+        with self._lock:
+            return list(self._samples.get(name, ()))
+
+    def snapshot(self) -> dict:
+        """返回所有指标的可序列化快照。"""
+        with self._lock:
+            timings = {}
+            for name, samples in self._samples.items():
+                values = list(samples)
+                timings[name] = {
+                    "count": len(values),
+                    "last": values[-1] if values else 0.0,
+                    "p50": percentile(values, 50),
+                    "p95": percentile(values, 95),
+                }
+            return {
+                "counters": dict(self._counters),
+                "gauges": dict(self._gauges),
+                "timings": timings,
+            }
+
+    def reset(self, max_samples: int = None):
+        """
+        清空所有指标。
+
+        :param max_samples: 同时调整每个耗时指标保留的样本数 (例如基准测试需要保留全部样本)。
+        """
+        with self._lock:
+            if max_samples is not None:
+                self._max_samples = max_samples
+            self._counters.clear()
+            self._gauges.clear()
+            self._samples.clear()
+
+
+# 全局默认实例
+metrics = Metrics()
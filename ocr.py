@@ -1,42 +1,280 @@
 from abc import ABC, abstractmethod
 from pathlib import Path
+import functools
+import logging
+import os
 import re
+import sys
+import time
+
+logger = logging.getLogger("AMD-HELPER")
+
+def as_image_input(image):
+    """
+    规范化 OCR 的图片输入。
+
+    - 文件路径 (str 或 PathLike) 原样返回为 str，文件不存在时返回 None。
+    - NumPy 数组原样返回 (不复制)。
+    - 其他支持缓冲区协议或 __array_interface__ 的对象 (例如 PIL Image、memoryview)
+      通过 numpy.asarray 转换为数组。
+    - 空输入返回 None。
+    """
+    if image is None:
+        return None
+    if isinstance(image, (str, os.PathLike)):
+        path = os.fspath(image)
+        return path if path and Path(path).exists() else None
+    import numpy as np
+    array = image if isinstance(image, np.ndarray) else np.asarray(image)
+    if array.size == 0 or array.ndim not in (2, 3):
+        return None
+    return array
+
+def detect_language(text: str) -> str:
+    """
+    一个简单的启发式语言检测器。
+    如果文本中包含中文字符，则认为是'zh'，否则认为是'en'。
+    """
+    if re.search(r'[\u4e00-\u9fff]', text):
+        return 'zh'
+    return 'en'
+
+def default_threads() -> int:
+    """默认的推理线程数：留出一个核给托盘、D-Bus 和音频线程。"""
+    return max(1, (os.cpu_count() or 1) - 1)
+
+def _warmup_image():
+    """预热用的图片：白底黑字的一行文字，用 Pillow 的内置字体绘制后放大，不依赖系统字体。"""
+    import numpy as np
+    from PIL import Image, ImageDraw, ImageFont
+
+    image = Image.new("RGB", (180, 24), (255, 255, 255))
+    ImageDraw.Draw(image).text((6, 6), "Warm-up OCR 0123", font=ImageFont.load_default(), fill=(0, 0, 0))
+    return np.asarray(image.resize((360, 48)))
+
+
+def _inference_mode(method):
+    """
+    在 torch.inference_mode() 中运行方法：不记录自动求导信息，也不维护张量的版本计数。
+    只在 torch 已经被导入时生效，ONNX Runtime 下不会因此导入 torch。
+    """
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        torch = sys.modules.get("torch")
+        if torch is None:
+            return method(*args, **kwargs)
+        with torch.inference_mode():
+            return method(*args, **kwargs)
+    return wrapper
+
+class OcrResult:
+    """
+    一张图片的识别结果。
+
+    :param text: 识别出的文本。
+    :param lang: 检测到的语言代码 ('zh' 或 'en')。
+    :param seconds: 这张图片的总耗时 (秒)。批量识别中共享的阶段按图片数平均分摊。
+    :param timings: 各阶段的耗时 (秒)，例如 {'preprocess': ..., 'detect': ..., 'recognize': ...}。
+    :param error: 识别失败时的错误描述。
+    :param detection: 这次识别选用的检测参数及其依据 (见 ocr_policy.DetectionPolicy.choose)。
+    """
+
+    def __init__(self, text: str = "", lang: str = "en", seconds: float = 0.0, timings: dict = None,
+                 error: str = None, detection: dict = None):
+        self.text = text
+        self.lang = lang
+        self.seconds = seconds
+        self.timings = timings or {}
+        self.error = error
+        self.detection = detection
+
+    def as_tuple(self) -> tuple[str, str]:
+        """(文本, 语言)，与 OcrEngine.recognize 的返回值相同。"""
+        return self.text, self.lang
+
+    def __repr__(self):
+        return f"OcrResult({self.lang}, {len(self.text)} 字, {self.seconds * 1000:.0f}ms)"
 
 class OcrEngine(ABC):
     """OCR引擎的抽象基类 (接口)。"""
     @abstractmethod
-    def recognize(self, image_path: str) -> tuple[str, str]:
+    def recognize(self, image) -> tuple[str, str]:
         """
-        从给定的图片路径中识别文字。
+        从给定的图片中识别文字。
 
-        :param image_path: 图片文件的路径。
+        :param image: 内存中的 RGB/灰度 NumPy 数组 (或支持缓冲区协议的对象)，
+                      也可以是图片文件的路径。
         :return: 一个元组，包含 (识别出的字符串文本, 检测到的语言代码 'zh' 或 'en')。
         """
         pass
 
+    def recognize_batch(self, images) -> list[OcrResult]:
+        """
+        一次识别多张图片 (批处理工具、多区域截图、监视模式)。
+        默认逐张调用 recognize；能够合并推理的引擎应当重写这个方法。
+
+        :param images: 图片列表，每一项可以是 recognize 接受的任意输入。
+        :return: 与输入一一对应的 OcrResult 列表。
+        """
+        results = []
+        for image in images:
+            start = time.perf_counter()
+            text, lang = self.recognize(image)
+            seconds = time.perf_counter() - start
+            results.append(OcrResult(text, lang, seconds, {"ocr": seconds}))
+        return results
+
+    def recognize_stream(self, image):
+        """
+        流式识别：按阅读顺序逐段产出 (文本片段, 语言)，下游可以在其余部分仍在识别时开始朗读。
+        所有文本片段直接拼接起来就是 recognize 返回的完整文本；语言为到目前为止检测到的语言。
+        默认整张图片识别完成后一次产出；能够逐行识别的引擎应当重写这个方法。
+        """
+        text, lang = self.recognize(image)
+        if text:
+            yield text, lang
+
+    def warmup(self) -> dict:
+        """
+        用一张合成的小图片连续识别两次，让首次调用的延迟初始化 (算子选择、内存分配器扩张等)
+        在后台加载时完成，而不是落在用户的第一次请求上。首次与稳定后的耗时写入日志和指标。
+
+        :return: {"first": 首次耗时, "steady": 第二次耗时} (秒)。
+        """
+        from metrics import metrics
+
+        image = _warmup_image()
+        timings = []
+        for _ in range(2):
+            start = time.perf_counter()
+            self.recognize(image)
+            timings.append(time.perf_counter() - start)
+        metrics.observe('ocr_warmup_first', timings[0])
+        metrics.observe('ocr_warmup_steady', timings[1])
+        logger.info(f"OCR 预热完成: 首次 {timings[0] * 1000:.0f}ms，稳定后 {timings[1] * 1000:.0f}ms")
+        return {"first": timings[0], "steady": timings[1]}
+
+    def close(self):
+        """释放引擎占用的资源 (模型、工作进程等)。默认不做任何事。"""
+        pass
+
 class EasyOcrEngine(OcrEngine):
     """使用 EasyOCR 实现的OCR引擎。"""
-    def __init__(self, languages: list[str] = None, gpu: bool = False):
+    def __init__(self, languages: list[str] = None, gpu: bool = False, worker_processes: int = 0,
+                 preprocess: bool = True, tile_threshold_px: int = 0, tile_size: int = None,
+                 tile_workers: int = None, batch_size: int = 8, workers: int = 0, routing: bool = True,
+                 max_readers: int = 3, runtime: str = "torch", quantize: bool = None, threads: int = 0,
+                 interop_threads: int = 1, adaptive_detection: bool = True, policy_file: str = None):
         """
         初始化 EasyOCR 引擎。
         首次运行时会自动下载所需语言的模型。
         
         :param languages: 需要识别的语言列表, 例如 ['ch_sim', 'en']。
         :param gpu: 是否使用GPU加速。
+        :param worker_processes: 大于 0 时，模型在这么多个独立的工作进程中常驻，
+                                 本进程不加载 torch，图片通过共享内存传递。
+        :param preprocess: 识别前是否裁掉空白边框、转为灰度并把文字缩放到合适的大小。
+        :param tile_threshold_px: 图片像素数超过这个值时切成重叠的块并行识别，0 表示不分块。
+        :param tile_size: 分块的边长 (像素)，默认 1024。
+        :param tile_workers: 同时识别的块数，默认为工作进程数 (没有工作进程时为 CPU 核数，最多 4)。
+        :param batch_size: 识别模型每批处理的文字块数 (传给 EasyOCR 的 batch_size)。
+        :param workers: EasyOCR 准备文字块的数据加载线程数 (传给 EasyOCR 的 workers)。
+        :param routing: 是否按书写系统选择识别模型 (拉丁字母交给只含拉丁语言的小模型)，
+                        为 False 时所有文字块都由一个包含全部语言的模型识别。
+        :param max_readers: 按需加载的识别模型 (每种 CJK 语言一个) 同时常驻的上限。
+        :param runtime: 'torch' 使用 easyocr 本身；'onnx' 在 ONNX Runtime 中运行导出的模型
+                        (见 ocr_onnx.py)，不导入 torch。
+        :param quantize: 识别模型的全连接层和 LSTM 是否使用 int8 动态量化。None 表示运行方式的默认值：
+                         torch 下为 EasyOCR 自身的默认 (已经是 int8，由 EasyOCR 在加载时转换)；
+                         ONNX Runtime 下为浮点模型，显式为 True 时才使用量化后的模型 (缓存在磁盘上，只转换一次)，
+                         开启前应先用 bench.py --suite quantization --runtime onnx 确认 CER 的变化可以接受。
+        :param threads: 推理的 intra-op 线程数 (torch.set_num_threads，或 ONNX Runtime 每个会话的线程数)，
+                        0 表示 CPU 核数减一，避免与托盘和 D-Bus 线程争抢。有工作进程时为每个进程的线程数。
+        :param interop_threads: torch 的 inter-op 线程数，0 表示不设置 (只能在进程中第一次推理之前设置)。
+        :param adaptive_detection: 是否按图片大小和文字行高选择检测的 canvas_size 与 mag_ratio
+                                   (见 ocr_policy.py)，为 False 时使用 EasyOCR 的默认值。
+        :param policy_file: 策略表文件，默认 ~/.cache/a.m.d-helper/ocr_policy.json (不存在时使用内置的表)。
         """
-        try:
-            import easyocr
-        except ImportError:
-            print("缺少 easyocr 依赖包。")
-            print("请运行 'pip install easyocr' 来安装它。")
-            raise
-            
         if languages is None:
             languages = ['ch_sim', 'en']
-        
+
+        self.preprocess = preprocess
+        self.batch_size = max(1, batch_size)
+        self.workers = workers
+        self.tile_threshold_px = tile_threshold_px
+        self.tile_size = tile_size
+        self.tile_workers = tile_workers or (worker_processes if worker_processes > 0
+                                             else min(4, os.cpu_count() or 1))
+
+        self.reader = None
+        self.router = None
+        self._pool = None
+        self.policy = None
+        if adaptive_detection:
+            from ocr_policy import DetectionPolicy
+            self.policy = DetectionPolicy.load(policy_file)
+        if worker_processes > 0:
+            from ocr_pool import OcrWorkerPool
+            self._pool = OcrWorkerPool(worker_processes, languages, gpu=gpu,
+                                       engine_options={"batch_size": self.batch_size, "workers": workers,
+                                                       "routing": routing, "max_readers": max_readers,
+                                                       "runtime": runtime, "quantize": quantize,
+                                                       "interop_threads": interop_threads,
+                                                       "adaptive_detection": adaptive_detection,
+                                                       "policy_file": policy_file},
+                                       torch_threads=threads or None)
+            try:
+                self._pool.start()
+            except Exception:
+                self._pool.close()
+                raise
+            return
+
+        if runtime == "onnx":
+            try:
+                from ocr_onnx import OnnxReader
+            except ImportError:
+                print("缺少 onnxruntime 或 opencv 依赖包。")
+                print("请运行 'pip install onnxruntime opencv-python-headless' 来安装它们。")
+                raise
+
+            def create_reader(langs, detector):
+                return OnnxReader(langs, detector=detector, threads=threads or default_threads(),
+                                  quantize=bool(quantize))
+        else:
+            try:
+                import easyocr
+                import torch
+            except ImportError:
+                print("缺少 easyocr 依赖包。")
+                print("请运行 'pip install easyocr' 来安装它。")
+                raise
+            torch.set_num_threads(threads or default_threads())
+            if interop_threads > 0:
+                try:
+                    torch.set_num_interop_threads(interop_threads)
+                except RuntimeError as e:
+                    # 本进程已经做过并行计算 (例如之前加载过模型)，保留原来的设置
+                    print(f"⚠️ 无法设置 torch 的 inter-op 线程数: {e}")
+
+            # quantize 为 None 时保留 EasyOCR 自身的默认
+            options = {} if quantize is None else {"quantize": quantize}
+
+            def create_reader(langs, detector):
+                return easyocr.Reader(list(langs), gpu=gpu, detector=detector, **options)
+
         print("正在初始化 EasyOCR 引擎... (首次运行需要下载模型，请耐心等待)")
         try:
-            self.reader = easyocr.Reader(languages, gpu=gpu)
+            if routing:
+                from ocr_router import ReaderPool, RecognizerRouter, language_groups
+                latin, others = language_groups(languages)
+                readers = ReaderPool(create_reader, max_readers=max_readers, pinned=[latin, *others[:1]])
+                self.router = RecognizerRouter(readers, languages, self.batch_size, self.workers)
+                self.router.preload()
+                # 检测只用拉丁模型附带的检测模型
+                self.reader = self.router.detector
+            else:
+                self.reader = create_reader(tuple(languages), True)
             
             # --- 创建初始化完成标志 ---
             try:
@@ -51,67 +289,597 @@ class EasyOcrEngine(OcrEngine):
                 print(f"✗ 创建初始化标志文件失败: {flag_e}")
             # --- 标志创建结束 ---
 
-            print("✅ EasyOCR 引擎初始化完成。")
+            print(f"✅ EasyOCR 引擎初始化完成{' (ONNX Runtime)' if runtime == 'onnx' else ''}。")
         except Exception as e:
             print(f"❌ 初始化EasyOCR失败: {e}")
-            print("请检查是否安装了PyTorch。如果没有，请访问 https://pytorch.org/ 安装。")
+            if runtime == "onnx":
+                print("请先运行 'python3 ocr_onnx.py export' 导出 ONNX 模型。")
+            else:
+                print("请检查是否安装了PyTorch。如果没有，请访问 https://pytorch.org/ 安装。")
             raise
 
     def _detect_language(self, text: str) -> str:
+        return detect_language(text)
+
+    @_inference_mode
+    def read_paragraphs(self, image, detection: dict = None) -> list[str]:
         """
-        一个简单的启发式语言检测器。
-        如果文本中包含中文字符，则认为是'zh'，否则认为是'en'。
+        识别图片并返回段落文本列表。
+        启用了工作进程池时在工作进程中运行，否则在本进程中运行。
+
+        :param detection: 检测参数 (见 _choose_detection)，为 None 时按图片选择。
         """
-        if re.search(r'[\u4e00-\u9fff]', text):
-            return 'zh'
-        return 'en'
+        from ocr_policy import detection_kwargs
+        if detection is None:
+            detection = self._choose_detection(image)
+        if (self.tile_threshold_px and not isinstance(image, str)
+                and image.shape[0] * image.shape[1] > self.tile_threshold_px):
+            return self.read_tiled(image, detection)
+        if self._pool is not None:
+            return self._pool.read_paragraphs(image, detection)
+        if self.router is not None:
+            from ocr_tiling import TextBox, reading_order
+            return reading_order([TextBox.from_easyocr(result) for result in self._read_routed(image, detection)])
+        # detail=0 表示只返回文本内容
+        # paragraph=True 会将邻近的文本块合并成段落
+        return self.reader.readtext(image, detail=0, paragraph=True, batch_size=self.batch_size,
+                                    workers=self.workers, **detection_kwargs(detection))
 
-    def recognize(self, image_path: str) -> tuple[str, str]:
+    @_inference_mode
+    def read_boxes(self, image, detection: dict = None) -> list[tuple]:
+        """
+        识别图片并返回文字框列表 [(四个角点, 文本, 置信度), ...]，不合并段落。
+        结果只包含 Python 内置类型，可以在进程之间传递。
         """
-        使用 EasyOCR 从图片中提取文字。
+        from ocr_policy import detection_kwargs
+        if detection is None:
+            detection = self._choose_detection(image)
+        if self._pool is not None:
+            return self._pool.read_boxes(image, detection)
+        if self.router is not None:
+            return self._read_routed(image, detection)
+        return [([[float(x), float(y)] for x, y in points], text, float(confidence))
+                for points, text, confidence in self.reader.readtext(image, detail=1, paragraph=False,
+                                                                      batch_size=self.batch_size,
+                                                                      workers=self.workers,
+                                                                      **detection_kwargs(detection))]
+
+    @_inference_mode
+    def _recognize_regions(self, image, horizontal: list, free: list) -> list[tuple]:
+        """识别已检测出的文字框，返回 [(四个角点, 文本, 置信度), ...] (只含 Python 内置类型)。"""
+        if self.router is not None:
+            from preprocess import to_gray
+            results = self.router.recognize(to_gray(image), horizontal, free)
+        else:
+            results = self.reader.recognize(image, horizontal, free, detail=1, paragraph=False,
+                                            batch_size=self.batch_size, workers=self.workers)
+        return [([[float(x), float(y)] for x, y in points], text, float(confidence))
+                for points, text, confidence in results]
+
+    @staticmethod
+    def _load_image(path: str):
+        """读取图片文件为 RGB 数组 (按书写系统分流时需要像素来判断)。"""
+        import numpy as np
+        from PIL import Image
+        with Image.open(path) as opened:
+            return np.asarray(opened.convert("RGB"))
+
+    def _read_routed(self, image, detection: dict = None) -> list[tuple]:
+        """检测一次，再按书写系统把文字框分给不同的识别模型。"""
+        if isinstance(image, str):
+            image = self._load_image(image)
+        horizontal, free = self._detect(image, detection)
+        return self._recognize_regions(image, horizontal[0], free[0])
+
+    @_inference_mode
+    def _detect(self, image, detection: dict = None) -> tuple[list, list]:
+        from ocr_policy import detection_kwargs
+        return self.reader.detect(image, **detection_kwargs(detection))
+
+    def _choose_detection(self, image, text_height: float = None) -> dict | None:
+        """
+        按图片的长边和文字行高选择检测参数，并记录到指标中。
+        未启用自适应检测或图片是文件路径时返回 None (使用 EasyOCR 的默认值)。
+        """
+        if self.policy is None or isinstance(image, str):
+            return None
+        from metrics import metrics
+        choice = self.policy.choose(image, text_height)
+        metrics.set_gauge('ocr_canvas_size', choice["canvas_size"])
+        metrics.set_gauge('ocr_mag_ratio', choice["mag_ratio"])
+        logger.info(f"检测参数: canvas_size={choice['canvas_size']}, mag_ratio={choice['mag_ratio']} "
+                    f"(长边 {choice['long_side']}px, 行高 {choice['text_height']:.0f}px, 规则 {choice['rule']})")
+        return choice
+
+    def read_tiled(self, image, detection: dict = None) -> list[str]:
+        """
+        把大图切成互相重叠的块并行识别，合并接缝处的重复后按阅读顺序返回段落文本列表。
+        有工作进程池时各块分散到不同的工作进程，否则在本进程的多个线程中运行 (torch 推理时释放 GIL)。
+        各块使用为整张图片选择的检测参数 (文字大小在各块之间是一致的)。
+        """
+        from concurrent.futures import ThreadPoolExecutor
+        from metrics import metrics
+        from ocr_tiling import DEFAULT_TILE_SIZE, TextBox, merge_tiles, plan_tiles, reading_order
+
+        tiles = plan_tiles(image.shape[0], image.shape[1], self.tile_size or DEFAULT_TILE_SIZE)
+
+        def read_tile(index, tile):
+            x0, y0, x1, y1 = tile
+            return [TextBox.from_easyocr(result, x0, y0, index)
+                    for result in self.read_boxes(image[y0:y1, x0:x1], detection)]
+
+        with ThreadPoolExecutor(max_workers=max(1, min(len(tiles), self.tile_workers)),
+                                thread_name_prefix="ocr-tile") as executor:
+            boxes = [box for tile_boxes in executor.map(read_tile, range(len(tiles)), tiles) for box in tile_boxes]
+        metrics.set_gauge('ocr_tiles', len(tiles))
+        return reading_order(merge_tiles(boxes))
+
+    def close(self):
+        """关闭工作进程池 (如果有)，并释放本进程中的模型。"""
+        if self._pool is not None:
+            self._pool.close()
+            self._pool = None
+        if self.router is not None:
+            self.router.pool.close()
+            self.router = None
+        self.reader = None
+
+    def warmup(self) -> dict:
+        """工作进程在报告就绪之前已各自预热，这里只预热本进程中的模型。"""
+        if self._pool is not None:
+            return {}
+        return super().warmup()
+
+    def _needs_tiling(self, image) -> bool:
+        return bool(self.tile_threshold_px) and image.shape[0] * image.shape[1] > self.tile_threshold_px
+
+    @_inference_mode
+    def _read_group(self, images: list, detection: dict = None) -> tuple[list[list[str]], list[dict]]:
+        """
+        在本进程中批量识别形状相同的一组图片：检测阶段合并为一批 (共用一组检测参数)，
+        各图片的文字块按 batch_size 分批送入识别模型。
+
+        :return: (每张图片的段落列表, 每张图片的各阶段耗时)。检测耗时按图片数平均分摊。
+        """
+        import numpy as np
+        from ocr_policy import detection_kwargs
+        from preprocess import to_gray
+
+        start = time.perf_counter()
+        if len(images) > 1:
+            # 与 Reader.readtext_batched 相同：检测模型一次处理整批图片
+            batch = np.stack([image if image.ndim == 3 else np.repeat(image[..., None], 3, axis=2)
+                              for image in images])
+            horizontal, free = self.reader.detect(batch, reformat=False, **detection_kwargs(detection))
+        else:
+            horizontal, free = self.reader.detect(images[0], **detection_kwargs(detection))
+        detect_seconds = (time.perf_counter() - start) / len(images)
+
+        paragraphs, timings = [], []
+        for i, image in enumerate(images):
+            start = time.perf_counter()
+            if self.router is not None:
+                from ocr_tiling import TextBox, reading_order
+                paragraphs.append(reading_order([TextBox.from_easyocr(result) for result in
+                                                 self._recognize_regions(image, horizontal[i], free[i])]))
+            else:
+                paragraphs.append(self.reader.recognize(to_gray(image), horizontal[i], free[i], detail=0,
+                                                        paragraph=True, batch_size=self.batch_size,
+                                                        workers=self.workers))
+            timings.append({"detect": detect_seconds, "recognize": time.perf_counter() - start})
+        return paragraphs, timings
+
+    def recognize_batch(self, images) -> list[OcrResult]:
+        """
+        批量识别多张图片，返回每张图片的文本、语言和各阶段耗时。
+
+        - 启用了工作进程池时，各图片同时提交给不同的工作进程。
+        - 否则形状相同的图片合并为一批做检测，文字块按 batch_size 批量识别。
+        - 文件路径和超过分块阈值的大图单独识别。
+        """
+        results = [None] * len(images)
+        prepared = []  # (序号, 图片, 预处理耗时, 检测参数)
+        for index, image in enumerate(images):
+            start = time.perf_counter()
+            image = as_image_input(image)
+            if image is None:
+                print(" OCR 输入的图片无效。 ")
+                results[index] = OcrResult(error="输入的图片无效")
+                continue
+            text_height = None
+            if self.preprocess and not isinstance(image, str):
+                from preprocess import preprocess
+                processed = preprocess(image)
+                image = processed.image
+                # 预处理已经估计过行高 (原图像素)，换算到检测输入的像素
+                text_height = processed.text_height * processed.scale
+            detection = self._choose_detection(image, text_height)
+            prepared.append((index, image, time.perf_counter() - start, detection))
+        if prepared:
+            print(f"🔍 使用 EasyOCR 开始识别{f' {len(prepared)} 张图片' if len(prepared) > 1 else ''}...")
+
+        # 单独识别的图片，以及按形状分组的批次
+        single, groups = [], {}
+        for item in prepared:
+            image = item[1]
+            if self._pool is not None or isinstance(image, str) or self._needs_tiling(image):
+                single.append(item)
+            else:
+                groups.setdefault((image.shape, image.dtype.str), []).append(item)
+
+        def finish(item, paragraphs, timings, error=None):
+            index, _image, preprocess_seconds, detection = item
+            timings = {"preprocess": preprocess_seconds, **timings}
+            text = "\n".join(paragraphs)
+            results[index] = OcrResult(text, self._detect_language(text), sum(timings.values()), timings, error,
+                                       detection)
+
+        def run(item, read, start=None):
+            start = start or time.perf_counter()
+            try:
+                paragraphs = read()
+            except Exception as e:
+                print(f"❌ EasyOCR 识别失败: {e}")
+                finish(item, [], {}, repr(e))
+                return
+            finish(item, paragraphs, {"ocr": time.perf_counter() - start})
+
+        submitted = []
+        for item in single:
+            image = item[1]
+            if self._pool is not None and (isinstance(image, str) or not self._needs_tiling(image)):
+                # 先全部提交，由空闲的工作进程并行处理
+                start = time.perf_counter()
+                try:
+                    submitted.append((item, start, self._pool.submit(image, detection=item[3])))
+                except Exception as e:
+                    print(f"❌ EasyOCR 识别失败: {e}")
+                    finish(item, [], {}, repr(e))
+            else:
+                run(item, lambda image=image, detection=item[3]: self.read_paragraphs(image, detection))
+        for item, start, future in submitted:
+            run(item, future.result, start)
+
+        for items in groups.values():
+            try:
+                # 同一批共用一组检测参数：取文字最小的那张图片的选择 (小字更需要放大)
+                detection = min((item[3] for item in items if item[3]), key=lambda choice: choice["text_height"],
+                                default=None)
+                paragraphs, timings = self._read_group([item[1] for item in items], detection)
+            except Exception as e:
+                print(f"❌ EasyOCR 识别失败: {e}")
+                for item in items:
+                    finish(item, [], {}, repr(e))
+                continue
+            for item, item_paragraphs, item_timings in zip(items, paragraphs, timings):
+                finish((*item[:3], detection), item_paragraphs, item_timings)
+
+        for result in results:
+            if result.error is None:
+                if result.text:
+                    print(f"✅ 识别到文字 ({result.lang}): {result.text}")
+                else:
+                    print("⚠️ 未识别到任何文字。")
+        return results
+
+    def recognize_stream(self, image):
+        """
+        先对整张图片做一次文字检测，把检测框按阅读顺序分成行，再逐行识别并立即产出，
+        不必等所有文字块都识别完。行之间以空格连接，段落之间以换行连接。
+        启用了工作进程池或需要分块识别时无法逐行返回，改为逐段产出。
+        """
+        image = as_image_input(image)
+        if image is None:
+            print(" OCR 输入的图片无效。 ")
+            return
+        lang = 'en'
+        emitted = []
+        try:
+            print("🔍 使用 EasyOCR 开始流式识别...")
+            text_height = None
+            if self.preprocess and not isinstance(image, str):
+                from preprocess import preprocess
+                processed = preprocess(image)
+                image = processed.image
+                text_height = processed.text_height * processed.scale
+            detection = self._choose_detection(image, text_height)
+            if self._pool is not None or (not isinstance(image, str) and self._needs_tiling(image)):
+                paragraphs = [[paragraph] for paragraph in self.read_paragraphs(image, detection)]
+            else:
+                paragraphs = self._stream_lines(image, detection)
+            for block in paragraphs:
+                separator = "\n" if emitted else ""
+                for line in block:
+                    if not line:
+                        continue
+                    if self._detect_language(line) == 'zh':
+                        lang = 'zh'  # 与 recognize 一致：出现任何中文即视为中文
+                    emitted.append(separator + line)
+                    yield separator + line, lang
+                    separator = " "
+        except Exception as e:
+            print(f"❌ EasyOCR 识别失败: {e}")
+            if emitted:
+                # 已经产出了部分文本：抛出异常，下游 (缓存、流水线) 不能把它当作完整结果
+                raise
+            return
+        text = "".join(emitted)
+        if text:
+            print(f"✅ 识别到文字 ({lang}): {text}")
+        else:
+            print("⚠️ 未识别到任何文字。")
+
+    def _stream_lines(self, image, detection: dict = None):
+        """检测一次，然后按阅读顺序逐行识别：产出文本块，每个文本块是逐行产出文本的生成器。"""
+        from ocr_tiling import TextBox, layout_blocks
+
+        if self.router is not None and isinstance(image, str):
+            image = self._load_image(image)
+        horizontal, free = self._detect(image, detection)
+        boxes = [TextBox(x_min, y_min, x_max, y_max, "", source=("horizontal", [x_min, x_max, y_min, y_max]))
+                 for x_min, x_max, y_min, y_max in horizontal[0]]
+        for points in free[0]:
+            xs, ys = [p[0] for p in points], [p[1] for p in points]
+            boxes.append(TextBox(min(xs), min(ys), max(xs), max(ys), "", source=("free", points)))
+
+        def read_lines(block):
+            for line in block:
+                results = self._recognize_regions(
+                    image,
+                    [box.source[1] for box in line if box.source[0] == "horizontal"],
+                    [box.source[1] for box in line if box.source[0] == "free"])
+                words = sorted((TextBox.from_easyocr(result) for result in results), key=lambda box: box.x0)
+                yield " ".join(box.text for box in words if box.text)
+
+        for block in layout_blocks(boxes):
+            yield read_lines(block)
+
+    def recognize(self, image) -> tuple[str, str]:
+        """
+        使用 EasyOCR 从图片中提取文字 (recognize_batch 的单张图片形式)。
+        输入可以是内存中的 RGB 数组 (直接交给 EasyOCR，无需编解码) 或图片路径。
         会将识别出的所有文本段落用换行符连接。
         返回识别的文本和检测到的语言 ('zh' 或 'en')。
         """
-        if not image_path or not Path(image_path).exists():
-            print(" OCR 输入的图片路径无效。 ")
-            return "", "en" # 返回默认值
+        return self.recognize_batch([image])[0].as_tuple()
+
+class TesseractOcrEngine(OcrEngine):
+    """
+    调用 Tesseract 命令行的轻量 OCR 引擎：不需要 torch，内存占用和启动时间都远小于 EasyOCR。
+    图片以未压缩的 PGM 格式通过标准输入传给 tesseract，不写临时文件。
+    """
+
+    # EasyOCR 语言代码 -> Tesseract 语言代码
+    LANGUAGE_CODES = {"ch_sim": "chi_sim", "ch_tra": "chi_tra", "en": "eng", "ja": "jpn", "ko": "kor",
+                      "fr": "fra", "de": "deu", "es": "spa", "ru": "rus"}
+
+    def __init__(self, languages: list[str] = None, executable: str = None, psm: int = 3,
+                 preprocess: bool = True, timeout: float = 30.0):
+        """
+        :param languages: 需要识别的语言列表，可以使用 EasyOCR 或 Tesseract 的语言代码，默认 ['ch_sim', 'en']。
+        :param executable: tesseract 可执行文件，默认在 PATH 中查找。
+        :param psm: Tesseract 的页面分割模式，3 为全自动。
+        :param preprocess: 识别前是否裁掉空白边框、转为灰度并把文字缩放到合适的大小。
+        :param timeout: 单次识别的超时 (秒)。
+        """
+        import shutil
+        import subprocess
+        self.executable = executable or shutil.which("tesseract")
+        if not self.executable:
+            print("缺少 tesseract 命令。")
+            print("请运行 'sudo apt install tesseract-ocr tesseract-ocr-chi-sim' 来安装它。")
+            raise FileNotFoundError("tesseract")
+        self.psm = psm
+        self.preprocess = preprocess
+        self.timeout = timeout
+
+        wanted = [self.LANGUAGE_CODES.get(lang, lang) for lang in (languages or ['ch_sim', 'en'])]
         try:
-            print("🔍 使用 EasyOCR 开始识别...")
-            # detail=0 表示只返回文本内容
-            # paragraph=True 会将邻近的文本块合并成段落
-            result = self.reader.readtext(image_path, detail=0, paragraph=True)
-            text = "\n".join(result)
-            lang = self._detect_language(text)
-            
+            listed = subprocess.run([self.executable, "--list-langs"], capture_output=True, text=True,
+                                    timeout=10).stdout.split()
+        except (OSError, subprocess.SubprocessError) as e:
+            raise RuntimeError(f"无法运行 tesseract: {e}") from e
+        self.languages = [lang for lang in wanted if lang in listed]
+        missing = [lang for lang in wanted if lang not in listed]
+        if missing:
+            print(f"⚠️ Tesseract 缺少语言数据: {', '.join(missing)}")
+        if not self.languages:
+            raise RuntimeError("Tesseract 没有可用的语言数据")
+        # 截图通常不大，多线程反而更慢 (Tesseract 官方建议)
+        self._env = {**os.environ, "OMP_THREAD_LIMIT": os.environ.get("OMP_THREAD_LIMIT", "1")}
+        print(f"✅ Tesseract 引擎初始化完成 ({'+'.join(self.languages)})。")
+
+    @staticmethod
+    def _to_pgm(gray) -> bytes:
+        return b"P5\n%d %d\n255\n" % (gray.shape[1], gray.shape[0]) + gray.tobytes()
+
+    @staticmethod
+    def _clean(output: str) -> str:
+        """空行分隔段落，段内各行用空格连接；去掉 Tesseract 在汉字之间插入的空格。"""
+        paragraphs = []
+        for block in re.split(r"\n\s*\n", output):
+            lines = [line.strip() for line in block.splitlines() if line.strip()]
+            if lines:
+                paragraphs.append(" ".join(lines))
+        text = "\n".join(paragraphs)
+        return re.sub(r"(?<=[\u3000-\u9fff\uff00-\uffef]) +(?=[\u3000-\u9fff\uff00-\uffef])", "", text)
+
+    def recognize(self, image) -> tuple[str, str]:
+        import subprocess
+        image = as_image_input(image)
+        if image is None:
+            print(" OCR 输入的图片无效。 ")
+            return "", "en"
+        command = [self.executable, "stdin", "stdout", "-l", "+".join(self.languages), "--psm", str(self.psm)]
+        try:
+            print("🔍 使用 Tesseract 开始识别...")
+            if isinstance(image, str):
+                command[1] = image
+                data = None
+            else:
+                if self.preprocess:
+                    from preprocess import preprocess
+                    gray = preprocess(image).image
+                else:
+                    from preprocess import to_gray
+                    gray = to_gray(image)
+                import numpy as np
+                data = self._to_pgm(np.ascontiguousarray(gray))
+            completed = subprocess.run(command, input=data, capture_output=True, timeout=self.timeout,
+                                       env=self._env)
+            if completed.returncode != 0:
+                raise RuntimeError(completed.stderr.decode("utf-8", "replace").strip())
+            text = self._clean(completed.stdout.decode("utf-8", "replace"))
+            lang = detect_language(text)
             if text:
                 print(f"✅ 识别到文字 ({lang}): {text}")
             else:
                 print("⚠️ 未识别到任何文字。")
             return text, lang
         except Exception as e:
-            print(f"❌ EasyOCR 识别失败: {e}")
-            return "", "en" # 返回默认值
+            print(f"❌ Tesseract 识别失败: {e}")
+            return "", "en"
+
+
+# --- 后端注册表 ---
+# 名称 -> (创建函数 factory(config) -> OcrEngine, 是否已安装的检测函数)
+OCR_BACKENDS = {}
+# ocr_backend 为 "auto" 且未启用校准时，按这个顺序选择第一个已安装的后端
+AUTO_PREFERENCE = ["easyocr-onnx", "easyocr", "tesseract"]
+
+
+def register_ocr_backend(name: str, factory, available):
+    """注册一个 OCR 后端，之后可以在 config.json 的 ocr_backend 中按名称选择。"""
+    OCR_BACKENDS[name] = (factory, available)
+
+
+def available_ocr_backends() -> list[str]:
+    """已注册且依赖已安装的后端名称。"""
+    names = []
+    for name, (_factory, available) in OCR_BACKENDS.items():
+        try:
+            if available():
+                names.append(name)
+        except Exception:
+            pass
+    return names
+
+
+def create_ocr_engine(name: str, config: dict = None) -> OcrEngine:
+    """按名称创建 OCR 后端。"""
+    if name not in OCR_BACKENDS:
+        raise ValueError(f"未知的 OCR 后端 '{name}'，可选: {', '.join(OCR_BACKENDS)}")
+    return OCR_BACKENDS[name][0](config or {})
+
+
+def get_ocr_engine(config: dict = None) -> OcrEngine:
+    """
+    根据配置返回一个 OCR 引擎实例。
+
+    配置项:
+        ocr_backend    后端名称 ('easyocr'、'easyocr-onnx'、'tesseract') 或 'auto'，默认 'easyocr'
+        ocr_calibrate  ocr_backend 为 'auto' 时，是否在启动时用参考图片测量各后端，
+                       选择满足准确率要求的最快后端 (结果会缓存)，默认 false
+    """
+    config = config or {}
+    name = config.get("ocr_backend", "easyocr")
+    if name == "auto":
+        available = available_ocr_backends()
+        if not available:
+            raise RuntimeError("没有已安装的 OCR 后端 (需要 easyocr 或 tesseract)")
+        if config.get("ocr_calibrate", False) and len(available) > 1:
+            from ocr_calibration import choose_backend
+            name, engine = choose_backend(config, available)
+            if engine is not None:
+                return engine
+        else:
+            name = next((n for n in AUTO_PREFERENCE if n in available), available[0])
+    elif name not in OCR_BACKENDS:
+        logger.warning(f"未知的 OCR 后端 '{name}'，将默认使用 EasyOCR。")
+        name = "easyocr"
+    logger.info(f"ℹ️ 根据配置加载 OCR 引擎: {name}")
+    return create_ocr_engine(name, config)
+
+
+def _module_available(*names: str) -> bool:
+    import importlib.util
+    return all(importlib.util.find_spec(name) is not None for name in names)
+
+
+def _create_easyocr(config: dict, runtime: str = "torch") -> OcrEngine:
+    # ocr_worker_processes > 0 时模型常驻在独立的工作进程中，不与本进程争夺 GIL
+    # 超过 ocr_tile_threshold_px 像素的截图切块并行识别
+    # ocr_routing 为 true 时拉丁字母交给只含拉丁语言的小模型，其他语言的模型按需加载
+    # runtime 为 'onnx' 时模型在 ONNX Runtime 中运行 (需要先运行 python3 ocr_onnx.py export)
+    return EasyOcrEngine(languages=config.get("ocr_languages"),
+                         worker_processes=int(config.get("ocr_worker_processes", 0)),
+                         preprocess=bool(config.get("ocr_preprocess", True)),
+                         tile_threshold_px=int(config.get("ocr_tile_threshold_px", 0)),
+                         tile_size=int(config.get("ocr_tile_size", 1024)),
+                         batch_size=int(config.get("ocr_batch_size", 8)),
+                         routing=bool(config.get("ocr_routing", True)),
+                         max_readers=int(config.get("ocr_max_readers", 3)),
+                         runtime=runtime, quantize=_quantize_option(config, runtime),
+                         threads=int(config.get("ocr_threads", 0)),
+                         interop_threads=int(config.get("ocr_interop_threads", 1)),
+                         adaptive_detection=bool(config.get("ocr_adaptive_detection", True)),
+                         policy_file=config.get("ocr_policy_file"))
+
+
+def _quantize_option(config: dict, runtime: str):
+    """
+    ocr_quantize 只作用于 ONNX Runtime，默认关闭 (int8 模型的 CER 需要先用基准测试确认)。
+    torch 下 EasyOCR 默认已经量化，这个配置不改变任何东西。
+    """
+    if runtime != "onnx":
+        return None
+    return bool(config.get("ocr_quantize", False))
+
+
+def _onnx_models_available() -> bool:
+    if not _module_available("onnxruntime", "cv2"):
+        return False
+    from ocr_onnx import DETECTOR_FILE, ONNX_ROOT
+    return os.path.exists(os.path.join(ONNX_ROOT, DETECTOR_FILE))
+
+
+def _create_tesseract(config: dict) -> OcrEngine:
+    return TesseractOcrEngine(languages=config.get("ocr_languages"),
+                              executable=config.get("tesseract_path"),
+                              preprocess=bool(config.get("ocr_preprocess", True)))
+
+
+def _tesseract_available() -> bool:
+    import shutil
+    return shutil.which("tesseract") is not None
+
+
+register_ocr_backend("easyocr", _create_easyocr, lambda: _module_available("easyocr", "torch"))
+register_ocr_backend("easyocr-onnx", lambda config: _create_easyocr(config, "onnx"), _onnx_models_available)
+register_ocr_backend("tesseract", _create_tesseract, _tesseract_available)
 
 if __name__ == '__main__':
     # 用于直接测试OCR功能
-    # 使用方法: python3 ocr.py /path/to/your/image.png
+    # 使用方法: python3 ocr.py /path/to/your/image.png [更多图片 ...]
     import sys
     if len(sys.argv) > 1:
-        image_path_for_test = sys.argv[1]
-        if not Path(image_path_for_test).exists():
-            print(f"错误: 文件 '{image_path_for_test}' 不存在。")
+        image_paths_for_test = sys.argv[1:]
+        missing = [path for path in image_paths_for_test if not Path(path).exists()]
+        if missing:
+            print(f"错误: 文件 '{missing[0]}' 不存在。")
         else:
             try:
                 print("--- OCR功能测试 ---")
                 ocr_engine = EasyOcrEngine()
-                recognized_text, lang = ocr_engine.recognize(image_path_for_test)
+                results = ocr_engine.recognize_batch(image_paths_for_test)
                 print("\n--- 测试结果 ---")
-                print(f"语言: {lang}")
-                print(f"文本: {recognized_text}")
+                for path, result in zip(image_paths_for_test, results):
+                    print(f"[{path}] 语言: {result.lang}, 耗时: {result.seconds:.2f}s")
+                    print(f"文本: {result.text}")
                 print("--- 测试结束 ---")
             except (ImportError, RuntimeError) as e:
                 # 打印已知错误，避免崩溃
                 print(f"初始化失败: {e}")
     else:
-        print("请提供一个图片文件路径作为参数来测试OCR功能。")
-        print("用法: python3 ocr.py /path/to/your/image.png")
\ No newline at end of file
+        print("请提供图片文件路径作为参数来测试OCR功能。")
+        print("用法: python3 ocr.py /path/to/your/image.png [更多图片 ...]")
\ No newline at end of file
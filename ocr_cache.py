@@ -0,0 +1,361 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+以截图像素为键的 OCR 结果缓存。
+
+用户经常对同一个对话框或页面区域反复截图。缓存分两级匹配：
+1. 精确匹配：像素内容的摘要完全相同。
+2. 近似匹配：框选偏移了几个像素的截图。先按尺寸 (相差不超过几个像素) 和
+   感知哈希 (dHash) 的汉明距离挑出少量候选，再用行/列灰度投影估计平移量，
+   对齐后逐像素比较重叠区域：只有重叠部分几乎完全相同时才算命中。
+   感知哈希本身分不清"改了一个字"和"偏移了一个像素"，因此只用来排序候选，
+   是否命中由逐像素校验决定。
+
+所有计算都在亮度通道上用向量化的 NumPy 完成，4K 截图也只需十几毫秒，
+远小于一次 OCR。内存中按 LRU 在字节预算内保留最近的条目；
+可选的磁盘层 (diskcache.DiskTier) 只做精确匹配，重启后依然有效。
+"""
+
+import hashlib
+import json
+import logging
+import threading
+from collections import OrderedDict
+
+from metrics import metrics as default_metrics
+from ocr import OcrEngine, as_image_input
+
+logger = logging.getLogger("AMD-HELPER")
+
+# dHash 网格：HASH_ROWS 行，每行比较 HASH_COLS + 1 个相邻块
+HASH_ROWS = 16
+HASH_COLS = 16
+# 计算 dHash 前按步长抽样，使长边不超过这个值
+HASH_SAMPLE_SIDE = 1024
+# 近似匹配允许的最大平移量 (像素)，同时也是允许的尺寸差
+MAX_SHIFT_PX = 4
+# 平移对齐后重叠区域内允许不同的像素数随字形大小变化：行高为 h 的文字中最小的标点 (句号)
+# 约占 (h / GLYPH_DOT_RATIO)^2 个像素，不同的像素必须少于它的一半，改一个标点也不会命中
+GLYPH_DOT_RATIO = 10
+# 每次查找最多逐像素校验的候选数
+MAX_CANDIDATES = 3
+
+DEFAULT_MAX_MB = 64
+DEFAULT_DISK_MB = 32
+
+
+def luma(image):
+    """亮度通道的近似 (RGB 取绿色通道)，返回连续的 uint8 二维数组。"""
+    import numpy as np
+    if image.ndim == 3:
+        image = image[..., 1] if image.shape[2] >= 3 else image[..., 0]
+    return np.ascontiguousarray(image, dtype=np.uint8)
+
+
+def dhash(gray) -> int:
+    """计算亮度图的 dHash (HASH_ROWS * HASH_COLS 位整数)。"""
+    import numpy as np
+    step = max(1, max(gray.shape) // HASH_SAMPLE_SIDE)
+    sample = gray[::step, ::step]
+    h, w = sample.shape
+    rows, cols = HASH_ROWS, HASH_COLS + 1
+    if h < rows or w < cols:
+        ri = np.minimum((np.arange(rows) + 0.5) * h / rows, h - 1).astype(np.intp)
+        ci = np.minimum((np.arange(cols) + 0.5) * w / cols, w - 1).astype(np.intp)
+        grid = sample[np.ix_(ri, ci)].astype(np.float32)
+    else:
+        row_edges = np.linspace(0, h, rows + 1).astype(np.intp)
+        col_edges = np.linspace(0, w, cols + 1).astype(np.intp)
+        sums = np.add.reduceat(np.add.reduceat(sample, row_edges[:-1], axis=0, dtype=np.uint32),
+                               col_edges[:-1], axis=1)
+        grid = sums / np.outer(np.diff(row_edges), np.diff(col_edges))
+    bits = grid[:, 1:] > grid[:, :-1]
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def digest(gray) -> str:
+    """亮度图 (含形状) 的精确摘要。"""
+    h = hashlib.sha1(usedforsecurity=False)
+    h.update(repr(gray.shape).encode())
+    h.update(gray.data)
+    return h.hexdigest()
+
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+def _best_shift(a, b) -> int:
+    """
+    估计一维投影 b 相对于 a 的平移量 (b[i] ≈ a[i + shift])，范围 ±MAX_SHIFT_PX。
+    以重叠部分的平均绝对差最小为准。
+    """
+    import numpy as np
+    best, best_cost = 0, None
+    for shift in range(-MAX_SHIFT_PX, MAX_SHIFT_PX + 1):
+        a_start, b_start = max(shift, 0), max(-shift, 0)
+        n = min(len(a) - a_start, len(b) - b_start)
+        if n <= 0:
+            continue
+        cost = np.abs(a[a_start:a_start + n] - b[b_start:b_start + n]).mean()
+        if best_cost is None or cost < best_cost:
+            best, best_cost = shift, cost
+    return best
+
+
+class _Entry:
+    __slots__ = ("gray", "phash", "rows", "cols", "result")
+
+    def __init__(self, gray, phash, result):
+        import numpy as np
+        self.gray = gray
+        self.phash = phash
+        self.rows = gray.mean(axis=1, dtype=np.float32)
+        self.cols = gray.mean(axis=0, dtype=np.float32)
+        self.result = result
+
+    @property
+    def nbytes(self) -> int:
+        return self.gray.nbytes + self.rows.nbytes + self.cols.nbytes
+
+
+class _Query:
+    """一次查找中为新截图计算的特征，未命中时直接存入缓存。"""
+
+    def __init__(self, image):
+        self.gray = luma(image)
+        self.digest = digest(self.gray)
+        self.phash = dhash(self.gray)
+        self._profiles = None
+        self._text_height = None
+
+    @property
+    def profiles(self):
+        """行/列的平均亮度投影 (只在需要近似匹配时计算)。"""
+        if self._profiles is None:
+            import numpy as np
+            self._profiles = (self.gray.mean(axis=1, dtype=np.float32),
+                              self.gray.mean(axis=0, dtype=np.float32))
+        return self._profiles
+
+    @property
+    def text_height(self) -> float:
+        """估计的文字行高 (只在需要近似匹配时计算)，无法估计时为 0。"""
+        if self._text_height is None:
+            from preprocess import background_level, estimate_text_height, ink_mask
+            self._text_height = estimate_text_height(ink_mask(self.gray, background_level(self.gray)))
+        return self._text_height
+
+
+class OcrResultCache:
+    """
+    OCR 结果缓存。
+
+    :param max_bytes: 内存中保留的亮度图的总字节数上限。
+    :param near_match: 是否启用近似匹配 (框选偏移)。
+    :param disk: 可选的 diskcache.DiskTier。
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_MB * 1024 * 1024, near_match: bool = True,
+                 disk=None, metrics=None):
+        self.max_bytes = max_bytes
+        self.near_match = near_match
+        self.disk = disk
+        self.metrics = metrics or default_metrics
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # 精确摘要 -> _Entry
+        self._bytes = 0
+
+    def query(self, image) -> _Query:
+        return _Query(image)
+
+    def lookup(self, query: _Query):
+        """
+        查找缓存。
+
+        :return: (text, lang) 或 None。
+        """
+        with self._lock:
+            entry = self._entries.get(query.digest)
+            if entry is not None:
+                self._entries.move_to_end(query.digest)
+                self._record('ocr_cache_hits')
+                return entry.result
+            candidates = self._candidates_locked(query) if self.near_match else []
+        # 逐像素校验不持有锁 (条目本身不可变)
+        for key, entry in candidates:
+            if self._verify(entry, query):
+                with self._lock:
+                    if key in self._entries:
+                        self._entries.move_to_end(key)
+                    self._record('ocr_cache_near_hits')
+                return entry.result
+        if self.disk is not None:
+            data = self.disk.get(query.digest)
+            if data is not None:
+                try:
+                    result = tuple(json.loads(data.decode("utf-8")))
+                except (ValueError, UnicodeDecodeError):
+                    result = None
+                if result is not None:
+                    with self._lock:
+                        self._insert_locked(query.digest, _Entry(query.gray, query.phash, result))
+                        self._record('ocr_cache_disk_hits')
+                    return result
+        with self._lock:
+            self._record('ocr_cache_misses')
+        return None
+
+    def _candidates_locked(self, query: _Query) -> list:
+        h, w = query.gray.shape
+        candidates = []
+        for key, entry in self._entries.items():
+            eh, ew = entry.gray.shape
+            if abs(eh - h) <= MAX_SHIFT_PX and abs(ew - w) <= MAX_SHIFT_PX:
+                candidates.append((hamming(entry.phash, query.phash), key, entry))
+        candidates.sort(key=lambda c: c[0])
+        return [(key, entry) for _distance, key, entry in candidates[:MAX_CANDIDATES]]
+
+    @staticmethod
+    def _verify(entry: _Entry, query: _Query) -> bool:
+        """对齐后比较重叠区域，几乎完全相同时返回 True。"""
+        import numpy as np
+        gray = query.gray
+        rows, cols = query.profiles
+        dy = _best_shift(entry.rows, rows)
+        dx = _best_shift(entry.cols, cols)
+        if dx == 0 and dy == 0 and entry.gray.shape == gray.shape:
+            # 没有平移：只有像素完全相同才算命中，而这已经由精确摘要判断过了
+            return False
+        old = entry.gray[max(dy, 0):, max(dx, 0):]
+        new = gray[max(-dy, 0):, max(-dx, 0):]
+        h = min(old.shape[0], new.shape[0])
+        w = min(old.shape[1], new.shape[1])
+        # 重叠区域太小 (例如极窄的截图) 时不做近似匹配
+        if h * w < 0.9 * gray.size:
+            return False
+        differing = np.count_nonzero(old[:h, :w] != new[:h, :w])
+        if differing < max(1.0, (query.text_height / GLYPH_DOT_RATIO) ** 2 / 2):
+            logger.debug(f"OCR 缓存近似命中 (平移 {dx},{dy}，{differing} 个像素不同)")
+            return True
+        return False
+
+    def store(self, query: _Query, result):
+        """保存一次识别结果。"""
+        result = tuple(result)
+        with self._lock:
+            self._insert_locked(query.digest, _Entry(query.gray, query.phash, result))
+        if self.disk is not None:
+            self.disk.put(query.digest, json.dumps(list(result), ensure_ascii=False).encode("utf-8"))
+
+    def _insert_locked(self, key, entry):
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._bytes -= old.nbytes
+        self._entries[key] = entry
+        self._bytes += entry.nbytes
+        while self._bytes > self.max_bytes and len(self._entries) > 1:
+            _key, evicted = self._entries.popitem(last=False)
+            self._bytes -= evicted.nbytes
+        self.metrics.set_gauge('ocr_cache_entries', len(self._entries))
+        self.metrics.set_gauge('ocr_cache_mb', round(self._bytes / (1024 * 1024), 1))
+
+    def _record(self, counter: str):
+        """更新命中计数和命中率。"""
+        self.metrics.incr(counter)
+        hits = sum(self.metrics.counter(name) for name in
+                   ('ocr_cache_hits', 'ocr_cache_near_hits', 'ocr_cache_disk_hits'))
+        total = hits + self.metrics.counter('ocr_cache_misses')
+        self.metrics.set_gauge('ocr_cache_hit_rate', round(hits / total, 3) if total else 0.0)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+
+class CachedOcrEngine(OcrEngine):
+    """
+    在 OCR 引擎前加一层结果缓存。
+
+    :param engine: 被包装的引擎，或返回引擎的无参数函数 (只在未命中时调用，
+                   因此命中缓存时不必等待模型加载)。
+    :param cache: OcrResultCache 实例。
+    """
+
+    def __init__(self, engine, cache: OcrResultCache):
+        self._engine = engine
+        self.cache = cache
+
+    @property
+    def engine(self) -> OcrEngine:
+        if isinstance(self._engine, OcrEngine):
+            return self._engine
+        return self._engine()
+
+    def recognize(self, image) -> tuple[str, str]:
+        array = as_image_input(image)
+        # 文件路径不经过缓存
+        if array is None or isinstance(array, str):
+            return self.engine.recognize(image)
+        with self.cache.metrics.timer('ocr_cache_lookup'):
+            query = self.cache.query(array)
+            cached = self.cache.lookup(query)
+        if cached is not None:
+            text, lang = cached
+            print(f"✅ 命中 OCR 缓存 ({lang}): {text}")
+            return text, lang
+        text, lang = self.engine.recognize(array)
+        # 识别失败和空结果不缓存 (引擎在失败时同样返回空文本)
+        if text:
+            self.cache.store(query, (text, lang))
+        return text, lang
+
+    def recognize_stream(self, image):
+        """命中时一次产出缓存的文本；未命中时转发被包装引擎的流式结果，完整结束后写入缓存。"""
+        array = as_image_input(image)
+        if array is None or isinstance(array, str):
+            yield from self.engine.recognize_stream(image)
+            return
+        with self.cache.metrics.timer('ocr_cache_lookup'):
+            query = self.cache.query(array)
+            cached = self.cache.lookup(query)
+        if cached is not None:
+            text, lang = cached
+            print(f"✅ 命中 OCR 缓存 ({lang}): {text}")
+            if text:
+                yield text, lang
+            return
+        chunks, lang = [], "en"
+        for chunk, lang in self.engine.recognize_stream(array):
+            chunks.append(chunk)
+            yield chunk, lang
+        # 识别中途失败 (异常继续向上抛出) 或中途停止 (生成器被关闭) 时不会执行到这里，
+        # 不完整的结果不会进入缓存
+        text = "".join(chunks)
+        if text:
+            self.cache.store(query, (text, lang))
+
+    def close(self):
+        if isinstance(self._engine, OcrEngine):
+            self._engine.close()
+
+
+def build_ocr_cache(config: dict):
+    """
+    根据配置创建 OCR 结果缓存，未启用时返回 None。
+
+    配置项:
+        ocr_cache_mb       内存缓存容量 (MB)，0 表示不启用，默认 64
+        ocr_cache_disk     是否启用磁盘层，默认 false
+        ocr_cache_disk_mb  磁盘层容量 (MB)，默认 32
+    """
+    max_mb = float(config.get("ocr_cache_mb", DEFAULT_MAX_MB))
+    if max_mb <= 0:
+        return None
+    disk = None
+    if config.get("ocr_cache_disk", False):
+        from diskcache import DiskTier
+        disk = DiskTier("ocr", int(float(config.get("ocr_cache_disk_mb", DEFAULT_DISK_MB)) * 1024 * 1024))
+    return OcrResultCache(max_bytes=int(max_mb * 1024 * 1024), disk=disk)
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+OCR 后端的启动校准。
+
+在参考图片 (corpus 中对话框大小的中英文样本) 上测量每个已安装的后端：
+先预热一次，再取几次识别耗时的中位数，同时计算字符错误率 (CER)。
+选择 CER 不超过 ocr_max_cer 的最快后端；都不满足时选择 CER 最低的。
+
+结果按已安装后端的组合缓存在 CACHE_ROOT/ocr_calibration.json，
+安装或卸载后端后会自动重新校准。
+
+使用方法: python3 ocr_calibration.py   (强制重新校准并打印结果)
+"""
+
+import json
+import logging
+import os
+import statistics
+import time
+
+from diskcache import CACHE_ROOT, atomic_write
+
+logger = logging.getLogger("AMD-HELPER")
+
+CALIBRATION_FILE = os.path.join(CACHE_ROOT, "ocr_calibration.json")
+# 默认的准确率下限：字符错误率不超过 10%
+DEFAULT_MAX_CER = 0.1
+# 每个样本测量的次数 (预热之外)
+DEFAULT_RUNS = 3
+
+
+def reference_samples(languages: list[str] = None) -> list:
+    """校准用的参考图片：与常见对话框大小相同的中英文样本。"""
+    from corpus import build_corpus
+    langs = ["en"]
+    if any(lang.startswith("ch_") or lang.startswith("chi_") for lang in (languages or ["ch_sim"])):
+        langs.append("zh")
+    return build_corpus(sizes=["dialog"], langs=langs)
+
+
+def measure(engine, samples: list, runs: int = DEFAULT_RUNS) -> dict:
+    """
+    测量一个引擎在参考图片上的耗时与准确率。
+
+    :return: {"seconds": 每张图片识别耗时中位数之和, "cer": 平均字符错误率}
+    """
+    from corpus import char_error_rate
+    seconds, errors = 0.0, []
+    for sample in samples:
+        # 预热：第一次识别包含模型的延迟初始化
+        text, _lang = engine.recognize(sample.image)
+        timings = []
+        for _ in range(max(1, runs)):
+            start = time.perf_counter()
+            text, _lang = engine.recognize(sample.image)
+            timings.append(time.perf_counter() - start)
+        seconds += statistics.median(timings)
+        errors.append(char_error_rate(sample.text, text))
+    return {"seconds": round(seconds, 4), "cer": round(sum(errors) / len(errors), 4) if errors else 1.0}
+
+
+def pick(results: dict, max_cer: float = DEFAULT_MAX_CER) -> str | None:
+    """从 {名称: {"seconds", "cer"}} 中选择满足准确率要求的最快后端。"""
+    measured = {name: result for name, result in results.items() if "error" not in result}
+    if not measured:
+        return None
+    accurate = [name for name, result in measured.items() if result["cer"] <= max_cer]
+    if accurate:
+        return min(accurate, key=lambda name: measured[name]["seconds"])
+    return min(measured, key=lambda name: (measured[name]["cer"], measured[name]["seconds"]))
+
+
+def _load_cache() -> dict:
+    try:
+        with open(CALIBRATION_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _cache_key(available: list[str], config: dict) -> str:
+    languages = "+".join(config.get("ocr_languages") or ["ch_sim", "en"])
+    return f"{','.join(sorted(available))}|{languages}"
+
+
+def calibrate(config: dict, available: list[str], runs: int = DEFAULT_RUNS) -> tuple[dict, dict]:
+    """
+    测量所有已安装的后端。
+
+    :return: (每个后端的结果, 创建好的引擎实例)，加载失败的后端结果中带有 "error"。
+    """
+    from ocr import create_ocr_engine
+    samples = reference_samples(config.get("ocr_languages"))
+    results, engines = {}, {}
+    for name in available:
+        print(f"⏱️ 正在校准 OCR 后端: {name}...")
+        try:
+            start = time.perf_counter()
+            engine = create_ocr_engine(name, config)
+            load_seconds = time.perf_counter() - start
+            results[name] = measure(engine, samples, runs)
+            results[name]["load_seconds"] = round(load_seconds, 3)
+            engines[name] = engine
+        except Exception as e:
+            logger.warning(f"OCR 后端 {name} 校准失败: {e}")
+            results[name] = {"error": str(e)}
+    return results, engines
+
+
+def choose_backend(config: dict, available: list[str], force: bool = False) -> tuple[str, object]:
+    """
+    返回 (后端名称, 引擎实例或 None)。
+
+    有缓存的校准结果时直接使用，返回的引擎为 None，由调用方创建；
+    否则现场校准，并复用校准时已加载的引擎，其余的引擎随即关闭。
+    """
+    max_cer = float(config.get("ocr_max_cer", DEFAULT_MAX_CER))
+    key = _cache_key(available, config)
+    cache = _load_cache()
+    cached = cache.get(key)
+    if not force and cached and cached.get("backend") in available:
+        logger.info(f"使用缓存的 OCR 校准结果: {cached['backend']}")
+        return cached["backend"], None
+
+    results, engines = calibrate(config, available)
+    name = pick(results, max_cer) or available[0]
+    for other, engine in engines.items():
+        if other != name:
+            engine.close()
+    print(f"✅ OCR 校准完成，选择后端: {name}")
+    cache[key] = {"backend": name, "max_cer": max_cer, "results": results, "time": time.time()}
+    try:
+        atomic_write(CALIBRATION_FILE, json.dumps(cache, ensure_ascii=False, indent=2).encode("utf-8"))
+    except OSError as e:
+        logger.warning(f"无法保存 OCR 校准结果: {e}")
+    return name, engines.get(name)
+
+
+if __name__ == '__main__':
+    from ocr import available_ocr_backends
+
+    with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), "config.json"), "r", encoding="utf-8") as f:
+        config = json.load(f)
+    available = available_ocr_backends()
+    if not available:
+        print("❌ 没有已安装的 OCR 后端 (需要 easyocr 或 tesseract)。")
+        raise SystemExit(1)
+    name, engine = choose_backend(config, available, force=True)
+    entry = _load_cache().get(_cache_key(available, config), {})
+    print(f"\n{'后端':<12}{'加载 (s)':>10}{'识别 (s)':>10}{'CER':>8}")
+    for backend, result in entry.get("results", {}).items():
+        if "error" in result:
+            print(f"{backend:<12}  失败: {result['error']}")
+        else:
+            print(f"{backend:<12}{result['load_seconds']:>10.3f}{result['seconds']:>10.3f}{result['cer']:>8.3f}")
+    print(f"\n选择: {name} (CER 上限 {entry.get('max_cer', DEFAULT_MAX_CER)})")
+    if engine is not None:
+        engine.close()
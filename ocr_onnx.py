@@ -0,0 +1,501 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+用 ONNX Runtime 运行 EasyOCR 的检测模型 (CRAFT) 和识别模型。
+
+piper-tts 已经依赖 onnxruntime，导出一次 ONNX 模型之后，OCR 就不需要在托盘进程中
+导入 torch 和 easyocr：冷启动更快，常驻内存也小得多。
+
+导出 (需要 easyocr 和 torch，只需运行一次):
+    python3 ocr_onnx.py export                      # 使用 config.json 中的 ocr_languages
+    python3 ocr_onnx.py export --languages ch_sim en
+
+OnnxReader 提供与 easyocr.Reader 相同的 detect / recognize / readtext 接口 (只实现本项目用到的参数)，
+前后处理按 EasyOCR 1.7 的默认参数移植，只依赖 numpy、OpenCV 和 Pillow。
+与 torch 版本的一致性由 `python3 bench.py --suite onnx` 在固定语料上检查。
+"""
+
+import json
+import logging
+import math
+import os
+import threading
+
+from diskcache import CACHE_ROOT
+
+logger = logging.getLogger("AMD-HELPER")
+
+ONNX_ROOT = os.path.join(CACHE_ROOT, "onnx")
+DETECTOR_FILE = "craft.onnx"
+# 识别模型的输入高度 (EasyOCR 的 imgH)
+MODEL_HEIGHT = 64
+
+# 与 easyocr.Reader.detect / recognize 的默认参数相同
+CANVAS_SIZE = 2560
+MAG_RATIO = 1.0
+TEXT_THRESHOLD = 0.7
+LINK_THRESHOLD = 0.4
+LOW_TEXT = 0.4
+MIN_SIZE = 20
+SLOPE_THS = 0.1
+YCENTER_THS = 0.5
+HEIGHT_THS = 0.5
+WIDTH_THS = 0.5
+ADD_MARGIN = 0.1
+CONTRAST_THS = 0.1
+ADJUST_CONTRAST = 0.5
+
+
+def group_dir(languages, root: str = None) -> str:
+    """某个语言组合的识别模型所在的目录。"""
+    return os.path.join(root or ONNX_ROOT, "+".join(languages))
+
+
+def models_exported(languages, root: str = None) -> bool:
+    """检测模型和这个语言组合的识别模型是否都已导出。"""
+    root = root or ONNX_ROOT
+    return (os.path.exists(os.path.join(root, DETECTOR_FILE))
+            and os.path.exists(os.path.join(group_dir(languages, root), "recognizer.onnx")))
+
+
+def quantized_recognizer(directory: str) -> str:
+    """
+    返回 int8 动态量化的识别模型路径。第一次使用 (或浮点模型更新) 时量化一次并缓存在同一目录下，
+    之后启动直接加载，不再付出转换的开销。只量化 MatMul (全连接层) 和 LSTM 的权重。
+    """
+    source = os.path.join(directory, "recognizer.onnx")
+    target = os.path.join(directory, "recognizer.int8.onnx")
+    if os.path.exists(target) and os.path.getmtime(target) >= os.path.getmtime(source):
+        return target
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    print("🔄 正在量化 OCR 识别模型 (只需要一次)...")
+    tmp = os.path.join(directory, ".recognizer.int8.tmp.onnx")
+    quantize_dynamic(source, tmp, weight_type=QuantType.QInt8, op_types_to_quantize=["MatMul", "LSTM"])
+    os.replace(tmp, target)
+    return target
+
+
+def session_options(threads: int = 0):
+    """
+    CPU 推理的会话选项：全部图优化、单个 inter-op 线程、关闭线程空转
+    (托盘进程大部分时间空闲，空转会白白占用 CPU)。
+    """
+    import onnxruntime as ort
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+    options.inter_op_num_threads = 1
+    if threads > 0:
+        options.intra_op_num_threads = threads
+    options.add_session_config_entry("session.intra_op.allow_spinning", "0")
+    return options
+
+
+def load_session(path: str, threads: int = 0):
+    """
+    加载 ONNX 模型。第一次加载时把优化后的图保存为 <模型>.opt.onnx，
+    之后直接加载优化过的图，省去每次启动的图优化时间。
+    """
+    import onnxruntime as ort
+    optimized = path[:-len(".onnx")] + ".opt.onnx"
+    options = session_options(threads)
+    if os.path.exists(optimized) and os.path.getmtime(optimized) >= os.path.getmtime(path):
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_DISABLE_ALL
+        return ort.InferenceSession(optimized, options, providers=["CPUExecutionProvider"])
+    options.optimized_model_filepath = optimized
+    return ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+
+
+# --- 检测 (移植自 easyocr.detection / craft_utils) ---
+def _resize_aspect_ratio(image, square_size: int, mag_ratio: float):
+    import cv2
+    import numpy as np
+    height, width, channel = image.shape
+    target_size = min(mag_ratio * max(height, width), square_size)
+    ratio = target_size / max(height, width)
+    target_h, target_w = int(height * ratio), int(width * ratio)
+    resized = cv2.resize(image, (target_w, target_h), interpolation=cv2.INTER_LINEAR)
+    # 补齐到 32 的倍数
+    canvas = np.zeros((target_h + (-target_h % 32), target_w + (-target_w % 32), channel), dtype=np.float32)
+    canvas[:target_h, :target_w] = resized
+    return canvas, ratio
+
+
+def _normalize(image):
+    import numpy as np
+    image = image.astype(np.float32)
+    image -= np.array([0.485, 0.456, 0.406], dtype=np.float32) * 255.0
+    image /= np.array([0.229, 0.224, 0.225], dtype=np.float32) * 255.0
+    return image
+
+
+def _det_boxes(textmap, linkmap) -> list:
+    """由文字区域与字间连接的热力图得到文字框 (四个角点)，与 craft_utils.getDetBoxes_core 相同。"""
+    import cv2
+    import numpy as np
+    img_h, img_w = textmap.shape
+    _ret, text_score = cv2.threshold(textmap, LOW_TEXT, 1, 0)
+    _ret, link_score = cv2.threshold(linkmap, LINK_THRESHOLD, 1, 0)
+    combined = np.clip(text_score + link_score, 0, 1)
+    n_labels, labels, stats, _centroids = cv2.connectedComponentsWithStats(combined.astype(np.uint8),
+                                                                           connectivity=4)
+    boxes = []
+    for k in range(1, n_labels):
+        size = stats[k, cv2.CC_STAT_AREA]
+        if size < 10:
+            continue
+        component = labels == k
+        if np.max(textmap[component]) < TEXT_THRESHOLD:
+            continue
+        segmap = np.zeros(textmap.shape, dtype=np.uint8)
+        segmap[component] = 255
+        segmap[np.logical_and(link_score == 1, text_score == 0)] = 0
+        x, y = stats[k, cv2.CC_STAT_LEFT], stats[k, cv2.CC_STAT_TOP]
+        w, h = stats[k, cv2.CC_STAT_WIDTH], stats[k, cv2.CC_STAT_HEIGHT]
+        niter = int(math.sqrt(size * min(w, h) / (w * h)) * 2)
+        sx, ex = max(0, x - niter), min(img_w, x + w + niter + 1)
+        sy, ey = max(0, y - niter), min(img_h, y + h + niter + 1)
+        kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (1 + niter, 1 + niter))
+        segmap[sy:ey, sx:ex] = cv2.dilate(segmap[sy:ey, sx:ex], kernel)
+
+        contours = np.roll(np.array(np.where(segmap != 0)), 1, axis=0).transpose().reshape(-1, 2)
+        box = cv2.boxPoints(cv2.minAreaRect(contours))
+        bw, bh = np.linalg.norm(box[0] - box[1]), np.linalg.norm(box[1] - box[2])
+        if abs(1 - max(bw, bh) / (min(bw, bh) + 1e-5)) <= 0.1:
+            # 接近正方形的框用轴对齐的外接矩形
+            l, r = contours[:, 0].min(), contours[:, 0].max()
+            t, b = contours[:, 1].min(), contours[:, 1].max()
+            box = np.array([[l, t], [r, t], [r, b], [l, b]], dtype=np.float32)
+        box = np.roll(box, 4 - box.sum(axis=1).argmin(), 0)
+        boxes.append(box)
+    return boxes
+
+
+def group_text_box(polys: list) -> tuple[list, list]:
+    """
+    把检测框分成水平框和任意四边形框，并合并同一行上相邻的水平框，与 easyocr.utils.group_text_box 相同。
+
+    :param polys: [[x1, y1, x2, y2, x3, y3, x4, y4], ...]。
+    :return: (水平框 [[x_min, x_max, y_min, y_max], ...], 四边形框 [[[x, y] * 4], ...])。
+    """
+    import numpy as np
+    horizontal, free, merged = [], [], []
+    for poly in polys:
+        slope_up = (poly[3] - poly[1]) / max(10, poly[2] - poly[0])
+        slope_down = (poly[5] - poly[7]) / max(10, poly[4] - poly[6])
+        if max(abs(slope_up), abs(slope_down)) < SLOPE_THS:
+            xs, ys = poly[0::2], poly[1::2]
+            y_min, y_max = min(ys), max(ys)
+            horizontal.append([min(xs), max(xs), y_min, y_max, 0.5 * (y_min + y_max), y_max - y_min])
+        else:
+            height = np.linalg.norm([poly[6] - poly[0], poly[7] - poly[1]])
+            width = np.linalg.norm([poly[2] - poly[0], poly[3] - poly[1]])
+            margin = int(1.44 * ADD_MARGIN * min(width, height))
+            theta13 = abs(np.arctan((poly[1] - poly[5]) / max(10, poly[0] - poly[4])))
+            theta24 = abs(np.arctan((poly[3] - poly[7]) / max(10, poly[2] - poly[6])))
+            free.append([[poly[0] - np.cos(theta13) * margin, poly[1] - np.sin(theta13) * margin],
+                         [poly[2] + np.cos(theta24) * margin, poly[3] - np.sin(theta24) * margin],
+                         [poly[4] + np.cos(theta13) * margin, poly[5] + np.sin(theta13) * margin],
+                         [poly[6] - np.cos(theta24) * margin, poly[7] + np.sin(theta24) * margin]])
+    horizontal.sort(key=lambda box: box[4])
+
+    # 按中心高度分行
+    lines, current, heights, centers = [], [], [], []
+    for box in horizontal:
+        if current and abs(np.mean(centers) - box[4]) >= YCENTER_THS * np.mean(heights):
+            lines.append(current)
+            current, heights, centers = [], [], []
+        current.append(box)
+        heights.append(box[5])
+        centers.append(box[4])
+    if current:
+        lines.append(current)
+
+    # 行内高度相近、间距小的框合并为一个
+    for line in lines:
+        groups, group, heights, x_max = [], [], [], 0
+        for box in sorted(line, key=lambda item: item[0]):
+            if group and (abs(np.mean(heights) - box[5]) < HEIGHT_THS * np.mean(heights)
+                          and box[0] - x_max < WIDTH_THS * (box[3] - box[2])):
+                group.append(box)
+                heights.append(box[5])
+            else:
+                if group:
+                    groups.append(group)
+                group, heights = [box], [box[5]]
+            x_max = box[1]
+        groups.append(group)
+        for group in groups:
+            x_min, x_max = min(b[0] for b in group), max(b[1] for b in group)
+            y_min, y_max = min(b[2] for b in group), max(b[3] for b in group)
+            if len(line) == 1:
+                margin = int(ADD_MARGIN * min(x_max - x_min, group[0][5]))
+            else:
+                margin = int(ADD_MARGIN * min(x_max - x_min, y_max - y_min))
+            merged.append([x_min - margin, x_max + margin, y_min - margin, y_max + margin])
+    return merged, free
+
+
+# --- 识别 (移植自 easyocr.recognition / utils) ---
+def _crop_images(gray, horizontal: list, free: list) -> tuple[list, int]:
+    """裁出文字块并缩放到模型高度，返回 ([(四个角点, 图片), ...] 按 y 排序, 最大宽度)。"""
+    import cv2
+    import numpy as np
+
+    def resize(crop, width, height):
+        ratio = width / height
+        if ratio < 1.0:
+            ratio = 1.0 / ratio
+            return cv2.resize(crop, (MODEL_HEIGHT, int(MODEL_HEIGHT * ratio)), interpolation=cv2.INTER_LINEAR), ratio
+        return cv2.resize(crop, (int(MODEL_HEIGHT * ratio), MODEL_HEIGHT), interpolation=cv2.INTER_LINEAR), ratio
+
+    images, max_ratio = [], 1.0
+    for box in free:
+        rect = np.array(box, dtype=np.float32)
+        tl, tr, br, bl = rect
+        width = max(int(np.linalg.norm(br - bl)), int(np.linalg.norm(tr - tl)))
+        height = max(int(np.linalg.norm(tr - br)), int(np.linalg.norm(tl - bl)))
+        if width == 0 or height == 0:
+            continue
+        target = np.array([[0, 0], [width - 1, 0], [width - 1, height - 1], [0, height - 1]], dtype=np.float32)
+        warped = cv2.warpPerspective(gray, cv2.getPerspectiveTransform(rect, target), (width, height))
+        crop, ratio = resize(warped, width, height)
+        images.append((box, crop))
+        max_ratio = max(max_ratio, ratio)
+    max_y, max_x = gray.shape
+    for box in horizontal:
+        x_min, x_max = max(0, box[0]), min(box[1], max_x)
+        y_min, y_max = max(0, box[2]), min(box[3], max_y)
+        width, height = x_max - x_min, y_max - y_min
+        if width <= 0 or height <= 0:
+            continue
+        crop, ratio = resize(gray[y_min:y_max, x_min:x_max], width, height)
+        images.append(([[x_min, y_min], [x_max, y_min], [x_max, y_max], [x_min, y_max]], crop))
+        max_ratio = max(max_ratio, ratio)
+    images.sort(key=lambda item: item[0][0][1])
+    return images, math.ceil(max_ratio) * MODEL_HEIGHT
+
+
+def _adjust_contrast(image, target: float):
+    import numpy as np
+    high, low = np.percentile(image, 90), np.percentile(image, 10)
+    if (high - low) / max(10, high + low) < target:
+        ratio = 200.0 / max(10, high - low)
+        image = np.clip((image.astype(int) - low + 25) * ratio, 0, 255).astype(np.uint8)
+    return image
+
+
+def _align(images: list, max_width: int, adjust_contrast: float = 0.0):
+    """缩放到模型高度、归一化到 [-1, 1]，右侧用最后一列填充到同一宽度 (AlignCollate + NormalizePAD)。"""
+    import numpy as np
+    from PIL import Image
+    batch = np.zeros((len(images), 1, MODEL_HEIGHT, max_width), dtype=np.float32)
+    for i, image in enumerate(images):
+        if adjust_contrast > 0:
+            image = _adjust_contrast(image, adjust_contrast)
+        h, w = image.shape
+        resized_w = min(max_width, math.ceil(MODEL_HEIGHT * w / float(h)))
+        resized = Image.fromarray(image, "L").resize((resized_w, MODEL_HEIGHT), Image.BICUBIC)
+        pixels = (np.asarray(resized, dtype=np.float32) / 255.0 - 0.5) / 0.5
+        batch[i, 0, :, :resized_w] = pixels
+        batch[i, 0, :, resized_w:] = pixels[:, -1:]
+    return batch
+
+
+class OnnxReader:
+    """
+    在 ONNX Runtime 中运行导出的 EasyOCR 模型，接口与 easyocr.Reader 相同。
+
+    :param languages: 语言组合，必须已经用 `python3 ocr_onnx.py export` 导出。
+    :param detector: 是否加载检测模型 (同一个进程中的多个 OnnxReader 共享一个检测会话)。
+    :param root: 导出模型所在的目录，默认 ~/.cache/a.m.d-helper/onnx。
+    :param threads: 每个会话的 intra-op 线程数，0 表示由 ONNX Runtime 决定。
+    :param quantize: 是否使用 int8 动态量化的识别模型 (见 quantized_recognizer)。
+    """
+
+    _detectors = {}
+    _detectors_lock = threading.Lock()
+
+    def __init__(self, languages, detector: bool = True, root: str = None, threads: int = 0,
+                 quantize: bool = False):
+        self.languages = tuple(languages)
+        self.root = root or ONNX_ROOT
+        self.threads = threads
+        if not models_exported(self.languages, self.root):
+            raise FileNotFoundError(f"未找到 {list(self.languages)} 的 ONNX 模型，"
+                                    f"请先运行 'python3 ocr_onnx.py export --languages {' '.join(self.languages)}'")
+        directory = group_dir(self.languages, self.root)
+        with open(os.path.join(directory, "recognizer.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        self.character = ["[blank]"] + list(meta["character"])
+        # 字符集中不属于所选语言的字符，识别时概率置 0 (与 EasyOCR 相同)
+        allowed = set(meta["lang_char"])
+        self.ignore_idx = [i for i, char in enumerate(self.character) if i and char not in allowed]
+        recognizer = quantized_recognizer(directory) if quantize else os.path.join(directory, "recognizer.onnx")
+        self.recognizer = load_session(recognizer, threads)
+        self._detector = self._shared_detector() if detector else None
+
+    def _shared_detector(self):
+        key = (self.root, self.threads)
+        with self._detectors_lock:
+            if key not in self._detectors:
+                self._detectors[key] = load_session(os.path.join(self.root, DETECTOR_FILE), self.threads)
+            return self._detectors[key]
+
+    def detect(self, image, reformat: bool = True, canvas_size: int = CANVAS_SIZE, mag_ratio: float = MAG_RATIO,
+               **kwargs) -> tuple[list, list]:
+        """
+        检测文字框。
+
+        :param image: RGB 数组，或形状相同的一批图片 (N, H, W, 3)。
+        :param canvas_size: 检测输入长边的上限。
+        :param mag_ratio: 检测前的放大倍数。
+        :return: (每张图片的水平框列表, 每张图片的四边形框列表)，与 easyocr.Reader.detect 相同。
+        """
+        import numpy as np
+        if self._detector is None:
+            self._detector = self._shared_detector()
+        images = image if image.ndim == 4 else [image if image.ndim == 3 else np.repeat(image[..., None], 3, 2)]
+        resized = [_resize_aspect_ratio(img[..., :3], canvas_size, mag_ratio) for img in images]
+        batch = np.stack([_normalize(canvas) for canvas, _ratio in resized]).transpose(0, 3, 1, 2)
+        scores = self._detector.run(None, {self._detector.get_inputs()[0].name: batch})[0]
+
+        horizontal_agg, free_agg = [], []
+        for (_canvas, ratio), score in zip(resized, scores):
+            scale = 2.0 / ratio  # 热力图是输入的一半大小
+            polys = [(box * scale).astype(np.int32).reshape(-1).tolist()
+                     for box in _det_boxes(score[:, :, 0], score[:, :, 1])]
+            horizontal, free = group_text_box(polys)
+            horizontal = [box for box in horizontal if max(box[1] - box[0], box[3] - box[2]) > MIN_SIZE]
+            free = [box for box in free
+                    if max(np.ptp([c[0] for c in box]), np.ptp([c[1] for c in box])) > MIN_SIZE]
+            horizontal_agg.append(horizontal)
+            free_agg.append(free)
+        return horizontal_agg, free_agg
+
+    def _predict(self, images: list, max_width: int, batch_size: int, adjust_contrast: float = 0.0) -> list:
+        import numpy as np
+        name = self.recognizer.get_inputs()[0].name
+        results = []
+        for start in range(0, len(images), batch_size):
+            batch = _align(images[start:start + batch_size], max_width, adjust_contrast)
+            probs = self.recognizer.run(None, {name: batch})[0]
+            probs[:, :, self.ignore_idx] = 0.0
+            probs /= probs.sum(axis=2, keepdims=True)
+            indices = probs.argmax(axis=2)
+            values = probs.max(axis=2)
+            for index, value in zip(indices, values):
+                # CTC 贪心解码：去掉重复和空白
+                keep = np.insert(index[1:] != index[:-1], 0, True) & (index != 0)
+                text = "".join(self.character[i] for i in index[keep])
+                confident = value[index != 0]
+                confidence = float(confident.prod() ** (2.0 / math.sqrt(len(confident)))) if confident.size else 0.0
+                results.append((text, confidence))
+        return results
+
+    def recognize(self, gray, horizontal_list: list = None, free_list: list = None, detail: int = 1,
+                  paragraph: bool = False, batch_size: int = 1, **kwargs) -> list:
+        """识别已检测出的文字框，参数与返回值与 easyocr.Reader.recognize 相同 (paragraph=True 时只返回段落文本)。"""
+        from preprocess import to_gray
+        if gray.ndim == 3:
+            gray = to_gray(gray)
+        if horizontal_list is None and free_list is None:
+            h, w = gray.shape
+            horizontal_list = [[0, w, 0, h]]
+        crops, max_width = _crop_images(gray, horizontal_list or [], free_list or [])
+        if not crops:
+            return []
+        images = [crop for _box, crop in crops]
+        first = self._predict(images, max_width, max(1, batch_size))
+        # 置信度过低的文字块提高对比度再识别一次，取置信度高的结果
+        low = [i for i, (_text, confidence) in enumerate(first) if confidence < CONTRAST_THS]
+        if low:
+            second = self._predict([images[i] for i in low], max_width, max(1, batch_size), ADJUST_CONTRAST)
+            for i, result in zip(low, second):
+                if result[1] >= first[i][1]:
+                    first[i] = result
+        results = [(box, text, confidence) for (box, _crop), (text, confidence) in zip(crops, first)]
+        if paragraph:
+            from ocr_tiling import TextBox, reading_order
+            return reading_order([TextBox.from_easyocr(result) for result in results])
+        return [text for _box, text, _confidence in results] if detail == 0 else results
+
+    def readtext(self, image, detail: int = 1, paragraph: bool = False, batch_size: int = 1, **kwargs) -> list:
+        """检测并识别，参数与返回值与 easyocr.Reader.readtext 相同 (段落按 ocr_tiling 的阅读顺序合并)。"""
+        if isinstance(image, str):
+            import numpy as np
+            from PIL import Image
+            with Image.open(image) as opened:
+                image = np.asarray(opened.convert("RGB"))
+        horizontal, free = self.detect(image, **kwargs)
+        return self.recognize(image, horizontal[0], free[0], detail=detail, paragraph=paragraph,
+                              batch_size=batch_size)
+
+
+# --- 导出 ---
+def export(languages: list[str], root: str = None, opset: int = 17):
+    """
+    把 EasyOCR 的检测模型和各语言组合 (与 ocr_router.language_groups 相同的拆分，以及完整的组合)
+    的识别模型导出为 ONNX。需要 easyocr 和 torch。
+    """
+    import easyocr
+    import torch
+    from ocr_router import language_groups
+
+    root = root or ONNX_ROOT
+    os.makedirs(root, exist_ok=True)
+    latin, others = language_groups(languages)
+    groups = list(dict.fromkeys([latin, *others, tuple(languages)]))
+
+    class Recognizer(torch.nn.Module):
+        """输出 softmax 概率；AdaptiveAvgPool2d((None, 1)) 换成等价的 mean，便于导出。"""
+
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, x):
+            m = self.model
+            feature = m.FeatureExtraction(x).permute(0, 3, 1, 2).mean(dim=3)
+            contextual = m.SequenceModeling(feature)
+            return torch.softmax(m.Prediction(contextual.contiguous()), dim=2)
+
+    for i, languages_group in enumerate(groups):
+        print(f"🔄 正在导出 {list(languages_group)} 的识别模型...")
+        # quantize=False: 动态量化后的 LSTM 无法导出
+        reader = easyocr.Reader(list(languages_group), gpu=False, quantize=False, detector=(i == 0),
+                                verbose=False)
+        if i == 0:
+            detector = getattr(reader.detector, "module", reader.detector).eval()
+            torch.onnx.export(detector, torch.randn(1, 3, 640, 640), os.path.join(root, DETECTOR_FILE),
+                              input_names=["image"], output_names=["score", "feature"], opset_version=opset,
+                              dynamic_axes={"image": {0: "batch", 2: "height", 3: "width"},
+                                            "score": {0: "batch", 1: "height", 2: "width"},
+                                            "feature": {0: "batch", 2: "height", 3: "width"}})
+        directory = group_dir(languages_group, root)
+        os.makedirs(directory, exist_ok=True)
+        recognizer = Recognizer(getattr(reader.recognizer, "module", reader.recognizer)).eval()
+        torch.onnx.export(recognizer, torch.randn(1, 1, MODEL_HEIGHT, 256), os.path.join(directory, "recognizer.onnx"),
+                          input_names=["image"], output_names=["probs"], opset_version=opset,
+                          dynamic_axes={"image": {0: "batch", 3: "width"}, "probs": {0: "batch", 1: "steps"}})
+        with open(os.path.join(directory, "recognizer.json"), "w", encoding="utf-8") as f:
+            json.dump({"languages": list(languages_group), "character": reader.character,
+                       "lang_char": reader.lang_char, "model_lang": reader.model_lang}, f, ensure_ascii=False)
+    print(f"✅ ONNX 模型已导出到 {root}")
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="导出 EasyOCR 模型为 ONNX")
+    parser.add_argument("command", choices=["export"])
+    parser.add_argument("--languages", nargs="+", help="语言列表，默认使用 config.json 中的 ocr_languages")
+    parser.add_argument("--output", help=f"输出目录，默认 {ONNX_ROOT}")
+    args = parser.parse_args()
+    languages = args.languages
+    if not languages:
+        config_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "config.json")
+        with open(config_path, "r", encoding="utf-8") as f:
+            languages = json.load(f).get("ocr_languages") or ["ch_sim", "en"]
+    export(languages, args.output)
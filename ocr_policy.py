@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+按图片的几何特征选择 EasyOCR 的检测参数 (canvas_size、mag_ratio)。
+
+EasyOCR 对所有图片使用同一组默认值 (canvas_size=2560, mag_ratio=1)，但 CRAFT 检测的效果和耗时
+都取决于输入中文字的大小：文字太小会漏检，需要放大；文字很大时可以缩小，检测的像素数成倍减少；
+长边超过 canvas_size 的图片会被整体缩小，小字随之丢失。
+
+策略表是按顺序匹配的规则列表，每条规则给出适用的条件 (长边、文字行高的上限，均为检测输入的像素)
+和对应的参数，第一条匹配的规则生效。内置的表只是保守的起点，实际使用的表由扫描得到：
+
+    python3 ocr_policy.py tune            # 在合成语料上扫描参数组合，写入 ~/.cache/a.m.d-helper/ocr_policy.json
+    python3 ocr_policy.py show            # 打印当前生效的策略表
+"""
+
+import json
+import logging
+import os
+
+from diskcache import CACHE_ROOT, atomic_write
+
+logger = logging.getLogger("AMD-HELPER")
+
+POLICY_FILE = os.path.join(CACHE_ROOT, "ocr_policy.json")
+# 传给 Reader.detect / readtext 的参数
+DETECTION_KEYS = ("canvas_size", "mag_ratio")
+# 无法估计行高时假定的文字行高 (与 preprocess.TARGET_TEXT_HEIGHT 相同)
+ASSUMED_TEXT_HEIGHT = 24
+
+DEFAULT_RULES = [
+    {"max_text_height": 12, "mag_ratio": 1.5, "canvas_size": 2560},
+    {"max_text_height": 48, "max_long_side": 2560, "mag_ratio": 1.0, "canvas_size": 2560},
+    # 长边超过 2560 的页面保持原大小检测，避免被缩小后丢失小字
+    {"max_text_height": 48, "mag_ratio": 1.0, "canvas_size": 3840},
+    {"max_text_height": 96, "mag_ratio": 0.75, "canvas_size": 2560},
+    {"mag_ratio": 0.5, "canvas_size": 2560},
+]
+
+# tune: 扫描的参数网格与场景
+SWEEP_MAG_RATIOS = [0.5, 0.75, 1.0, 1.5, 2.0]
+SWEEP_CANVAS_SIZES = [1280, 2560, 3840]
+SWEEP_FONT_SCALES = [0.5, 1.0, 2.0]
+# 分档的边界：文字行高、长边 (像素)，最后一档没有上限
+TEXT_HEIGHT_BANDS = [12, 20, 32, 48, 96]
+LONG_SIDE_BANDS = [1024, 2560]
+# 字符错误率不超过最佳组合这么多时，选择其中最快的
+CER_TOLERANCE = 0.02
+
+
+def measure_text_height(image) -> float:
+    """估计检测输入中的文字行高 (像素)，无法估计时返回 0。"""
+    from preprocess import background_level, estimate_text_height, ink_mask, to_gray
+    gray = to_gray(image)
+    return estimate_text_height(ink_mask(gray, background_level(gray)))
+
+
+class DetectionPolicy:
+    """
+    检测参数的选择策略。
+
+    :param rules: 规则列表，每条规则是 {"max_long_side", "max_text_height", "mag_ratio", "canvas_size"}，
+                  条件可以省略 (表示没有上限)。默认使用 DEFAULT_RULES。
+    """
+
+    def __init__(self, rules: list[dict] = None):
+        self.rules = rules or DEFAULT_RULES
+
+    @classmethod
+    def load(cls, path: str = None) -> "DetectionPolicy":
+        """读取 tune 生成的策略表，文件不存在或无效时使用内置的表。"""
+        path = path or POLICY_FILE
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                rules = json.load(f)["rules"]
+            logger.info(f"使用 OCR 检测参数策略表: {path}")
+            return cls(rules)
+        except FileNotFoundError:
+            return cls()
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"无法读取 OCR 检测参数策略表 {path}: {e}，使用内置的表")
+            return cls()
+
+    def choose(self, image, text_height: float = None) -> dict:
+        """
+        为一张图片选择检测参数。
+
+        :param image: 检测输入 (预处理之后的图片)。
+        :param text_height: 已知的文字行高 (检测输入的像素)，为 None 时从图片估计。
+        :return: {"canvas_size", "mag_ratio", "text_height", "long_side", "rule"}，
+                 其中 rule 是匹配的规则序号，便于在每次请求的记录中追溯。
+        """
+        long_side = int(max(image.shape[:2]))
+        if text_height is None:
+            text_height = measure_text_height(image)
+        height = text_height or ASSUMED_TEXT_HEIGHT
+        for index, rule in enumerate(self.rules):
+            if (long_side <= rule.get("max_long_side", float("inf"))
+                    and height <= rule.get("max_text_height", float("inf"))):
+                return {"canvas_size": int(rule["canvas_size"]), "mag_ratio": float(rule["mag_ratio"]),
+                        "text_height": round(float(text_height), 1), "long_side": long_side, "rule": index}
+        return {"canvas_size": 2560, "mag_ratio": 1.0, "text_height": round(float(text_height), 1),
+                "long_side": long_side, "rule": None}
+
+
+def detection_kwargs(choice: dict | None) -> dict:
+    """choose() 的结果中可以直接传给 Reader.detect / readtext 的部分。"""
+    return {key: choice[key] for key in DETECTION_KEYS} if choice else {}
+
+
+def _band(value: float, edges: list) -> int:
+    for index, edge in enumerate(edges):
+        if value <= edge:
+            return index
+    return len(edges)
+
+
+def sweep(engine, runs: int = 2, langs=None) -> list[dict]:
+    """
+    在不同尺寸、不同字号的合成图片上测量每个参数组合的检测+识别耗时与字符错误率。
+
+    :return: [{"sample", "long_side", "text_height", "mag_ratio", "canvas_size", "seconds", "cer"}, ...]
+    """
+    import statistics
+    import time
+    from corpus import SIZES, TEXTS, char_error_rate, find_font, render_text_image
+
+    rows = []
+    for lang in langs or ["en", "zh"]:
+        font_path = find_font(lang)
+        if lang == "zh" and font_path is None:
+            print("⚠️ 未找到中文字体，跳过中文样本。")
+            continue
+        for size, (width, height, font_size) in SIZES.items():
+            for font_scale in SWEEP_FONT_SCALES:
+                repeat = max(1, int(width * height / (400_000 * font_scale ** 2)))
+                text = (" " if lang == "en" else "").join([TEXTS[lang]] * repeat)
+                image, drawn = render_text_image(text, width, height, max(8, int(font_size * font_scale)), font_path)
+                text_height = measure_text_height(image)
+                name = f"{lang}-{size}-x{font_scale}"
+                print(f"⏱️ {name}: {width}x{height}, 行高 {text_height:.0f}px")
+                for mag_ratio in SWEEP_MAG_RATIOS:
+                    for canvas_size in SWEEP_CANVAS_SIZES:
+                        detection = {"canvas_size": canvas_size, "mag_ratio": mag_ratio}
+                        timings, paragraphs = [], []
+                        for _ in range(max(1, runs)):
+                            start = time.perf_counter()
+                            paragraphs = engine.read_paragraphs(image, detection)
+                            timings.append(time.perf_counter() - start)
+                        rows.append({"sample": name, "long_side": max(width, height), "text_height": text_height,
+                                     "mag_ratio": mag_ratio, "canvas_size": canvas_size,
+                                     "seconds": statistics.median(timings),
+                                     "cer": char_error_rate(drawn, "\n".join(paragraphs))})
+    return rows
+
+
+def derive_rules(rows: list[dict], tolerance: float = CER_TOLERANCE) -> list[dict]:
+    """
+    由扫描结果生成策略表：按 (长边档, 行高档) 分组，每组选择平均字符错误率
+    不超过最佳组合 tolerance 的参数中总耗时最短的一个。
+    """
+    cells = {}
+    for row in rows:
+        key = (_band(row["long_side"], LONG_SIDE_BANDS), _band(row["text_height"], TEXT_HEIGHT_BANDS))
+        combo = (row["mag_ratio"], row["canvas_size"])
+        stats = cells.setdefault(key, {}).setdefault(combo, {"seconds": 0.0, "cer": [], "samples": set()})
+        stats["seconds"] += row["seconds"]
+        stats["cer"].append(row["cer"])
+        stats["samples"].add(row["sample"])
+
+    rules = []
+    for (long_band, height_band) in sorted(cells):
+        combos = cells[(long_band, height_band)]
+        mean_cer = {combo: sum(stats["cer"]) / len(stats["cer"]) for combo, stats in combos.items()}
+        best = min(mean_cer.values())
+        accurate = [combo for combo, cer in mean_cer.items() if cer <= best + tolerance]
+        mag_ratio, canvas_size = min(accurate, key=lambda combo: combos[combo]["seconds"])
+        rule = {"mag_ratio": mag_ratio, "canvas_size": canvas_size}
+        if long_band < len(LONG_SIDE_BANDS):
+            rule["max_long_side"] = LONG_SIDE_BANDS[long_band]
+        if height_band < len(TEXT_HEIGHT_BANDS):
+            rule["max_text_height"] = TEXT_HEIGHT_BANDS[height_band]
+        rule["cer"] = round(mean_cer[(mag_ratio, canvas_size)], 4)
+        rule["samples"] = len(combos[(mag_ratio, canvas_size)]["samples"])
+        rules.append(rule)
+    # 没有覆盖到的情况使用 EasyOCR 的默认值
+    rules.append({"mag_ratio": 1.0, "canvas_size": 2560})
+    return rules
+
+
+def _print_rules(rules: list[dict]):
+    print(f"{'#':>3}  {'长边 ≤':>8}{'行高 ≤':>8}{'mag_ratio':>11}{'canvas':>8}")
+    for index, rule in enumerate(rules):
+        print(f"{index:>3}  {str(rule.get('max_long_side', '-')):>8}{str(rule.get('max_text_height', '-')):>8}"
+              f"{rule['mag_ratio']:>11}{rule['canvas_size']:>8}")
+
+
+if __name__ == '__main__':
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="OCR 检测参数策略表")
+    parser.add_argument("command", choices=["tune", "show"])
+    parser.add_argument("-o", "--output", default=POLICY_FILE, help="策略表文件")
+    parser.add_argument("-n", "--runs", type=int, default=2, help="每个组合的测量次数")
+    parser.add_argument("--langs", nargs="+", choices=["en", "zh"], help="只扫描这些语言")
+    parser.add_argument("--runtime", choices=["torch", "onnx"], default="torch", help="EasyOCR 的运行方式")
+    args = parser.parse_args()
+
+    if args.command == "show":
+        _print_rules(DetectionPolicy.load(args.output).rules)
+        raise SystemExit(0)
+
+    from ocr import EasyOcrEngine
+    # 不做预处理、不使用策略：每个组合的参数都显式传入
+    engine = EasyOcrEngine(preprocess=False, runtime=args.runtime, adaptive_detection=False)
+    engine.warmup()
+    rows = sweep(engine, args.runs, args.langs)
+    engine.close()
+    rules = derive_rules(rows)
+    atomic_write(args.output, json.dumps({"rules": rules, "sweep": rows, "created": time.time()},
+                                         ensure_ascii=False, indent=2).encode("utf-8"))
+    _print_rules(rules)
+    print(f"✅ 策略表已写入: {args.output}")
@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+EasyOCR 的多进程工作池。
+
+每个工作进程常驻一个 EasyOCR 模型，OCR 推理不再与托盘进程的 D-Bus 循环和
+pystray 线程争夺 GIL，torch 崩溃或 OOM 也只会带走一个工作进程 (会被自动重启)。
+
+图片通过 multiprocessing.shared_memory 传递：父进程把像素复制到共享内存块，
+只把块名、形状和 dtype 发给工作进程，不对图片做 pickle。
+多个工作进程可以同时处理不同的识别请求。
+"""
+
+import itertools
+import logging
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from multiprocessing import shared_memory
+
+logger = logging.getLogger("AMD-HELPER")
+
+# 等待工作进程加载模型的超时 (秒)，首次运行需要下载模型
+READY_TIMEOUT = 600
+# 结果收集线程检查工作进程存活状态的间隔 (秒)
+MONITOR_INTERVAL = 0.5
+# 同一个工作进程连续崩溃多少次后不再重启
+MAX_RESTARTS = 5
+# 重启前的等待时间 (秒)，每次连续崩溃后加倍，不超过 RESTART_BACKOFF_MAX
+RESTART_BACKOFF = 1.0
+RESTART_BACKOFF_MAX = 30.0
+
+
+class WorkerCrashedError(RuntimeError):
+    """处理请求的工作进程意外退出。"""
+    pass
+
+
+def _attach_shared_memory(name: str) -> shared_memory.SharedMemory:
+    """
+    在工作进程中附加到父进程创建的共享内存块。
+    共享内存的生命周期由父进程负责，这里取消 resource_tracker 的登记，
+    避免工作进程退出时误删或报告泄漏。
+    """
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        from multiprocessing import resource_tracker
+        resource_tracker.unregister(shm._name, "shared_memory")
+    except Exception:
+        pass
+    return shm
+
+
+def _worker_main(worker_id, languages, gpu, torch_threads, engine_options, task_queue, result_queue):
+    """工作进程入口：加载模型一次，然后循环处理任务。"""
+    try:
+        import numpy as np
+        from ocr import EasyOcrEngine
+        engine = EasyOcrEngine(languages=languages, gpu=gpu, threads=torch_threads, **engine_options)
+    except BaseException as e:
+        result_queue.put(("failed", worker_id, None, repr(e)))
+        return
+    try:
+        engine.warmup()
+    except Exception as e:
+        # 预热只是优化，失败时工作进程仍然可用
+        logger.warning(f"⚠️ OCR 工作进程 {worker_id} 预热失败: {e}")
+    result_queue.put(("ready", worker_id, None, os.getpid()))
+
+    while True:
+        task = task_queue.get()
+        if task is None:
+            break
+        task_id, method, payload, kwargs = task
+        try:
+            read = getattr(engine, method)
+            if isinstance(payload, str):
+                result = read(payload, **kwargs)
+            else:
+                shm_name, shape, dtype = payload
+                shm = _attach_shared_memory(shm_name)
+                try:
+                    image = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+                    result = read(image, **kwargs)
+                    del image
+                finally:
+                    shm.close()
+            result_queue.put(("ok", worker_id, task_id, result))
+        except Exception as e:
+            result_queue.put(("error", worker_id, task_id, repr(e)))
+
+
+class _Worker:
+    """父进程中对一个工作进程的记录。"""
+
+    def __init__(self, worker_id, process, task_queue):
+        self.worker_id = worker_id
+        self.process = process
+        self.task_queue = task_queue
+        self.task_id = None
+        self.ready = False
+
+
+class OcrWorkerPool:
+    """
+    EasyOCR 工作进程池。
+
+    :param processes: 工作进程数。
+    :param languages: 传给 EasyOCR 的语言列表。
+    :param gpu: 是否使用 GPU。
+    :param torch_threads: 每个工作进程的推理线程数 (torch 或 ONNX Runtime)，默认按 CPU 核数平均分配。
+    :param engine_options: 传给工作进程中 EasyOcrEngine 的其他参数 (例如 routing)。
+    """
+
+    def __init__(self, processes: int, languages: list[str], gpu: bool = False, torch_threads: int = None,
+                 engine_options: dict = None):
+        self.processes = max(1, processes)
+        self.languages = languages
+        self.gpu = gpu
+        self.torch_threads = torch_threads or max(1, (os.cpu_count() or 1) // self.processes)
+        self.engine_options = engine_options or {}
+        # spawn: 不继承父进程中已初始化的 torch 线程池和 D-Bus 连接
+        self._ctx = mp.get_context("spawn")
+        self._result_queue = self._ctx.Queue()
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._workers = {}
+        self._idle = queue.Queue()
+        self._pending = {}
+        # 每个工作进程位置一个 Event：进程就绪、初始化失败或放弃重启时设置，重启进程时不替换
+        self._ready = {worker_id: threading.Event() for worker_id in range(self.processes)}
+        self._crashes = {}  # 工作进程位置 -> 连续崩溃次数
+        self._respawn_at = {}  # 等待重启的工作进程位置 -> 重启时间 (time.monotonic)
+        self._closed = False
+        self._collector = None
+
+    def start(self, timeout: float = READY_TIMEOUT):
+        """启动所有工作进程，并等待它们加载完模型。"""
+        print(f"🔄 正在启动 {self.processes} 个 OCR 工作进程...")
+        for worker_id in range(self.processes):
+            self._spawn(worker_id)
+        self._collector = threading.Thread(target=self._collect, name="ocr-pool-collector", daemon=True)
+        self._collector.start()
+        for worker_id in range(self.processes):
+            if not self._ready[worker_id].wait(timeout):
+                raise RuntimeError(f"OCR 工作进程 {worker_id} 在 {timeout}s 内未就绪")
+        if not any(worker_id in self._workers for worker_id in range(self.processes)):
+            raise RuntimeError("所有 OCR 工作进程都初始化失败")
+        print("✅ OCR 工作进程已就绪。")
+
+    def _spawn(self, worker_id: int):
+        task_queue = self._ctx.Queue()
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(worker_id, self.languages, self.gpu, self.torch_threads, self.engine_options,
+                  task_queue, self._result_queue),
+            name=f"ocr-worker-{worker_id}",
+            daemon=True,
+        )
+        process.start()
+        with self._lock:
+            self._workers[worker_id] = _Worker(worker_id, process, task_queue)
+            self._respawn_at.pop(worker_id, None)
+
+    def _collect(self):
+        """结果收集线程：分发结果，并定期检查、重启意外退出的工作进程。"""
+        next_check = time.monotonic() + MONITOR_INTERVAL
+        while not self._closed:
+            # 结果持续到达时也按间隔检查，而不是只在队列空闲时检查
+            if time.monotonic() >= next_check:
+                self._check_workers()
+                next_check = time.monotonic() + MONITOR_INTERVAL
+            try:
+                kind, worker_id, task_id, value = self._result_queue.get(
+                    timeout=max(0.0, next_check - time.monotonic()))
+            except queue.Empty:
+                continue
+            except (EOFError, OSError):
+                break
+
+            if kind == "ready":
+                logger.debug(f"OCR 工作进程 {worker_id} 就绪 (pid={value})")
+                with self._lock:
+                    worker = self._workers.get(worker_id)
+                    if worker is not None:
+                        worker.ready = True
+                self._idle.put(worker_id)
+                self._ready[worker_id].set()
+            elif kind == "failed":
+                logger.error(f"OCR 工作进程 {worker_id} 初始化失败: {value}")
+                with self._lock:
+                    self._workers.pop(worker_id, None)
+                self._ready[worker_id].set()
+            else:
+                if kind == "ok":
+                    self._crashes.pop(worker_id, None)
+                self._finish(worker_id, task_id, value if kind == "ok" else RuntimeError(value))
+
+    def _finish(self, worker_id: int, task_id: int, value):
+        with self._lock:
+            entry = self._pending.pop(task_id, None)
+            worker = self._workers.get(worker_id)
+            if worker is not None and worker.task_id == task_id:
+                worker.task_id = None
+        if worker is not None:
+            self._idle.put(worker_id)
+        if entry is None:
+            return
+        future, shm = entry
+        if shm is not None:
+            shm.close()
+            shm.unlink()
+        if isinstance(value, BaseException):
+            future.set_exception(value)
+        else:
+            future.set_result(value)
+
+    def _check_workers(self):
+        """
+        发现已退出的工作进程：让其正在处理的请求失败，并按退避时间启动替代进程。
+        连续崩溃 (加载模型时崩溃，或重启后还没成功完成过识别) 超过 MAX_RESTARTS 次后放弃这个位置。
+        """
+        with self._lock:
+            dead = [w for w in self._workers.values() if not w.process.is_alive()]
+        for worker in dead:
+            worker_id = worker.worker_id
+            crashes = self._crashes.get(worker_id, 0) + 1
+            self._crashes[worker_id] = crashes
+            stage = "识别过程中" if worker.ready else "加载模型时"
+            restart = not self._closed and crashes <= MAX_RESTARTS
+            delay = min(RESTART_BACKOFF * 2 ** (crashes - 1), RESTART_BACKOFF_MAX)
+            with self._lock:
+                # 移除与登记重启在同一个锁内完成，submit 不会误以为没有工作进程
+                self._workers.pop(worker_id, None)
+                if restart:
+                    self._respawn_at[worker_id] = time.monotonic() + delay
+            if worker.task_id is not None:
+                self._finish(worker_id, worker.task_id,
+                             WorkerCrashedError(f"OCR 工作进程 {worker_id} 在识别过程中退出"))
+            if restart:
+                logger.error(f"OCR 工作进程 {worker_id} {stage}退出 (exitcode={worker.process.exitcode})，"
+                             f"{delay:.0f} 秒后重启...")
+            elif not self._closed:
+                logger.error(f"OCR 工作进程 {worker_id} {stage}退出 (exitcode={worker.process.exitcode})，"
+                             f"已连续崩溃 {crashes} 次，不再重启")
+                self._ready[worker_id].set()
+        now = time.monotonic()
+        with self._lock:
+            due = [worker_id for worker_id, at in self._respawn_at.items() if at <= now]
+        for worker_id in due:
+            if not self._closed:
+                self._spawn(worker_id)
+
+    def submit(self, image, method: str = "read_paragraphs", **kwargs) -> Future:
+        """
+        提交一次识别，返回 Future。
+
+        :param image: RGB/灰度 NumPy 数组，或图片文件路径。
+        :param method: 在工作进程中调用的 EasyOcrEngine 方法：'read_paragraphs' 返回段落文本列表，
+                       'read_boxes' 返回文字框列表。
+        :param kwargs: 传给该方法的其他参数 (例如 detection)，必须可以被 pickle。
+        """
+        if self._closed:
+            raise RuntimeError("OCR 工作池已关闭")
+        task_id = next(self._ids)
+        future = Future()
+        shm = None
+        if isinstance(image, str):
+            payload = image
+        else:
+            import numpy as np
+            image = np.ascontiguousarray(image)
+            shm = shared_memory.SharedMemory(create=True, size=max(1, image.nbytes))
+            np.ndarray(image.shape, dtype=image.dtype, buffer=shm.buf)[...] = image
+            payload = (shm.name, image.shape, image.dtype.str)
+
+        # 等待空闲的工作进程 (跳过已被替换的进程)
+        while True:
+            try:
+                worker_id = self._idle.get(timeout=MONITOR_INTERVAL)
+            except queue.Empty:
+                with self._lock:
+                    no_workers = not self._workers and not self._respawn_at
+                if no_workers or self._closed:
+                    if shm is not None:
+                        shm.close()
+                        shm.unlink()
+                    raise RuntimeError("没有可用的 OCR 工作进程")
+                continue
+            with self._lock:
+                worker = self._workers.get(worker_id)
+                if worker is not None and worker.task_id is None:
+                    worker.task_id = task_id
+                    self._pending[task_id] = (future, shm)
+                    break
+        worker.task_queue.put((task_id, method, payload, kwargs))
+        return future
+
+    def read_paragraphs(self, image, detection: dict = None) -> list[str]:
+        """阻塞地完成一次识别。"""
+        return self.submit(image, detection=detection).result()
+
+    def read_boxes(self, image, detection: dict = None) -> list[tuple]:
+        """阻塞地完成一次识别，返回文字框列表。"""
+        return self.submit(image, "read_boxes", detection=detection).result()
+
+    def close(self):
+        """停止所有工作进程并释放共享内存。"""
+        if self._closed:
+            return
+        self._closed = True
+        with self._lock:
+            workers = list(self._workers.values())
+            pending = list(self._pending.values())
+            self._pending.clear()
+        for worker in workers:
+            try:
+                worker.task_queue.put(None)
+            except (OSError, ValueError):
+                pass
+        for worker in workers:
+            worker.process.join(timeout=5)
+            if worker.process.is_alive():
+                worker.process.terminate()
+        for future, shm in pending:
+            if shm is not None:
+                shm.close()
+                shm.unlink()
+            if not future.done():
+                future.set_exception(RuntimeError("OCR 工作池已关闭"))
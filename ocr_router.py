@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+按文字的书写系统把检测到的文字块分配给最小的合适识别模型。
+
+中文识别模型的字符集比纯英文模型大得多，即使图片里只有拉丁字母也更慢。
+检测 (CRAFT) 与语言无关，只做一次；之后先用一个很便宜的像素特征判断每个文字块
+是不是拉丁字母，再把它交给对应的识别模型：
+
+- 拉丁字母 -> 只含拉丁语言的模型 (例如 ['en'])
+- 其他 (中日文、全大写、数字等无法确定的) -> 主 CJK 模型 (例如 ['ch_sim', 'en'])
+- 置信度过低的结果换下一个模型重新识别，取置信度最高的结果
+
+额外的语言 (ch_tra、ja 等) 与 EasyOCR 的其他 CJK 模型不兼容，每种语言各自加载一个
+['<语言>', 'en'] 模型，按需加载，放在按最近使用排序的池中，超出数量时卸载最久未用的。
+
+判断依据是行的水平投影：大小写混排的拉丁文字在 x 高度之外 (上方的升部区域或
+下方的降部区域) 几乎没有墨迹，而汉字、假名在整个字框内分布比较均匀。
+"""
+
+import logging
+import threading
+from collections import OrderedDict
+
+from metrics import metrics as default_metrics
+
+logger = logging.getLogger("AMD-HELPER")
+
+LATIN = "latin"
+UNKNOWN = "unknown"
+
+# 使用拉丁字母的 EasyOCR 语言代码 (常用部分)
+LATIN_LANGUAGES = {
+    "en", "fr", "de", "es", "it", "pt", "nl", "sv", "da", "no", "fi", "pl", "cs", "sk", "sl",
+    "hr", "ro", "hu", "tr", "id", "ms", "vi", "la", "ga", "is", "et", "lv", "lt", "sq", "af",
+}
+# 升部/降部区域的墨迹密度低于 x 高度区域的这个比例时判定为拉丁字母
+LATIN_BAND_RATIO = 0.5
+# 低于这个高度 (像素) 的文字块无法可靠判断
+MIN_CLASSIFY_HEIGHT = 8
+# 识别置信度低于这个值时换下一个模型重新识别
+FALLBACK_CONFIDENCE = 0.4
+# 至少有这么多个 CJK 文字块时才会尝试切换到其他 CJK 模型
+MIN_SWITCH_BOXES = 3
+# 同时常驻的识别模型数上限 (包括拉丁模型和主 CJK 模型)
+DEFAULT_MAX_READERS = 3
+
+
+def classify_crop(gray) -> str:
+    """
+    判断一个水平文字块 (灰度数组) 是否为拉丁字母。
+
+    :return: LATIN，或 UNKNOWN (中日文、全大写、数字等)。
+    """
+    import numpy as np
+    from preprocess import background_level, ink_mask
+
+    if gray.size == 0:
+        return UNKNOWN
+    mask = ink_mask(gray, background_level(gray))
+    rows = np.flatnonzero(mask.any(axis=1))
+    if rows.size < MIN_CLASSIFY_HEIGHT:
+        return UNKNOWN
+    density = mask[rows[0]:rows[-1] + 1].mean(axis=1)
+    h = density.size
+    middle = density[int(h * 0.35):max(int(h * 0.35) + 1, int(h * 0.65))].mean()
+    if middle <= 0:
+        return UNKNOWN
+    top = density[:max(1, int(h * 0.25))].mean()
+    bottom = density[int(h * 0.8):].mean()
+    return LATIN if min(top, bottom) < LATIN_BAND_RATIO * middle else UNKNOWN
+
+
+def language_groups(languages: list[str]) -> tuple[tuple, list[tuple]]:
+    """
+    把语言列表拆分为识别模型的语言组合。
+
+    :return: (拉丁模型的语言, [每个 CJK 模型的语言, ...])，第一个 CJK 模型为主模型。
+             例如 ['ch_sim', 'en', 'ja'] -> (('en',), [('ch_sim', 'en'), ('ja', 'en')])。
+    """
+    latin = tuple(lang for lang in languages if lang in LATIN_LANGUAGES) or ("en",)
+    others = [(lang, *latin) for lang in languages if lang not in LATIN_LANGUAGES]
+    return latin, others
+
+
+class ReaderPool:
+    """
+    按语言组合缓存 easyocr.Reader，按需加载，超过上限时卸载最久未使用的 (固定的除外)。
+
+    :param factory: 创建 Reader 的函数，签名为 factory(languages: tuple, detector: bool)。
+    :param max_readers: 同时常驻的 Reader 数上限。
+    :param pinned: 不会被卸载的语言组合。
+    """
+
+    def __init__(self, factory, max_readers: int = DEFAULT_MAX_READERS, pinned=(), metrics=None):
+        self._factory = factory
+        self.max_readers = max(1, max_readers)
+        self.pinned = set(pinned)
+        self.metrics = metrics or default_metrics
+        self._readers = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, languages: tuple, detector: bool = False):
+        with self._lock:
+            reader = self._readers.get(languages)
+            if reader is not None:
+                self._readers.move_to_end(languages)
+                return reader
+            print(f"🔄 正在加载 EasyOCR 识别模型 {list(languages)}...")
+            with self.metrics.timer('ocr_reader_load'):
+                reader = self._factory(languages, detector)
+            self._readers[languages] = reader
+            self._evict()
+            return reader
+
+    def _evict(self):
+        for languages in list(self._readers):
+            if len(self._readers) <= self.max_readers:
+                break
+            if languages not in self.pinned:
+                del self._readers[languages]
+                logger.info(f"卸载最久未使用的 OCR 识别模型 {list(languages)}")
+                self.metrics.incr('ocr_reader_evictions')
+
+    def loaded(self) -> list[tuple]:
+        with self._lock:
+            return list(self._readers)
+
+    def close(self):
+        with self._lock:
+            self._readers.clear()
+
+
+class RecognizerRouter:
+    """
+    一个检测模型 + 多个按书写系统选择的识别模型。
+
+    :param pool: ReaderPool。
+    :param languages: 需要识别的语言列表，例如 ['ch_sim', 'en']。
+    :param batch_size: 传给 EasyOCR recognize 的 batch_size。
+    :param workers: 传给 EasyOCR recognize 的 workers。
+    """
+
+    def __init__(self, pool: ReaderPool, languages: list[str], batch_size: int = 1, workers: int = 0,
+                 metrics=None):
+        self.pool = pool
+        self.latin, self.others = language_groups(languages)
+        self.batch_size = batch_size
+        self.workers = workers
+        self.metrics = metrics or default_metrics
+        # 最近一次识别成功的 CJK 模型排在前面
+        self._preferred = list(self.others)
+        self._lock = threading.Lock()
+
+    @property
+    def detector(self):
+        """负责检测的 Reader (拉丁模型，同时加载了 CRAFT 检测模型)。"""
+        return self.pool.get(self.latin, detector=True)
+
+    def preload(self):
+        """加载检测模型、拉丁模型和主 CJK 模型。"""
+        self.detector
+        if self.others:
+            self.pool.get(self.others[0])
+
+    def detect(self, image, **kwargs):
+        return self.detector.detect(image, **kwargs)
+
+    def _run(self, languages: tuple, gray, horizontal: list, free: list) -> list:
+        reader = self.detector if languages == self.latin else self.pool.get(languages)
+        return reader.recognize(gray, horizontal, free, detail=1, paragraph=False,
+                                batch_size=self.batch_size, workers=self.workers)
+
+    def recognize(self, gray, horizontal: list, free: list) -> list[tuple]:
+        """
+        识别一张灰度图中的检测框。
+
+        :param gray: 灰度数组。
+        :param horizontal: EasyOCR 的水平框 [[x_min, x_max, y_min, y_max], ...]。
+        :param free: EasyOCR 的任意四边形框 [[[x, y] * 4], ...]，直接交给主 CJK 模型。
+        :return: [(四个角点, 文本, 置信度), ...]，顺序与输入框一致 (先水平框后四边形框)。
+        """
+        boxes = list(horizontal) + list(free)
+        results = [None] * len(boxes)
+        if not self.others:
+            self._fill(results, list(range(len(boxes))), self.latin, gray, boxes, len(horizontal))
+            return results
+
+        primary = self._preferred[0]
+        routes = []
+        for x_min, x_max, y_min, y_max in horizontal:
+            crop = gray[max(0, int(y_min)):max(0, int(y_max)), max(0, int(x_min)):max(0, int(x_max))]
+            routes.append(self.latin if classify_crop(crop) == LATIN else primary)
+        routes += [primary] * len(free)
+
+        for languages in dict.fromkeys(routes):
+            indices = [i for i, route in enumerate(routes) if route == languages]
+            self.metrics.incr('ocr_route_latin' if languages == self.latin else 'ocr_route_cjk', len(indices))
+            self._fill(results, indices, languages, gray, boxes, len(horizontal))
+
+        # 被判为拉丁字母但置信度过低的，交给主 CJK 模型再识别一次
+        retry = [i for i, route in enumerate(routes)
+                 if route == self.latin and results[i][2] < FALLBACK_CONFIDENCE]
+        if retry:
+            self.metrics.incr('ocr_route_fallback', len(retry))
+            self._fill(results, retry, primary, gray, boxes, len(horizontal),
+                       keep_best={i: results[i] for i in retry})
+
+        # 整张图的 CJK 文字块普遍置信度过低时，换其他 CJK 模型 (例如繁体、日文) 试一次，
+        # 按整体置信度选择，避免个别噪声块触发加载所有模型
+        cjk = [i for i, route in enumerate(routes) if route != self.latin]
+        if (len(self._preferred) > 1 and len(cjk) >= MIN_SWITCH_BOXES
+                and _mean_confidence(results, cjk) < FALLBACK_CONFIDENCE):
+            current = routes[cjk[0]]
+            best_languages, best = current, {i: results[i] for i in cjk}
+            for languages in [group for group in self._preferred if group != current]:
+                candidate = list(results)
+                self._fill(candidate, cjk, languages, gray, boxes, len(horizontal))
+                if _mean_confidence(candidate, cjk) > _mean_confidence(best, cjk):
+                    best_languages, best = languages, {i: candidate[i] for i in cjk}
+            for i in cjk:
+                results[i] = best[i]
+            if best_languages != current:
+                logger.info(f"切换 OCR 识别模型: {list(current)} -> {list(best_languages)}")
+                self.metrics.incr('ocr_route_switch')
+                with self._lock:
+                    self._preferred.remove(best_languages)
+                    self._preferred.insert(0, best_languages)
+        return results
+
+    def _fill(self, results: list, indices: list, languages: tuple, gray, boxes: list, n_horizontal: int,
+              keep_best: dict = None):
+        """识别 indices 对应的框并写入 results；keep_best 不为 None 时只在置信度更高时替换。"""
+        horizontal = [boxes[i] for i in indices if i < n_horizontal]
+        free = [boxes[i] for i in indices if i >= n_horizontal]
+        # EasyOCR 会按垂直位置重新排序、丢弃宽度为 0 的框，因此按坐标对应结果
+        by_key = {}
+        for result in self._run(languages, gray, horizontal, free):
+            by_key.setdefault(_points_key(result[0]), []).append(result)
+        height, width = gray.shape[:2]
+        for i in indices:
+            points = _corners(boxes[i], width, height) if i < n_horizontal else boxes[i]
+            matches = by_key.get(_points_key(points))
+            result = matches.pop(0) if matches else (points, "", 0.0)
+            if keep_best is None or result[2] > keep_best[i][2]:
+                results[i] = result
+
+
+def _corners(box, width: int, height: int) -> list:
+    """水平框 [x_min, x_max, y_min, y_max] 裁剪到图片范围后的四个角点 (与 EasyOCR 的输出一致)。"""
+    x_min, x_max, y_min, y_max = max(0, box[0]), min(box[1], width), max(0, box[2]), min(box[3], height)
+    return [[x_min, y_min], [x_max, y_min], [x_max, y_max], [x_min, y_max]]
+
+
+def _points_key(points) -> tuple:
+    return tuple((round(float(x)), round(float(y))) for x, y in points)
+
+
+def _mean_confidence(results, indices) -> float:
+    return sum(results[i][2] for i in indices) / len(indices) if indices else 0.0
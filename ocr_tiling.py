@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+大图的分块 OCR。
+
+把超过阈值的截图切成互相重叠的块，各块并行做检测和识别，再把文字框合并回原图坐标：
+
+1. 重叠区域里同一段文字会被两个块各识别一次：x 方向几乎完全重合的保留更完整的那个。
+2. 被接缝切断的长文字行在两个块里各剩一半：同一行、部分重合的两个片段拼接成一个。
+3. 最后按阅读顺序排列：先分行，再把上下相邻、水平位置重合的行段组成文本块 (栏)，
+   文本块按出现的先后 (从上到下、从左到右) 输出，每个文本块是一个段落。
+   流式识别 (EasyOcrEngine.recognize_stream) 在识别文字之前用同样的顺序排列检测框。
+
+重叠宽度需要大于最高的文字行，这样每一行文字至少完整地出现在一个块里。
+"""
+
+# 默认的块大小与重叠宽度 (像素)
+DEFAULT_TILE_SIZE = 1024
+DEFAULT_TILE_OVERLAP = 96
+# 同一行：两个框的垂直重合至少占较矮者高度的这个比例
+SAME_LINE_OVERLAP = 0.5
+# 重复：同一行的两个框水平重合至少占较窄者宽度的这个比例
+DUPLICATE_OVERLAP = 0.8
+# 同一行内两个框的间距超过行高的这个倍数时，分属不同的栏
+COLUMN_GAP = 2.0
+# 上下两行的间距超过行高的这个倍数时，分属不同的段落
+PARAGRAPH_GAP = 1.0
+
+
+class TextBox:
+    """
+    一个识别出的文字框 (轴对齐)。
+
+    :param x0, y0, x1, y1: 在原图中的坐标。
+    :param text: 识别出的文字。
+    :param confidence: 置信度 (0~1)。
+    :param tile: 来自哪个块 (块的序号)，用于只在不同块之间去重。
+    :param source: 产生这个框的原始数据 (例如尚未识别的检测结果)。
+    """
+
+    def __init__(self, x0: float, y0: float, x1: float, y1: float, text: str, confidence: float = 1.0,
+                 tile: int = 0, source=None):
+        self.x0, self.y0, self.x1, self.y1 = x0, y0, x1, y1
+        self.text = text
+        self.confidence = confidence
+        self.tile = tile
+        self.source = source
+
+    @classmethod
+    def from_easyocr(cls, result, dx: int = 0, dy: int = 0, tile: int = 0) -> "TextBox":
+        """由 EasyOCR readtext(detail=1) 的一项 (四边形, 文字, 置信度) 创建，并平移 (dx, dy)。"""
+        points, text, confidence = result
+        xs = [float(p[0]) for p in points]
+        ys = [float(p[1]) for p in points]
+        return cls(min(xs) + dx, min(ys) + dy, max(xs) + dx, max(ys) + dy, text, float(confidence), tile)
+
+    @property
+    def width(self) -> float:
+        return self.x1 - self.x0
+
+    @property
+    def height(self) -> float:
+        return self.y1 - self.y0
+
+    def as_tuple(self) -> tuple:
+        return (self.x0, self.y0, self.x1, self.y1, self.text, self.confidence)
+
+    def __repr__(self):
+        return f"TextBox({self.x0:.0f},{self.y0:.0f},{self.x1:.0f},{self.y1:.0f} {self.text!r})"
+
+
+def plan_tiles(height: int, width: int, tile_size: int = DEFAULT_TILE_SIZE,
+               overlap: int = DEFAULT_TILE_OVERLAP) -> list[tuple[int, int, int, int]]:
+    """
+    把图片切成互相重叠的块，块的大小尽量均匀。
+
+    :return: [(x0, y0, x1, y1), ...]，按行优先排列。
+    """
+    def spans(length: int) -> list[tuple[int, int]]:
+        if length <= tile_size:
+            return [(0, length)]
+        step = tile_size - overlap
+        count = -(-(length - overlap) // step)
+        # 平均分配，每块的长度不超过 tile_size
+        size = -(-(length + (count - 1) * overlap) // count)
+        starts = [min(i * (size - overlap), length - size) for i in range(count)]
+        return [(start, start + size) for start in starts]
+
+    return [(x0, y0, x1, y1) for y0, y1 in spans(height) for x0, x1 in spans(width)]
+
+
+def _vertical_overlap(a: TextBox, b: TextBox) -> float:
+    return max(0.0, min(a.y1, b.y1) - max(a.y0, b.y0))
+
+
+def _horizontal_overlap(a: TextBox, b: TextBox) -> float:
+    return max(0.0, min(a.x1, b.x1) - max(a.x0, b.x0))
+
+
+def _same_line(a: TextBox, b: TextBox) -> bool:
+    return _vertical_overlap(a, b) >= SAME_LINE_OVERLAP * max(1.0, min(a.height, b.height))
+
+
+def join_fragments(left: str, right: str) -> str:
+    """拼接被接缝切断的两个片段，去掉两者在重叠区域里重复识别的部分。"""
+    for k in range(min(len(left), len(right)), 0, -1):
+        if left.endswith(right[:k]):
+            return left + right[k:]
+    separator = " " if left[-1:].isascii() and right[:1].isascii() else ""
+    return f"{left}{separator}{right}"
+
+
+def _merge_pair(a: TextBox, b: TextBox) -> TextBox | None:
+    """同一行上来自不同块的两个框：重复时返回保留的框，是片段时返回拼接后的框，否则返回 None。"""
+    if a.tile == b.tile or not _same_line(a, b):
+        return None
+    overlap = _horizontal_overlap(a, b)
+    if overlap <= 0:
+        return None
+    if overlap >= DUPLICATE_OVERLAP * max(1.0, min(a.width, b.width)):
+        # 面积大的框更完整 (另一个多半在块的边缘被切掉了一部分)；一样大时取置信度高的
+        return max((a, b), key=lambda box: (round(box.width * box.height), box.confidence))
+    left, right = (a, b) if a.x0 <= b.x0 else (b, a)
+    return TextBox(min(a.x0, b.x0), min(a.y0, b.y0), max(a.x1, b.x1), max(a.y1, b.y1),
+                   join_fragments(left.text, right.text), min(a.confidence, b.confidence), left.tile)
+
+
+def merge_tiles(boxes: list[TextBox]) -> list[TextBox]:
+    """合并各块的识别结果 (已在原图坐标中)，去掉接缝处的重复并拼接被切断的片段。"""
+    merged = list(boxes)
+    changed = True
+    while changed:
+        changed = False
+        merged.sort(key=lambda box: (box.y0, box.x0))
+        i = 0
+        while i < len(merged):
+            j = i + 1
+            # 按 y0 排序，遇到完全在这个框下方的框就可以停止
+            while j < len(merged) and merged[j].y0 <= merged[i].y1:
+                combined = _merge_pair(merged[i], merged[j])
+                if combined is None:
+                    j += 1
+                    continue
+                merged[i] = combined
+                del merged[j]
+                changed = True
+                j = i + 1
+            i += 1
+    return merged
+
+
+def _group_lines(boxes: list[TextBox]) -> list[list[TextBox]]:
+    """按垂直位置把框分成行，行内从左到右排列。"""
+    lines = []  # [(代表这一行的框, [框, ...])]
+    for box in sorted(boxes, key=lambda b: (b.y0 + b.y1) / 2):
+        # 按中心排序后，同一行的框只可能出现在最近的几行里
+        line = None
+        for first, members in reversed(lines):
+            if first.y1 < box.y0:
+                break
+            if _same_line(box, first):
+                line = members
+                break
+        if line is not None:
+            line.append(box)
+        else:
+            lines.append((box, [box]))
+    result = [sorted(members, key=lambda b: b.x0) for _first, members in lines]
+    result.sort(key=lambda line: min(b.y0 for b in line))
+    return result
+
+
+def layout_blocks(boxes: list[TextBox]) -> list[list[list[TextBox]]]:
+    """
+    按阅读顺序组织文字框：返回文本块 (段落) 列表，每个文本块是从上到下的行段列表，
+    每个行段是从左到右的文字框列表。并排的栏各自成块，按从上到下、从左到右的顺序排列。
+    只使用框的位置，可以在识别文字之前调用。
+    """
+    blocks = []  # 每个文本块: {"x0", "x1", "y0", "y1", "height", "lines"}
+    for line in _group_lines(boxes):
+        height = max(b.height for b in line)
+        # 行内间距过大时拆成多个行段 (例如左右两栏)
+        segments, current = [], [line[0]]
+        for box in line[1:]:
+            if box.x0 - current[-1].x1 > COLUMN_GAP * height:
+                segments.append(current)
+                current = [box]
+            else:
+                current.append(box)
+        segments.append(current)
+
+        for segment in segments:
+            x0, x1 = segment[0].x0, max(b.x1 for b in segment)
+            y0, y1 = min(b.y0 for b in segment), max(b.y1 for b in segment)
+            for block in blocks:
+                if (min(block["x1"], x1) > max(block["x0"], x0)
+                        and 0 <= y0 - block["y1"] <= PARAGRAPH_GAP * max(height, block["height"])):
+                    block["lines"].append(segment)
+                    block.update(x0=min(block["x0"], x0), x1=max(block["x1"], x1), y1=y1, height=height)
+                    break
+            else:
+                blocks.append({"x0": x0, "x1": x1, "y0": y0, "y1": y1, "height": height, "lines": [segment]})
+
+    blocks.sort(key=lambda block: (round(block["y0"] / max(1.0, block["height"])), block["x0"]))
+    return [block["lines"] for block in blocks]
+
+
+def reading_order(boxes: list[TextBox]) -> list[str]:
+    """把文字框按阅读顺序组织成段落文本列表 (与 EasyOCR paragraph=True 的输出形式相同)。"""
+    return [" ".join(box.text for line in block for box in line) for block in layout_blocks(boxes)]
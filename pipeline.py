@@ -1,132 +1,395 @@
 import tempfile
 import os
+import re
+import time
+import queue
 import asyncio
-import atexit
-from threading import Event, Lock
+import contextlib
+import logging
+import threading
+import concurrent.futures
+from threading import Event
 
 # 从项目模块中导入各个组件
-from screenshot import Screenshotter
 from ocr import OcrEngine
 from tts import TtsEngine
 from audio import AudioPlayer
+from metrics import metrics as default_metrics
+
+logger = logging.getLogger("AMD-HELPER")
+
+# 句子切分: 中英文句末标点 (可带右引号/括号)、英文句点后跟空白、或换行
+_SENTENCE_RE = re.compile(r'.+?(?:[。！？；!?;…]+[”’"\')）]*|\.+(?=\s)|\n|$)', re.S)
+# 过短的片段会与后一句合并，避免为一两个字单独合成一次
+MIN_SENTENCE_CHARS = 6
+# 合成完成但尚未播放的音频片段上限，防止长文本占用过多磁盘和内存
+MAX_PENDING_AUDIO = 2
+
+# 流式合成时每句话在合成与播放之间缓冲的 PCM 片段上限
+MAX_PENDING_PCM_CHUNKS = 8
+
+# 队列中的结束标记
+_END = object()
+
+
+class _PcmStream:
+    """流式合成的一句话：合成阶段写入 PCM 片段，播放阶段边读边播。"""
+    def __init__(self, sample_rate: int, max_chunks: int = MAX_PENDING_PCM_CHUNKS):
+        self.sample_rate = sample_rate
+        self.chunks = queue.Queue(maxsize=max_chunks)
+
+
+def _join_fragments(left: str, right: str) -> str:
+    """拼接两个文本片段，英文之间补空格，中文直接相连。"""
+    if not left:
+        return right
+    if left[-1].isascii() and right[:1].isascii():
+        return f"{left} {right}"
+    return left + right
+
+
+def split_sentences(text: str, min_chars: int = MIN_SENTENCE_CHARS) -> list[str]:
+    """
+    将识别出的文本切分为适合逐句合成的句子列表。
+
+    :param text: OCR 识别出的文本。
+    :param min_chars: 句子的最小长度，更短的片段会并入下一句。
+    :return: 句子列表，拼接后与原文内容一致 (空白除外)。
+    """
+    sentences = []
+    buffer = ""
+    for match in _SENTENCE_RE.finditer(text):
+        piece = match.group(0).strip()
+        if not piece:
+            continue
+        buffer = _join_fragments(buffer, piece)
+        if len(buffer) >= min_chars:
+            sentences.append(buffer)
+            buffer = ""
+    if buffer:
+        if sentences:
+            sentences[-1] = _join_fragments(sentences[-1], buffer)
+        else:
+            sentences.append(buffer)
+    return sentences
+
+
+class SentenceSplitter:
+    """
+    增量分句：OCR 逐段产出文本时，每收到一段就返回其中已经完整的句子。
+    最后一句可能还没有结束，留到下一段文本到来或 flush() 时再返回。
+    """
+
+    def __init__(self, min_chars: int = MIN_SENTENCE_CHARS):
+        self.min_chars = min_chars
+        self._buffer = ""
+
+    def feed(self, text: str) -> list[str]:
+        self._buffer += text
+        sentences = split_sentences(self._buffer, self.min_chars)
+        if len(sentences) <= 1:
+            return []
+        # 保留末尾的空白，它是与下一段文本之间的分隔
+        trailing = self._buffer[len(self._buffer.rstrip()):]
+        self._buffer = sentences[-1] + trailing
+        return sentences[:-1]
+
+    def flush(self) -> list[str]:
+        sentences = split_sentences(self._buffer, self.min_chars)
+        self._buffer = ""
+        return sentences
+
 
 class ProcessingPipeline:
     """
-    处理流水线，负责协调各个组件完成从截图到朗读的完整流程。
+    流式处理流水线：OCR -> 分句 -> TTS 合成 -> 播放。
+
+    三个阶段通过队列连接：OCR 引擎逐行产出文字 (recognize_stream)，每凑成一个完整的句子
+    就交给合成阶段；第一句合成完成后立即开始播放，其余文字在播放的同时继续识别和合成。
+    合成与播放之间的队列有界。每次运行使用独立的临时文件列表。
+
+    TTS 引擎支持流式合成 (supports_pcm_stream) 且 stream_audio 为 True 时，不写临时文件，
+    合成出的 PCM 片段经有界队列直接交给播放器的 play_stream()，句子的第一段音频合成出来就开始播放。
     """
-    def __init__(self, screenshotter: Screenshotter, ocr_engine: OcrEngine, tts_engine: TtsEngine, audio_player: AudioPlayer):
+    def __init__(self, ocr_engine: OcrEngine, tts_engine: TtsEngine, audio_player: AudioPlayer,
+                 metrics=None, max_pending_audio: int = MAX_PENDING_AUDIO,
+                 loop: asyncio.AbstractEventLoop = None, stream_audio: bool = True):
         """
         初始化处理流水线。
 
-        :param screenshotter: 截图器实例。
         :param ocr_engine: OCR引擎实例。
         :param tts_engine: TTS引擎实例。
         :param audio_player: 音频播放器实例。
+        :param metrics: 指标注册表，默认使用全局实例。
+        :param max_pending_audio: 已合成但未播放的音频片段上限。
+        :param loop: 运行合成阶段的常驻事件循环 (在其他线程中运行)。
+                     为 None 时，每次运行在临时线程中创建自己的事件循环。
+        :param stream_audio: 引擎和播放器都支持时，以原始 PCM 流式合成和播放。
         """
-        self.screenshotter = screenshotter
         self.ocr_engine = ocr_engine
         self.tts_engine = tts_engine
         self.audio_player = audio_player
-        
-        self._lock = Lock()  # 用于确保同一时间只有一个流程在运行
-        self._temp_files = []
-        self._shutdown_event = Event()
-
-        # 注册清理函数，确保程序退出时清理临时文件
-        atexit.register(self.cleanup)
-
-    def _cleanup(self):
-        """清理所有在流程中产生的临时文件。"""
-        print("🧹 清理临时文件...")
-        for temp_file in self._temp_files:
+        self.metrics = metrics or default_metrics
+        self.max_pending_audio = max_pending_audio
+        self.loop = loop
+        self.stream_audio = (stream_audio and getattr(tts_engine, 'supports_pcm_stream', False)
+                             and hasattr(audio_player, 'play_stream'))
+
+    @staticmethod
+    def _remove_file(path: str):
+        try:
+            if os.path.exists(path):
+                os.remove(path)
+        except OSError as e:
+            logger.warning(f"删除临时文件失败: {path}, 原因: {e}")
+
+    @staticmethod
+    def _put(audio_queue: queue.Queue, item, abort: Event) -> bool:
+        """向有界队列放入一项，队列满时等待，直到放入成功或被中止。"""
+        while not abort.is_set():
             try:
-                if os.path.exists(temp_file):
-                    os.remove(temp_file)
-                    print(f"  - 删除了 {os.path.basename(temp_file)}")
-            except OSError as e:
-                print(f"删除临时文件 {temp_file} 失败: {e}")
-        self._temp_files.clear()
-
-    def run(self):
-        """
-        执行从截图到朗读的完整流程。
-        此方法是线程安全的，可以防止重复触发。
-        """
-        if not self._lock.acquire(blocking=False):
-            print("⚠️  操作正在进行中，请勿重复触发。")
+                audio_queue.put(item, timeout=0.05)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    @staticmethod
+    def _get(source: queue.Queue, abort: Event):
+        """从队列取出一项，直到取到或被中止 (中止时返回 _END)。"""
+        while not abort.is_set():
+            try:
+                return source.get(timeout=0.05)
+            except queue.Empty:
+                continue
+        return _END
+
+    def _recognize_all(self, image, sentence_queue: queue.Queue, abort: Event):
+        """OCR 阶段 (后台线程)：边识别边分句，完整的句子立即交给合成阶段。"""
+        start = time.perf_counter()
+        splitter = SentenceSplitter()
+        lang, count, chunks = 'en', 0, []
+        stream = self.ocr_engine.recognize_stream(image)
+        try:
+            # 流式识别是惰性的：每取一段才识别下一行，所以在行与行之间检查中止信号
+            for chunk, lang in stream:
+                if abort.is_set():
+                    return
+                if not chunks:
+                    self.metrics.observe('ocr_first_text', time.perf_counter() - start)
+                chunks.append(chunk)
+                for sentence in splitter.feed(chunk):
+                    sentence_queue.put((sentence, lang))
+                    count += 1
+            for sentence in splitter.flush():
+                sentence_queue.put((sentence, lang))
+                count += 1
+        except Exception as e:
+            sentence_queue.put(e)
             return
-        
-        print("\n=== 开始新流程 ===")
+        finally:
+            stream.close()
+        self.metrics.observe('ocr', time.perf_counter() - start)
+        text = "".join(chunks)
+        if text:
+            logger.info(f"OCR 识别语言: {lang}，共 {count} 句: {text[:50]}...")
+        sentence_queue.put(_END)
+
+    async def _synthesize_all(self, sentence_queue: queue.Queue, audio_queue: queue.Queue, abort: Event):
+        """合成阶段：逐句合成到临时文件，并交给播放阶段。"""
+        suffix = getattr(self.tts_engine, 'audio_suffix', '.mp3')
+        index = 0
         try:
-            # 1. 截图
-            image_path = self.screenshotter.take_screenshot()
-            if not image_path:
-                print("流程中断：未获取到截图。")
-                return
-            self._temp_files.append(image_path)
+            while not abort.is_set():
+                item = await asyncio.to_thread(self._get, sentence_queue, abort)
+                if item is _END or isinstance(item, BaseException):
+                    # 识别结束，或 OCR 阶段的异常 (原样交给播放阶段抛出)
+                    await asyncio.to_thread(self._put, audio_queue, item, abort)
+                    return
+                sentence, lang = item
+                index += 1
+                if self.stream_audio:
+                    if not await self._stream_sentence(sentence, lang, audio_queue, abort):
+                        return
+                    logger.debug(f"第 {index} 句合成完成: {sentence[:30]}")
+                    continue
+                with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as temp_audio_file:
+                    audio_path = temp_audio_file.name
+                start = time.perf_counter()
+                try:
+                    await self.tts_engine.synthesize(sentence, audio_path, lang=lang)
+                except BaseException:
+                    self._remove_file(audio_path)
+                    raise
+                self.metrics.observe('tts_sentence', time.perf_counter() - start)
+                logger.debug(f"第 {index} 句合成完成: {sentence[:30]}")
+                if not await asyncio.to_thread(self._put, audio_queue, audio_path, abort):
+                    self._remove_file(audio_path)
+                    return
+        except Exception as e:
+            logger.error(f"TTS 合成失败: {e}")
+            await asyncio.to_thread(self._put, audio_queue, e, abort)
 
-            # 2. OCR 识别
-            text = self.ocr_engine.recognize(image_path)
-            if not text:
-                print("流程中断：未识别到文字。")
-                return
+    async def _stream_sentence(self, sentence: str, lang: str, audio_queue: queue.Queue, abort: Event) -> bool:
+        """流式合成一句话：先把 _PcmStream 交给播放阶段，再逐块写入 PCM。被中止时返回 False。"""
+        stream = _PcmStream(self.tts_engine.pcm_sample_rate(lang))
+        if not await asyncio.to_thread(self._put, audio_queue, stream, abort):
+            return False
+        start = time.perf_counter()
+        first = True
+        try:
+            # 被取消时立即关闭引擎的流 (例如结束 ffmpeg 解码进程)，而不是等垃圾回收
+            async with contextlib.aclosing(self.tts_engine.stream_pcm(sentence, lang=lang)) as chunks:
+                async for chunk in chunks:
+                    if first:
+                        self.metrics.observe('tts_first_chunk', time.perf_counter() - start)
+                        first = False
+                    if not await asyncio.to_thread(self._put, stream.chunks, chunk, abort):
+                        return False
+        except Exception as e:
+            # 让正在播放这句话的播放阶段抛出同一个异常
+            await asyncio.to_thread(self._put, stream.chunks, e, abort)
+            raise
+        self.metrics.observe('tts_sentence', time.perf_counter() - start)
+        return await asyncio.to_thread(self._put, stream.chunks, _END, abort)
 
-            # 3. TTS 合成
-            # 创建一个临时文件来保存音频
-            with tempfile.NamedTemporaryFile(suffix='.mp3', delete=False) as temp_audio_file:
-                audio_path = temp_audio_file.name
-            self._temp_files.append(audio_path)
-            
-            # 运行异步的TTS任务
-            asyncio.run(self.tts_engine.synthesize(text, audio_path))
+    def _stream_chunks(self, stream: _PcmStream, stop_event: Event, on_first=None):
+        """播放阶段：逐块取出一句话的 PCM，直到句子结束或被停止。"""
+        while True:
+            item = self._get(stream.chunks, stop_event)
+            if item is _END:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            if on_first is not None:
+                on_first()
+                on_first = None
+            yield item
 
-            # 4. 播放音频
-            self.audio_player.play(audio_path, stop_event=self._shutdown_event)
+    async def _synthesize_until_aborted(self, sentence_queue: queue.Queue, audio_queue: queue.Queue, abort: Event):
+        """后台线程中运行合成阶段：abort 设置后立即取消进行中的合成，不等这句话合成完。"""
+        task = asyncio.ensure_future(self._synthesize_all(sentence_queue, audio_queue, abort))
+        while not task.done():
+            await asyncio.wait({task}, timeout=0.05)
+            if abort.is_set():
+                task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
 
-        except Exception as e:
-            print(f"❌ 流水线执行过程中出现严重错误: {e}")
-        finally:
-            self._cleanup()
-            self._lock.release()
-            print("=== 流程结束 ===")
+    def _start_synthesis(self, sentence_queue: queue.Queue, audio_queue: queue.Queue, abort: Event):
+        """启动合成阶段：优先提交到常驻事件循环，否则在后台线程中运行。"""
+        if self.loop is not None:
+            return asyncio.run_coroutine_threadsafe(
+                self._synthesize_all(sentence_queue, audio_queue, abort), self.loop)
+        thread = threading.Thread(
+            target=lambda: asyncio.run(self._synthesize_until_aborted(sentence_queue, audio_queue, abort)),
+            name="tts-stage",
+            daemon=True,
+        )
+        thread.start()
+        return thread
 
-    def shutdown(self):
+    def run(self, image, stop_event: Event = None) -> bool:
         """
-        安全地关闭流程，例如停止正在播放的音频。
+        对一张截图执行完整的流式处理。
+
+        :param image: 交给 OCR 引擎的图片。
+        :param stop_event: 外部停止信号，设置后在阶段边界和播放中途停止。
+        :return: 是否有音频被完整处理 (未识别到文字或被中断时返回 False)。
         """
-        print("正在请求关闭流程...")
-        self._shutdown_event.set()
-        self.audio_player.stop()
+        if stop_event is None:
+            stop_event = Event()
+        if stop_event.is_set():
+            return False
+        t_start = time.perf_counter()
+
+        # OCR 阶段与合成阶段在后台运行，播放阶段在当前线程
+        sentence_queue = queue.Queue()
+        audio_queue = queue.Queue(maxsize=self.max_pending_audio)
+        abort = Event()
+        recognition = threading.Thread(target=self._recognize_all, args=(image, sentence_queue, abort),
+                                       name="ocr-stage", daemon=True)
+        recognition.start()
+        synthesis = self._start_synthesis(sentence_queue, audio_queue, abort)
+        played = 0
+        finished = False
+        try:
+            while not stop_event.is_set():
+                try:
+                    item = audio_queue.get(timeout=0.05)
+                except queue.Empty:
+                    continue
+                if item is _END:
+                    finished = True
+                    break
+                if isinstance(item, BaseException):
+                    raise item
+                def first_audio():
+                    ttfa = time.perf_counter() - t_start
+                    self.metrics.observe('time_to_first_audio', ttfa)
+                    logger.info(f"⏱️ 首句音频就绪，耗时 {ttfa:.3f}s")
+
+                if isinstance(item, _PcmStream):
+                    chunks = self._stream_chunks(item, stop_event, first_audio if played == 0 else None)
+                    with self.metrics.timer('playback'):
+                        self.audio_player.play_stream(chunks, item.sample_rate, stop_event=stop_event)
+                    played += 1
+                    continue
+                try:
+                    if played == 0:
+                        first_audio()
+                    with self.metrics.timer('playback'):
+                        self.audio_player.play(item, stop_event=stop_event)
+                    played += 1
+                finally:
+                    self._remove_file(item)
+        finally:
+            # 中止识别和合成阶段，并清理已合成但未播放的片段
+            abort.set()
+            if isinstance(synthesis, threading.Thread):
+                synthesis.join(timeout=5)
+            else:
+                # 取消常驻事件循环上进行中的合成，下一个请求不必等这句话合成完
+                synthesis.cancel()
+                concurrent.futures.wait([synthesis], timeout=5)
+            recognition.join(timeout=5)
+            if recognition.is_alive():
+                logger.warning("⚠️ OCR 阶段未能及时停止")
+            while True:
+                try:
+                    item = audio_queue.get_nowait()
+                except queue.Empty:
+                    break
+                if isinstance(item, str):
+                    self._remove_file(item)
+        if finished and played == 0:
+            logger.info("流程中断：未识别到文字。")
+            return False
+        self.metrics.observe('pipeline_total', time.perf_counter() - t_start)
+        return finished and not stop_event.is_set()
+
 
 if __name__ == '__main__':
-    # 用于直接测试整个流水线
+    # 用于直接测试流水线
+    # 使用方法: python3 pipeline.py /path/to/your/image.png
+    import sys
+    if len(sys.argv) < 2:
+        print("用法: python3 pipeline.py /path/to/your/image.png")
+        sys.exit(1)
     print("--- 流水线功能测试 ---")
     try:
-        # 1. 初始化所有组件
         from ocr import EasyOcrEngine
-        
-        screenshot_component = Screenshotter()
-        ocr_component = EasyOcrEngine() # 使用EasyOCR
-        tts_component = EdgeTtsEngine()
-        audio_component = AudioPlayer()
+        from tts import get_tts_engine
 
-        # 2. 创建流水线实例
+        audio_component = AudioPlayer()
         pipeline = ProcessingPipeline(
-            screenshotter=screenshot_component,
-            ocr_engine=ocr_component,
-            tts_engine=tts_component,
+            ocr_engine=EasyOcrEngine(),
+            tts_engine=get_tts_engine(),
             audio_player=audio_component
         )
-
-        # 3. 运行完整流程
-        pipeline.run()
-
+        pipeline.run(sys.argv[1])
+        print(default_metrics.snapshot())
+        audio_component.quit()
     except (ImportError, RuntimeError) as e:
         print(f"初始化或运行时失败: {e}")
-    except Exception as e:
-        print(f"发生了未知错误: {e}")
     finally:
-        # 在测试脚本中，确保pygame在最后退出
-        if 'audio_component' in locals():
-            audio_component.quit()
         print("--- 测试结束 ---")
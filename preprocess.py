@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+OCR 前的图片预处理 (全部为向量化的 NumPy 运算)。
+
+1. 裁掉四周均匀的背景边框 (对话框截图常带大片空白)。
+2. 转为灰度 (EasyOCR 内部同样只在灰度图上识别)。
+3. 估计文字行高，并缩放到识别模型最合适的范围：HiDPI 截图里文字往往比模型
+   需要的大得多，缩小后检测阶段的像素数成倍减少；极小的文字则适当放大。
+
+返回的 Preprocessed 记录了裁剪偏移和缩放比例，可以把坐标映射回原图。
+"""
+
+import logging
+
+from metrics import metrics as default_metrics
+
+logger = logging.getLogger("AMD-HELPER")
+
+# 与背景的灰度差超过这个值视为前景 (文字)
+INK_TOLERANCE = 24
+# 裁剪后保留的边距 (像素)，检测模型需要文字周围留一点背景
+TRIM_PADDING = 8
+# 文字行高的目标值和不做缩放的范围 (像素)
+TARGET_TEXT_HEIGHT = 24
+MIN_TEXT_HEIGHT = 14
+MAX_TEXT_HEIGHT = 40
+# 缩放比例的限制
+MIN_SCALE = 0.25
+MAX_SCALE = 2.5
+# 只把至少这么高的连续墨迹行当作文字行 (过滤下划线、分隔线)
+MIN_LINE_RUN = 4
+# 估计行高时把图片分成这么宽的竖条分别做水平投影，
+# 并排的两栏文字、文字旁的图片不会与文字行连成一个很高的"行"
+HEIGHT_STRIP_WIDTH = 128
+
+
+class Preprocessed:
+    """
+    预处理结果。
+
+    :param image: 处理后的灰度 uint8 数组。
+    :param offset: 裁剪区域在原图中的 (x, y)。
+    :param scale: 缩放比例 (处理后 / 裁剪后)。
+    :param original_shape: 原图形状。
+    :param text_height: 估计的文字行高 (原图像素)，无法估计时为 0。
+    """
+
+    def __init__(self, image, offset: tuple, scale: float, original_shape: tuple, text_height: float):
+        self.image = image
+        self.offset = offset
+        self.scale = scale
+        self.original_shape = original_shape
+        self.text_height = text_height
+
+    @property
+    def pixels_in(self) -> int:
+        return int(self.original_shape[0] * self.original_shape[1])
+
+    @property
+    def pixels_out(self) -> int:
+        return int(self.image.shape[0] * self.image.shape[1])
+
+    @property
+    def pixels_saved(self) -> int:
+        return max(0, self.pixels_in - self.pixels_out)
+
+    def to_original(self, x: float, y: float) -> tuple[float, float]:
+        """把处理后图片中的坐标映射回原图。"""
+        return x / self.scale + self.offset[0], y / self.scale + self.offset[1]
+
+
+def to_gray(image):
+    """RGB/RGBA/灰度数组 -> uint8 灰度数组 (ITU-R BT.601 权重，整数运算)。"""
+    import numpy as np
+    if image.ndim == 2:
+        return np.ascontiguousarray(image, dtype=np.uint8)
+    if image.shape[2] == 1:
+        return np.ascontiguousarray(image[..., 0], dtype=np.uint8)
+    r = image[..., 0].astype(np.uint16)
+    g = image[..., 1].astype(np.uint16)
+    b = image[..., 2].astype(np.uint16)
+    return ((r * 77 + g * 150 + b * 29) >> 8).astype(np.uint8)
+
+
+def background_level(gray) -> int:
+    """以四条边上像素的中位数作为背景灰度。"""
+    import numpy as np
+    border = np.concatenate([gray[0, :], gray[-1, :], gray[:, 0], gray[:, -1]])
+    return int(np.median(border))
+
+
+def ink_mask(gray, background: int):
+    import numpy as np
+    return np.abs(gray.astype(np.int16) - background) > INK_TOLERANCE
+
+
+def content_box(mask, padding: int = TRIM_PADDING):
+    """
+    前景的外接矩形 (加上边距)。
+
+    :return: (y0, y1, x0, x1)，没有前景时返回 None。
+    """
+    import numpy as np
+    rows = np.flatnonzero(mask.any(axis=1))
+    if rows.size == 0:
+        return None
+    cols = np.flatnonzero(mask.any(axis=0))
+    h, w = mask.shape
+    return (max(0, rows[0] - padding), min(h, rows[-1] + 1 + padding),
+            max(0, cols[0] - padding), min(w, cols[-1] + 1 + padding))
+
+
+def estimate_text_height(mask) -> float:
+    """
+    由水平投影估计文字行高：图片按 HEIGHT_STRIP_WIDTH 分成竖条，每个竖条内含墨迹的连续行
+    构成一个文本行，取所有竖条中行高的中位数。文字竖条产出很多行，图片等大块墨迹只产出一个，
+    中位数由文字决定。无法估计时返回 0。
+    """
+    import numpy as np
+    w = mask.shape[1]
+    strips = max(1, w // HEIGHT_STRIP_WIDTH)
+    bounds = np.linspace(0, w, strips + 1).astype(np.intp)
+    # (行, 竖条)：该竖条的这一行是否有墨迹
+    has_ink = np.logical_or.reduceat(mask, bounds[:-1], axis=1).astype(np.int8)
+    edges = np.diff(np.pad(has_ink, ((1, 1), (0, 0))), axis=0).T
+    # 按竖条展开后，每个竖条内的起点和终点依次成对
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    runs = ends - starts
+    runs = runs[runs >= MIN_LINE_RUN]
+    if runs.size == 0:
+        return 0.0
+    return float(np.median(runs))
+
+
+def choose_scale(text_height: float) -> float:
+    """文字行高不在合适范围内时，返回缩放到目标行高的比例，否则返回 1.0。"""
+    if text_height <= 0 or MIN_TEXT_HEIGHT <= text_height <= MAX_TEXT_HEIGHT:
+        return 1.0
+    scale = TARGET_TEXT_HEIGHT / text_height
+    return min(MAX_SCALE, max(MIN_SCALE, scale))
+
+
+def resize(gray, scale: float):
+    """缩放灰度图：整数倍缩小用块平均 (纯 NumPy)，其余情况用 Pillow。"""
+    import numpy as np
+    h, w = gray.shape
+    factor = round(1.0 / scale) if scale < 1.0 else 0
+    if factor >= 2 and abs(1.0 / factor - scale) < 1e-6:
+        h2, w2 = h // factor, w // factor
+        blocks = gray[:h2 * factor, :w2 * factor].reshape(h2, factor, w2, factor)
+        return (blocks.mean(axis=(1, 3)) + 0.5).astype(np.uint8)
+    from PIL import Image
+    size = (max(1, round(w * scale)), max(1, round(h * scale)))
+    resample = Image.Resampling.BOX if scale < 1.0 else Image.Resampling.BICUBIC
+    return np.asarray(Image.fromarray(gray).resize(size, resample))
+
+
+def preprocess(image, metrics=None) -> Preprocessed:
+    """
+    对一张截图做裁边、灰度化和文字尺寸归一化。
+
+    :param image: RGB/灰度 NumPy 数组。
+    :param metrics: 指标注册表，默认使用全局实例。
+    """
+    metrics = metrics or default_metrics
+    with metrics.timer('preprocess'):
+        gray = to_gray(image)
+        mask = ink_mask(gray, background_level(gray))
+        box = content_box(mask)
+        if box is None:
+            # 没有前景：交给 OCR 的图片越小越好
+            result = Preprocessed(gray[:1, :1], (0, 0), 1.0, image.shape, 0.0)
+        else:
+            y0, y1, x0, x1 = box
+            cropped = gray[y0:y1, x0:x1]
+            text_height = estimate_text_height(mask[y0:y1, x0:x1])
+            scale = choose_scale(text_height)
+            if scale != 1.0:
+                cropped = resize(cropped, scale)
+            result = Preprocessed(cropped, (x0, y0), scale, image.shape, text_height)
+
+    metrics.incr('preprocess_pixels_saved', result.pixels_saved)
+    metrics.set_gauge('preprocess_last_pixels_saved', result.pixels_saved)
+    logger.info(f"预处理: {image.shape[1]}x{image.shape[0]} -> {result.image.shape[1]}x{result.image.shape[0]} "
+                f"(行高 {result.text_height:.0f}px, 缩放 {result.scale:.2f}, 节省 {result.pixels_saved} 像素)")
+    return result
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+截图识别请求的调度器。
+
+- single-flight：同一时间只运行一个请求。
+- 合并：最多只有一个等待中的请求，等待期间的重复触发会被合并到它上面。
+- 抢占：新请求到达时，正在运行的请求会收到停止信号，并在下一个阶段边界
+  (截图之后、OCR 之后、每句合成/播放之间) 退出，播放会被立即打断。
+
+每个请求都有自己的 RequestContext，停止信号不再在并发的请求之间共享。
+"""
+
+import itertools
+import logging
+import threading
+import time
+import traceback
+from concurrent.futures import Future
+
+from metrics import metrics as default_metrics
+
+logger = logging.getLogger("AMD-HELPER")
+
+
+class RequestContext:
+    """一次请求的独立状态。"""
+
+    def __init__(self, request_id: int):
+        self.request_id = request_id
+        self.stop_event = threading.Event()
+        self.created = time.perf_counter()
+
+    def cancel(self):
+        """请求停止：各阶段会在边界处检查，播放会被立即打断。"""
+        self.stop_event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self.stop_event.is_set()
+
+
+def _run_in_thread(fn, *args) -> Future:
+    """默认的提交方式：在新线程中运行，返回 Future。"""
+    future = Future()
+
+    def runner():
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(fn(*args))
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=runner, name="request", daemon=True).start()
+    return future
+
+
+class RequestScheduler:
+    """
+    请求调度器。
+
+    :param handler: 处理一个请求的阻塞函数，签名为 handler(ctx: RequestContext)。
+    :param submit: 用于执行 handler 的提交函数，签名为 submit(fn, *args) -> Future，
+                   例如 OcrAndTtsProcessor.submit。默认每个请求在新线程中运行。
+    :param on_stop: 需要立即静音时调用的回调 (例如 AudioPlayer.stop)。
+    :param metrics: 指标注册表，默认使用全局实例。
+    """
+
+    def __init__(self, handler, submit=None, on_stop=None, metrics=None):
+        self._handler = handler
+        self._submit = submit or _run_in_thread
+        self._on_stop = on_stop
+        self.metrics = metrics or default_metrics
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._current = None
+        self._pending = None
+        self._closed = False
+        self._idle = threading.Event()
+        self._idle.set()
+        self._update_gauges_locked()
+
+    def _update_gauges_locked(self):
+        depth = (1 if self._current else 0) + (1 if self._pending else 0)
+        self.metrics.set_gauge('queue_depth', depth)
+        self.metrics.set_gauge('request_running', self._current is not None)
+
+    def _silence(self):
+        if self._on_stop is None:
+            return
+        try:
+            self._on_stop()
+        except Exception as e:
+            logger.warning(f"停止播放失败: {e}")
+
+    def trigger(self) -> int:
+        """
+        触发一次新请求。
+
+        :return: 将要处理此次触发的请求编号 (被合并时为已有的等待请求编号)。
+        """
+        preempted = False
+        start = None
+        with self._lock:
+            if self._closed:
+                return 0
+            self.metrics.incr('requests_triggered')
+            if self._pending is not None:
+                # 合并到已有的等待请求上
+                self.metrics.incr('requests_coalesced')
+                logger.debug(f"请求已合并到等待中的请求 #{self._pending.request_id}")
+                return self._pending.request_id
+
+            ctx = RequestContext(next(self._ids))
+            if self._current is None:
+                start = self._claim_locked(ctx)
+            else:
+                # 抢占正在运行的请求，新请求在其退出后立即开始
+                self._pending = ctx
+                self._current.cancel()
+                preempted = True
+                self.metrics.incr('requests_preempted')
+                logger.info(f"请求 #{self._current.request_id} 被新请求 #{ctx.request_id} 抢占")
+            self._update_gauges_locked()
+        if preempted:
+            self._silence()
+        if start is not None:
+            self._launch(start)
+        return ctx.request_id
+
+    def stop(self):
+        """停止当前请求并丢弃等待中的请求，立即静音。"""
+        with self._lock:
+            self._pending = None
+            if self._current is not None:
+                self._current.cancel()
+                self.metrics.incr('requests_stopped')
+                logger.info(f"请求 #{self._current.request_id} 被停止")
+            self._update_gauges_locked()
+        self._silence()
+
+    def _claim_locked(self, ctx: RequestContext) -> RequestContext:
+        """将请求标记为正在运行 (需持有锁)，随后在锁外调用 _launch。"""
+        self._current = ctx
+        self._idle.clear()
+        return ctx
+
+    def _launch(self, ctx: RequestContext):
+        self.metrics.observe('request_queue_wait', time.perf_counter() - ctx.created)
+        try:
+            future = self._submit(self._handler, ctx)
+        except Exception as e:
+            logger.error(f"提交请求 #{ctx.request_id} 失败: {e}")
+            future = Future()
+            future.set_exception(e)
+        future.add_done_callback(lambda f, ctx=ctx: self._on_done(ctx, f))
+
+    def _on_done(self, ctx: RequestContext, future: Future):
+        try:
+            future.result()
+        except BaseException as e:
+            logger.error(f"请求 #{ctx.request_id} 执行失败: {e}")
+            logger.debug(traceback.format_exc())
+        self.metrics.observe('request_total', time.perf_counter() - ctx.created)
+        start = None
+        with self._lock:
+            if self._current is ctx:
+                self._current = None
+            if self._pending is not None and not self._closed:
+                next_ctx, self._pending = self._pending, None
+                start = self._claim_locked(next_ctx)
+            if self._current is None:
+                self._idle.set()
+            self._update_gauges_locked()
+        if start is not None:
+            self._launch(start)
+
+    def wait_idle(self, timeout: float = None) -> bool:
+        """等待所有请求结束。"""
+        return self._idle.wait(timeout)
+
+    def close(self, timeout: float = 5):
+        """停止所有请求并拒绝新的触发。"""
+        with self._lock:
+            self._closed = True
+        self.stop()
+        self.wait_idle(timeout)
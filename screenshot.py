@@ -14,17 +14,34 @@ class Screenshotter:
 
     def __init__(self):
         """初始化截图工具。libshot 会自动选择最佳后端。"""
-        # The print statement from libshot's __init__ is now the source of truth
-        pass
+        # libshot 在首次使用时才导入后端和截图库；服务在后台加载本组件时
+        # 提前完成后端选择，第一次按下 F4 时不必再等待
+        try:
+            libshot.preload()
+        except Exception as e:
+            print(f"⚠️ 截图后端预加载失败，将在首次截图时重试: {e}")
 
-    def take_screenshot(self) -> str | None:
+    def take_screenshot(self, save_to_file: bool = False):
         """
-        执行交互式截图操作，返回截图文件的绝对路径。
+        执行交互式截图操作。
+
+        默认直接返回内存中的 RGB NumPy 数组 (形状为 (高, 宽, 3))，不写任何文件。
+        只有调用方显式传入 save_to_file=True 时，才会编码为 PNG 临时文件并返回其路径。
         如果截图失败或取消，则返回 None。
+
+        :param save_to_file: 是否将截图保存为临时 PNG 文件并返回文件路径。
         """
         print("🖼️  请选择截图区域...")
         try:
             # The single, unified entry point for the best interactive experience
+            if not save_to_file:
+                pixels = libshot.capture_interactive(as_array=True)
+                if pixels is None or pixels.size == 0:
+                    print("❌ 截图取消或失败。")
+                    return None
+                print(f"✅ 截图成功，尺寸: {pixels.shape[1]}x{pixels.shape[0]}")
+                return pixels
+
             image = libshot.capture_interactive()
 
             if image is None:
@@ -34,7 +51,7 @@ class Screenshotter:
             # Save the Pillow Image object to a temporary file
             with tempfile.NamedTemporaryFile(suffix='.png', delete=False) as temp_image_file:
                 file_path = temp_image_file.name
-            
+
             image.save(file_path, 'PNG')
 
             if Path(file_path).stat().st_size > 0:
@@ -54,7 +71,7 @@ if __name__ == '__main__':
     print("正在测试新的交互式截图功能...")
     try:
         screenshotter = Screenshotter()
-        screenshot_path = screenshotter.take_screenshot()
+        screenshot_path = screenshotter.take_screenshot(save_to_file=True)
         if screenshot_path:
             print(f"✅ 测试成功，截图路径: {screenshot_path}")
         else:
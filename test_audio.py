@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""AudioPlayer 停止逻辑的测试 (用假的混音器代替 pygame)：python3 -m pytest test_audio.py"""
+
+import threading
+import types
+
+from audio import AudioPlayer
+
+
+class FakeMusic:
+    def __init__(self, polls: int):
+        self.polls = polls
+        self.remaining = 0
+        self.stopped = False
+
+    def load(self, path):
+        pass
+
+    def play(self):
+        self.remaining = self.polls
+        self.stopped = False
+
+    def get_busy(self):
+        if self.remaining <= 0:
+            return False
+        self.remaining -= 1
+        return True
+
+    def stop(self):
+        self.remaining = 0
+        self.stopped = True
+
+
+class FakeChannel:
+    def __init__(self):
+        self.played = []
+        self.stopped = False
+
+    def get_queue(self):
+        return None
+
+    def queue(self, sound):
+        self.played.append(sound)
+
+    def get_busy(self):
+        return False
+
+    def stop(self):
+        self.stopped = True
+
+
+def fake_player(polls: int = 3):
+    """不初始化 pygame 的 AudioPlayer：混音器的 music 播放 polls 次轮询后结束。"""
+    channel = FakeChannel()
+    mixer = types.SimpleNamespace(
+        get_init=lambda: (44100, -16, 1),
+        music=FakeMusic(polls),
+        find_channel=lambda force=False: channel,
+        Sound=lambda buffer: buffer,
+        stop=lambda: None,
+    )
+    player = AudioPlayer.__new__(AudioPlayer)
+    player._pygame = types.SimpleNamespace(mixer=mixer, error=RuntimeError)
+    player._stop_event = threading.Event()
+    return player, channel
+
+
+def test_play_after_stop_during_external_event_play(tmp_path):
+    audio_file = tmp_path / "a.wav"
+    audio_file.write_bytes(b"RIFF0000")
+    player, _channel = fake_player()
+    # 流水线的播放使用外部事件，stop() 只设置了内部事件，不会在 finally 中被清除
+    player.play(str(audio_file), stop_event=threading.Event())
+    player.stop()
+    player.play(str(audio_file))
+    assert not player._pygame.mixer.music.stopped
+    assert player._pygame.mixer.music.remaining == 0
+
+
+def test_play_stream_after_stop(tmp_path):
+    player, channel = fake_player()
+    player.stop()
+    player.play_stream(iter([bytes(44100 * 2)]), 44100)
+    assert channel.played
+    assert not channel.stopped
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""OCR 结果缓存的测试：python3 -m pytest test_ocr_cache.py"""
+
+import queue
+from threading import Event
+
+import numpy as np
+import pytest
+
+from metrics import Metrics
+from ocr import EasyOcrEngine, OcrEngine
+from ocr_cache import CachedOcrEngine, OcrResultCache
+from pipeline import ProcessingPipeline, _END
+
+
+class FailingStreamEngine(OcrEngine):
+    """产出两段文本后识别失败的引擎。"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def recognize(self, image):
+        raise NotImplementedError
+
+    def recognize_stream(self, image):
+        self.calls += 1
+        yield "First line of text.", "en"
+        yield "\nSecond", "en"
+        raise RuntimeError("识别到一半失败")
+
+
+def sample_image():
+    image = np.full((60, 200, 3), 255, dtype=np.uint8)
+    image[20:40, 10:190:7] = 0
+    return image
+
+
+def text_image(text: str, dx: int = 0, dy: int = 0):
+    """白底黑字的一行文字，整体平移 (dx, dy) 像素。"""
+    from PIL import Image, ImageDraw, ImageFont
+    image = Image.new("RGB", (360, 60), (255, 255, 255))
+    ImageDraw.Draw(image).text((20 + dx, 18 + dy), text, font=ImageFont.load_default(size=20), fill=(0, 0, 0))
+    return np.asarray(image)
+
+
+def new_cache():
+    return OcrResultCache(max_bytes=8 * 1024 * 1024, metrics=Metrics())
+
+
+def test_failed_stream_is_not_cached():
+    engine = FailingStreamEngine()
+    cached = CachedOcrEngine(engine, new_cache())
+    image = sample_image()
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            list(cached.recognize_stream(image))
+    # 第二次没有命中缓存，仍然交给引擎识别
+    assert engine.calls == 2
+    assert cached.cache.lookup(cached.cache.query(image)) is None
+
+
+def test_failed_stream_reaches_pipeline():
+    cached = CachedOcrEngine(FailingStreamEngine(), new_cache())
+    pipeline = ProcessingPipeline(cached, tts_engine=None, audio_player=None, metrics=Metrics())
+    sentence_queue = queue.Queue()
+    pipeline._recognize_all(sample_image(), sentence_queue, Event())
+    items = []
+    while not sentence_queue.empty():
+        items.append(sentence_queue.get_nowait())
+    assert ("First line of text.", "en") in items
+    assert isinstance(items[-1], RuntimeError)
+    assert _END not in items
+
+
+def test_easyocr_stream_raises_after_partial_output():
+    # 不加载模型：只替换逐行识别的部分
+    engine = EasyOcrEngine.__new__(EasyOcrEngine)
+    engine.preprocess = False
+    engine._pool = None
+    engine._choose_detection = lambda image, text_height=None: None
+    engine._needs_tiling = lambda image: False
+
+    def lines():
+        yield "First line of text."
+        raise RuntimeError("识别到一半失败")
+
+    engine._stream_lines = lambda image, detection=None: iter([lines()])
+    stream = engine.recognize_stream(sample_image())
+    assert next(stream) == ("First line of text.", "en")
+    with pytest.raises(RuntimeError):
+        next(stream)
+
+
+def test_shifted_capture_hits():
+    cache = new_cache()
+    cache.store(cache.query(text_image("Save changes to the file")), ("Save changes to the file", "en"))
+    assert cache.lookup(cache.query(text_image("Save changes to the file", dx=2, dy=1))) is not None
+
+
+def test_trailing_punctuation_misses():
+    cache = new_cache()
+    cache.store(cache.query(text_image("Save changes to the file")), ("Save changes to the file", "en"))
+    assert cache.lookup(cache.query(text_image("Save changes to the file."))) is None
+    assert cache.lookup(cache.query(text_image("Save changes to the file.", dx=2, dy=1))) is None
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""预处理中文字行高估计的测试：python3 -m pytest test_preprocess.py"""
+
+import numpy as np
+
+from preprocess import choose_scale, estimate_text_height
+
+LINE_HEIGHT = 16
+
+
+def draw_lines(mask, x0: int, x1: int, y0: int, count: int, pitch: int):
+    """在 mask 中画 count 行文字 (墨迹块之间留出字间距)。"""
+    for index in range(count):
+        y = y0 + index * pitch
+        for x in range(x0, x1 - 10, 12):
+            mask[y:y + LINE_HEIGHT, x:x + 9] = True
+
+
+def test_single_column():
+    mask = np.zeros((400, 600), dtype=bool)
+    draw_lines(mask, 10, 590, 10, 12, 28)
+    assert estimate_text_height(mask) == LINE_HEIGHT
+    assert choose_scale(estimate_text_height(mask)) == 1.0
+
+
+def test_two_columns_with_offset_lines():
+    # 两栏的行错开半行：整幅宽度的投影中所有行连成一片
+    mask = np.zeros((400, 800), dtype=bool)
+    draw_lines(mask, 10, 390, 10, 12, 28)
+    draw_lines(mask, 410, 790, 24, 12, 28)
+    assert mask.any(axis=1)[10:24 + 11 * 28 + LINE_HEIGHT].all()
+    assert estimate_text_height(mask) == LINE_HEIGHT
+    assert choose_scale(estimate_text_height(mask)) == 1.0
+
+
+def test_image_next_to_text():
+    mask = np.zeros((400, 800), dtype=bool)
+    mask[20:380, 10:300] = True  # 文字左边的图片
+    draw_lines(mask, 320, 790, 20, 12, 28)
+    assert estimate_text_height(mask) == LINE_HEIGHT
+    assert choose_scale(estimate_text_height(mask)) == 1.0
@@ -13,13 +13,9 @@ import asyncio
 import locale
 import subprocess
 import shutil
-import smtplib
-import requests
 import logging
 import traceback
 from datetime import datetime
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
 from PIL import Image, ImageDraw
 
 import pystray
@@ -54,6 +50,12 @@ logger.addHandler(console_handler)
 # 确保可以从当前目录导入模块
 sys.path.append(os.path.dirname(__file__))
 from core import OcrAndTtsProcessor
+from metrics import metrics
+from lazy_import import try_lazy_import
+
+# 只在少见的菜单操作中用到的依赖，首次使用时才真正导入
+requests = try_lazy_import("requests")
+pyperclip = try_lazy_import("pyperclip")
 
 # --- 全局变量 & 常量 ---
 APP_NAME = "A.M.D-HELPER"
@@ -79,7 +81,13 @@ TRANSLATIONS = {
         "initializing": "Initializing...",
         "ready_notification": f"{APP_NAME} is ready",
         "ready_message": "Models loaded successfully, ready to use.",
+        "init_failed_notification": "Some components failed to load",
+        "init_failed_message": "Unavailable: {names}. See the log for details.",
         "trigger_ocr": "Trigger Screenshot OCR",
+        "stop_reading": "Stop Reading",
+        "status_ready": "Status: Ready",
+        "status_loading": "Status: Loading ({ready}/{total})...",
+        "status_failed": "Status: Unavailable: {names}",
         "tts_model": "TTS Model",
         "language": "Language",
         "help": "Shortcut Help",
@@ -118,7 +126,13 @@ TRANSLATIONS = {
         "initializing": "正在初始化...",
         "ready_notification": f"{APP_NAME} 已就绪",
         "ready_message": "模型加载成功，可以开始使用了",
+        "init_failed_notification": "部分组件加载失败",
+        "init_failed_message": "不可用: {names}，详情请查看日志。",
         "trigger_ocr": "手动触发截图OCR",
+        "stop_reading": "停止朗读",
+        "status_ready": "状态: 已就绪",
+        "status_loading": "状态: 正在加载 ({ready}/{total})...",
+        "status_failed": "状态: 不可用: {names}",
         "tts_model": "TTS 模型",
         "language": "语言",
         "help": "快捷键帮助",
@@ -157,7 +171,13 @@ TRANSLATIONS = {
         "initializing": "正在初始化...",
         "ready_notification": f"{APP_NAME} 已就緒",
         "ready_message": "模型加載成功，可以開始使用了",
+        "init_failed_notification": "部分組件加載失敗",
+        "init_failed_message": "不可用: {names}，詳情請查看日誌。",
         "trigger_ocr": "手動觸發截圖OCR",
+        "stop_reading": "停止朗讀",
+        "status_ready": "狀態: 已就緒",
+        "status_loading": "狀態: 正在加載 ({ready}/{total})...",
+        "status_failed": "狀態: 不可用: {names}",
         "tts_model": "TTS 模型",
         "language": "語言",
         "help": "快捷鍵幫助",
@@ -223,7 +243,22 @@ class AmdHelperService(ServiceInterface):
     @method()
     def trigger_ocr(self):
         print("D-Bus: 收到 trigger_ocr 请求")
-        threading.Thread(target=self.processor.run_full_process, daemon=True).start()
+        # 交给调度器：重复触发会被合并，新请求会抢占正在运行的请求
+        self.processor.request()
+
+    @method()
+    def stop(self):
+        print("D-Bus: 收到 stop 请求")
+        self.processor.stop()
+
+    @method()
+    def get_metrics(self) -> 's':
+        return json.dumps(metrics.snapshot(), ensure_ascii=False)
+
+    @method()
+    def get_status(self) -> 's':
+        """各组件的就绪状态 (pending/loading/ready/failed/unloaded)，JSON 格式。"""
+        return json.dumps(self.processor.status(), ensure_ascii=False)
 
 # --- 配置读写 ---
 def get_full_config():
@@ -290,11 +325,7 @@ def write_config(config):
         print(f"❌ 写入配置文件 '{user_config_path}' 失败: {e}")
 
 # --- 快捷键帮助函数 ---
-try:
-    import pyperclip
-    PYPERCLIP_AVAILABLE = True
-except ImportError:
-    PYPERCLIP_AVAILABLE = False
+PYPERCLIP_AVAILABLE = pyperclip is not None
 
 # --- 关于窗口 ---
 # 延迟导入 tkinter 以避免在非GUI环境中出现问题
@@ -357,6 +388,8 @@ def show_about_window_tk():
 def send_report_via_worker(description, log_content):
     """通过Cloudflare Worker发送邮件报告，以保证凭证安全。"""
     try:
+        if requests is None:
+            raise ImportError("requests")
         url = "https://xmt.xmt.workers.dev/"
         
         # 准备要发送的数据
@@ -621,13 +654,48 @@ class AppTray:
         # 在单独的线程中运行UI，以避免阻塞主事件循环
         threading.Thread(target=show_about_window_tk, daemon=True).start()
 
+    def _status_text(self):
+        """托盘菜单顶部显示的就绪状态。"""
+        if self.processor is None:
+            return _("initializing")
+        status = self.processor.status()
+        components = status["components"]
+        failed = [name for name, c in components.items() if c["state"] == "failed"]
+        if failed:
+            return _("status_failed").format(names=", ".join(failed))
+        if status["ready"]:
+            return _("status_ready")
+        ready = sum(1 for c in components.values() if c["state"] in ("ready", "unloaded"))
+        return _("status_loading").format(ready=ready, total=len(components))
+
+    def _on_status_change(self, status):
+        """组件状态变化时 (在加载线程中调用) 刷新菜单中的状态项。"""
+        if self.icon is not None and self.service is not None:
+            self.icon.menu = self.build_menu()
+
+    async def _notify_when_ready(self):
+        """所有组件结束加载后发出通知，不阻塞托盘和 D-Bus 服务。"""
+        # 轮询而不是在线程池中阻塞等待，退出时可以直接取消
+        while not self.processor.wait_ready(timeout=0):
+            await asyncio.sleep(0.5)
+        status = self.processor.status()
+        failed = [name for name, c in status["components"].items() if c["state"] == "failed"]
+        if failed:
+            print(f"部分组件加载失败: {', '.join(failed)}")
+            self.icon.notify(_("init_failed_notification"), _("init_failed_message").format(names=", ".join(failed)))
+        else:
+            print("模型加载完毕，服务准备就绪。")
+            self.icon.notify(_("ready_notification"), _("ready_message"))
+
     def build_menu(self):
         f4_command = f"python3 {os.path.join(SCRIPT_DIR, 'f4.py')}"
         f1_command = f"python3 {os.path.join(SCRIPT_DIR, 'f1.py')}"
         tray_command = f"bash {os.path.join(SCRIPT_DIR, 'tray.sh')}"
 
         return Menu(
+            MenuItem(self._status_text(), None, enabled=False),
             MenuItem(_('trigger_ocr'), lambda: self.service.trigger_ocr()),
+            MenuItem(_('stop_reading'), lambda: self.service.stop()),
             Menu.SEPARATOR,
             MenuItem(_('tts_model'), Menu(
                 MenuItem('Edge TTS', lambda: self._set_tts_engine_action('edge'), checked=lambda item: self.config.get("tts_model") == 'edge', radio=True),
@@ -672,10 +740,10 @@ class AppTray:
 
         print("D-Bus服务名获取成功，应用为唯一实例。")
 
-        print("正在加载AI模型，请稍候...")
-        self.processor = OcrAndTtsProcessor()
-        print("模型加载完毕，服务准备就绪。")
-        self.icon.notify(_("ready_notification"), _("ready_message"))
+        # 组件在后台并发加载；D-Bus 服务和托盘菜单立即可用，
+        # 过早的 F4 请求只会等待它实际需要的组件
+        print("正在后台加载AI模型...")
+        self.processor = OcrAndTtsProcessor(on_status_change=self._on_status_change)
 
         self.service = AmdHelperService(self.processor)
         self.dbus_bus.export(DBUS_OBJECT_PATH, self.service)
@@ -688,7 +756,9 @@ class AppTray:
         tray_thread = threading.Thread(target=self.icon.run, daemon=True)
         tray_thread.start()
 
+        ready_task = asyncio.create_task(self._notify_when_ready())
         await self.exit_event.wait()
+        ready_task.cancel()
         
         print("主事件循环收到退出信号，开始清理...")
         self.dbus_bus.disconnect()
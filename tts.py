@@ -8,6 +8,9 @@ import os
 import shutil
 import sys
 import logging
+import tempfile
+import threading
+import time
 import traceback
 
 # 获取 logger
@@ -20,33 +23,188 @@ SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 USER_CONFIG_DIR = os.path.expanduser(os.path.join("~", ".config", "a.m.d-helper"))
 USER_CONFIG_PATH = os.path.join(USER_CONFIG_DIR, "config.json")
 
+# 流式合成时每个 PCM 片段的最大字节数 (16 位单声道，22050Hz 下约 0.19 秒)
+PCM_CHUNK_BYTES = 8192
+# 合成线程最多领先消费方这么多个片段，超过时暂停合成，内存占用与文本长度无关
+PCM_MAX_PENDING_CHUNKS = 8
+# Edge TTS 的 MP3 解码后的采样率 (与服务端 audio-24khz-48kbitrate-mono-mp3 一致)
+EDGE_SAMPLE_RATE = 24000
+
 # 定义一个基础的TTS引擎接口 (可选，但良好实践)
 class TtsEngine:
+    # 合成结果的音频文件后缀
+    audio_suffix = '.mp3'
+
+    async def start(self):
+        """
+        在处理器的常驻事件循环上调用一次，用于准备可跨请求复用的资源。
+        默认不做任何事。
+        """
+        pass
+
+    async def aclose(self):
+        """释放 start() 中准备的资源。默认不做任何事。"""
+        pass
+
     async def synthesize(self, text: str, output_path: str, lang: str = 'auto'):
         raise NotImplementedError
 
+    def voice(self, lang: str = 'auto') -> str:
+        """合成指定语言时使用的声音 (作为音频缓存键的一部分)。默认返回语言本身。"""
+        return lang
+
+    # 是否支持 stream_pcm() 流式合成
+    supports_pcm_stream = False
+
+    def pcm_sample_rate(self, lang: str = 'auto') -> int:
+        """stream_pcm() 产出的 PCM 的采样率。"""
+        raise NotImplementedError
+
+    async def stream_pcm(self, text: str, lang: str = 'auto'):
+        """
+        边合成边产出 16 位单声道的原始 PCM 片段 (bytes)，不写临时文件。
+        只有 supports_pcm_stream 为 True 的引擎实现此方法。
+        """
+        raise NotImplementedError
+        yield
+
 class EdgeTtsEngine(TtsEngine):
-    """使用 edge-tts 命令行工具合成语音"""
+    """
+    使用 edge-tts 合成语音。
+
+    stream=True 且系统中有 ffmpeg 时支持流式合成：Communicate.stream() 收到的 MP3 片段
+    立即送入 ffmpeg 解码为 PCM，边下载边播放，而不是等整个文件下载完。
+    endpoint 指向 edge_standin.py 的替身服务时不访问网络，用于离线测试。
+    """
     
     MAX_RETRIES = 3
+
+    def __init__(self, stream: bool = True, endpoint: str = None, retries: int = MAX_RETRIES):
+        """
+        :param stream: 是否支持流式合成 (还需要 ffmpeg)。
+        :param endpoint: 替身服务的地址，为 None 时访问 Edge TTS。
+        :param retries: 失败时的尝试次数。由 TtsRouter 切换备用引擎时设为 1。
+        """
+        self.stream = stream
+        self.endpoint = endpoint
+        self.retries = max(1, retries)
+
+    @property
+    def supports_pcm_stream(self) -> bool:
+        return self.stream and shutil.which("ffmpeg") is not None
+
+    def pcm_sample_rate(self, lang: str = 'auto') -> int:
+        return EDGE_SAMPLE_RATE
+
+    async def _audio_chunks(self, text: str, voice: str):
+        """逐块产出服务端返回的 MP3 数据。"""
+        if self.endpoint:
+            from edge_standin import stream_from
+            async for data in stream_from(self.endpoint, text, voice):
+                yield data
+            return
+        import edge_tts
+        async for message in edge_tts.Communicate(text, voice).stream():
+            if message["type"] == "audio":
+                yield message["data"]
+
+    async def _decode(self, mp3_chunks):
+        """把 MP3 片段送入 ffmpeg，逐块产出解码后的 16 位单声道 PCM。"""
+        process = await asyncio.create_subprocess_exec(
+            "ffmpeg", "-hide_banner", "-loglevel", "error",
+            "-probesize", "4096", "-analyzeduration", "0", "-f", "mp3", "-i", "pipe:0",
+            "-f", "s16le", "-ac", "1", "-ar", str(EDGE_SAMPLE_RATE), "pipe:1",
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+
+        async def feed():
+            try:
+                async for data in mp3_chunks:
+                    process.stdin.write(data)
+                    await process.stdin.drain()
+            finally:
+                process.stdin.close()
+
+        feeder = asyncio.create_task(feed())
+        try:
+            while True:
+                pcm = await process.stdout.read(PCM_CHUNK_BYTES)
+                if not pcm:
+                    break
+                yield pcm
+            # 下载失败时在这里抛出网络异常
+            await feeder
+            if await process.wait() != 0:
+                raise RuntimeError(f"ffmpeg 解码失败 (返回码 {process.returncode})")
+        finally:
+            feeder.cancel()
+            if process.returncode is None:
+                process.kill()
+                await process.wait()
+
+    async def stream_pcm(self, text: str, lang: str = 'auto'):
+        """
+        流式合成：记录首字节 (edge_first_byte) 与首段可播放音频 (edge_first_audio) 的延迟。
+        第一个片段到达之前失败时重试，开始播放之后的失败直接抛出。
+        """
+        from metrics import metrics
+        logger.info("🔄 使用 Edge-TTS 进行流式语音合成...")
+        voice = self.voice(lang)
+        start = time.perf_counter()
+
+        async def timed_chunks():
+            last_error = None
+            for attempt in range(1, self.retries + 1):
+                received = False
+                try:
+                    async for data in self._audio_chunks(text, voice):
+                        if not received:
+                            metrics.observe('edge_first_byte', time.perf_counter() - start)
+                            received = True
+                        yield data
+                    return
+                except Exception as e:
+                    if received:
+                        raise
+                    last_error = e
+                    logger.warning(f"Edge-TTS 尝试 {attempt} 失败: {e}")
+                if attempt < self.retries:
+                    await asyncio.sleep(attempt * 2)
+            raise RuntimeError(f"Edge-TTS 合成失败: {last_error}")
+
+        first = True
+        async for pcm in self._decode(timed_chunks()):
+            if first:
+                ttfa = time.perf_counter() - start
+                metrics.observe('edge_first_audio', ttfa)
+                logger.info(f"⏱️ Edge-TTS 首段音频: {ttfa:.3f}s")
+                first = False
+            yield pcm
+
+    def voice(self, lang: str = 'auto') -> str:
+        return "zh-CN-XiaoxiaoNeural" if lang == 'zh' else "en-US-JennyNeural"
     
     async def synthesize(self, text: str, output_path: str, lang: str = 'auto'):
         logger.info("🔄 使用 Edge-TTS 进行语音合成...")
-        voice = "zh-CN-XiaoxiaoNeural" if lang == 'zh' else "en-US-JennyNeural"
+        voice = self.voice(lang)
         logger.debug(f"Edge-TTS 参数: voice={voice}, lang={lang}, output={output_path}")
         logger.debug(f"合成文本: {text[:100]}...")
         
         last_error = None
         
-        for attempt in range(1, self.MAX_RETRIES + 1):
+        for attempt in range(1, self.retries + 1):
             try:
-                logger.debug(f"尝试 {attempt}/{self.MAX_RETRIES}...")
-                
-                # 使用 Python API 直接调用
-                import edge_tts
+                logger.debug(f"尝试 {attempt}/{self.retries}...")
                 
-                communicate = edge_tts.Communicate(text, voice)
-                await communicate.save(output_path)
+                if self.endpoint:
+                    with open(output_path, "wb") as f:
+                        async for data in self._audio_chunks(text, voice):
+                            f.write(data)
+                else:
+                    # 使用 Python API 直接调用
+                    import edge_tts
+
+                    communicate = edge_tts.Communicate(text, voice)
+                    await communicate.save(output_path)
                 
                 # 验证输出文件
                 if os.path.exists(output_path):
@@ -64,26 +222,287 @@ class EdgeTtsEngine(TtsEngine):
                 error_msg = str(e)
                 logger.warning(f"Edge-TTS 尝试 {attempt} 失败: {error_msg}")
             
-            if attempt < self.MAX_RETRIES:
+            if attempt < self.retries:
                 delay = attempt * 2
                 logger.debug(f"等待 {delay} 秒后重试...")
                 await asyncio.sleep(delay)
         
         # 所有重试都失败
-        logger.error(f"Edge-TTS 在 {self.MAX_RETRIES} 次尝试后仍然失败")
+        logger.error(f"Edge-TTS 在 {self.retries} 次尝试后仍然失败")
         logger.error(f"最后一次错误: {last_error}")
         logger.error(f"异常详情:\n{traceback.format_exc()}")
         raise RuntimeError(f"Edge-TTS 合成失败: {last_error}")
 
 import sys
 
+def _module_available(name: str) -> bool:
+    import importlib.util
+    return importlib.util.find_spec(name) is not None
+
+def _load_piper_voice(model_path: str):
+    """在本进程中加载一个 Piper 语音模型 (ONNX)。"""
+    from piper import PiperVoice
+    return PiperVoice.load(model_path)
+
+def _iter_voice_pcm(voice, text: str):
+    """用已加载的 PiperVoice 逐句产出 16 位单声道 PCM (bytes)。"""
+    if hasattr(voice, "synthesize_wav"):
+        # piper-tts >= 1.3: synthesize() 逐句产出 AudioChunk
+        for chunk in voice.synthesize(text):
+            yield chunk.audio_int16_bytes
+    else:
+        yield from voice.synthesize_stream_raw(text)
+
+async def _stream_voice_pcm(voice, text: str):
+    """
+    在线程池中运行 PiperVoice 的流式合成，逐块产出 PCM。
+    合成线程最多领先 PCM_MAX_PENDING_CHUNKS 个片段；消费方停止迭代时合成随之停止。
+    """
+    loop = asyncio.get_running_loop()
+    chunks = asyncio.Queue()
+    slots = threading.Semaphore(PCM_MAX_PENDING_CHUNKS)
+    cancelled = threading.Event()
+    end = object()
+
+    def produce():
+        try:
+            for data in _iter_voice_pcm(voice, text):
+                for offset in range(0, len(data), PCM_CHUNK_BYTES):
+                    while not slots.acquire(timeout=0.05):
+                        if cancelled.is_set():
+                            return
+                    loop.call_soon_threadsafe(chunks.put_nowait, data[offset:offset + PCM_CHUNK_BYTES])
+        except Exception as e:
+            loop.call_soon_threadsafe(chunks.put_nowait, e)
+        finally:
+            loop.call_soon_threadsafe(chunks.put_nowait, end)
+
+    producer = loop.run_in_executor(None, produce)
+    try:
+        while True:
+            item = await chunks.get()
+            if item is end:
+                break
+            if isinstance(item, Exception):
+                raise item
+            slots.release()
+            yield item
+    finally:
+        cancelled.set()
+        await producer
+
+def _synthesize_wav(voice, text: str, output_path: str):
+    """用已加载的 PiperVoice 合成一个 WAV 文件 (在线程池中运行，推理时释放 GIL)。"""
+    import wave
+    with wave.open(output_path, "wb") as wav:
+        if hasattr(voice, "synthesize_wav"):
+            # piper-tts >= 1.3
+            voice.synthesize_wav(text, wav)
+        else:
+            voice.synthesize(text, wav)
+
+class _PiperProcess:
+    """
+    常驻的 piper 进程：模型只在启动时加载一次，之后从标准输入逐行读取文本，
+    每行合成一个 WAV 文件写入临时目录，并在标准输出打印文件路径。
+    """
+
+    def __init__(self, executable: str, model_path: str):
+        self.executable = executable
+        self.model_path = model_path
+        self.process = None
+        self._dir = None
+        self._lock = asyncio.Lock()
+
+    async def start(self):
+        self._dir = tempfile.mkdtemp(prefix="amd-helper-piper-")
+        self.process = await asyncio.create_subprocess_exec(
+            self.executable, "--model", self.model_path, "--output_dir", self._dir,
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+
+    async def synthesize(self, text: str, output_path: str):
+        # piper 以换行分隔输入，一句话必须在同一行
+        line = " ".join(text.split())
+        if not line:
+            raise ValueError("合成的文本为空")
+        # 写入一行就必须读回一行路径，否则下一句会读到这一句的输出。
+        # 调用方被取消 (F1 换了悬停目标、路由取消了落败的引擎) 时交换仍在独立的任务中完成，
+        # 由它读走这一行并删除多余的文件
+        exchange = asyncio.ensure_future(self._exchange(line))
+        try:
+            path = await asyncio.shield(exchange)
+        except asyncio.CancelledError:
+            exchange.add_done_callback(self._discard)
+            raise
+        shutil.move(path, output_path)
+
+    async def _exchange(self, line: str) -> str:
+        async with self._lock:
+            if self.process.returncode is not None:
+                raise RuntimeError(f"piper 进程已退出 (返回码 {self.process.returncode})")
+            self.process.stdin.write(line.encode("utf-8") + b"\n")
+            await self.process.stdin.drain()
+            path = (await self.process.stdout.readline()).decode("utf-8").strip()
+        if not path:
+            raise RuntimeError("piper 进程意外退出")
+        return path
+
+    @staticmethod
+    def _discard(exchange: asyncio.Future):
+        """调用方已取消：删除交换产生的 WAV 文件。"""
+        if exchange.cancelled() or exchange.exception() is not None:
+            return
+        try:
+            os.remove(exchange.result())
+        except OSError:
+            pass
+
+    async def aclose(self):
+        if self.process is not None and self.process.returncode is None:
+            self.process.stdin.close()
+            try:
+                await asyncio.wait_for(self.process.wait(), timeout=2)
+            except asyncio.TimeoutError:
+                self.process.kill()
+                await self.process.wait()
+        if self._dir:
+            shutil.rmtree(self._dir, ignore_errors=True)
+
+class PiperVoicePool:
+    """
+    常驻的 Piper 语音模型：每个模型只加载一次，之后每句话只有推理的开销。
+
+    优先通过 piper 的 Python API (PiperVoice) 在本进程中加载；没有 piper 模块时
+    (例如只安装了独立的 piper 可执行文件)，为每个模型启动一个常驻的 piper 进程，通过管道送入文本。
+    """
+
+    def __init__(self, find_executable):
+        self._find_executable = find_executable
+        self._voices = {}  # 模型路径 -> PiperVoice 或 _PiperProcess
+        self._lock = asyncio.Lock()
+        self.in_process = _module_available("piper")
+
+    def loaded(self) -> list[str]:
+        return list(self._voices)
+
+    async def get(self, model_path: str):
+        voice = self._voices.get(model_path)
+        if voice is not None:
+            return voice
+        async with self._lock:
+            voice = self._voices.get(model_path)
+            if voice is not None:
+                return voice
+            from metrics import metrics
+            logger.info(f"🔄 正在加载 Piper 语音模型: {os.path.basename(model_path)}")
+            with metrics.timer('tts_voice_load'):
+                if self.in_process:
+                    voice = await asyncio.get_running_loop().run_in_executor(None, _load_piper_voice, model_path)
+                else:
+                    voice = _PiperProcess(self._find_executable(), model_path)
+                    await voice.start()
+            self._voices[model_path] = voice
+            return voice
+
+    def sample_rate(self, model_path: str) -> int:
+        """语音模型的采样率，读取模型旁的 .onnx.json 配置。"""
+        voice = self._voices.get(model_path)
+        config = getattr(voice, "config", None)
+        if config is not None and hasattr(config, "sample_rate"):
+            return config.sample_rate
+        try:
+            with open(model_path + ".json", "r", encoding="utf-8") as f:
+                return int(json.load(f)["audio"]["sample_rate"])
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"无法读取 Piper 模型的采样率，假定为 22050Hz: {e}")
+            return 22050
+
+    async def stream(self, model_path: str, text: str):
+        """
+        边合成边产出 16 位单声道 PCM，只支持本进程中的语音模型。
+        piper 进程的 --output_raw 输出不区分句子边界，无法与常驻进程配合，逐句启动进程又要每次重新加载模型，
+        所以没有 piper 模块时不支持流式合成 (PiperTtsEngine.supports_pcm_stream 为 False)。
+        """
+        if not self.in_process:
+            raise RuntimeError("流式合成需要 piper 的 Python 模块")
+        voice = await self.get(model_path)
+        async for chunk in _stream_voice_pcm(voice, text):
+            yield chunk
+
+    async def synthesize(self, model_path: str, text: str, output_path: str):
+        voice = await self.get(model_path)
+        if isinstance(voice, _PiperProcess):
+            await voice.synthesize(text, output_path)
+        else:
+            await asyncio.get_running_loop().run_in_executor(None, _synthesize_wav, voice, text, output_path)
+
+    async def aclose(self):
+        voices, self._voices = self._voices, {}
+        for voice in voices.values():
+            if isinstance(voice, _PiperProcess):
+                await voice.aclose()
+
 class PiperTtsEngine(TtsEngine):
-    """使用 piper 命令行工具合成语音"""
-    async def synthesize(self, text: str, output_path: str, lang: str = 'zh'):
-        logger.info("🔄 使用 Piper-TTS 进行语音合成...")
-        logger.debug(f"Piper-TTS 参数: lang={lang}, output={output_path}")
-        
-        # --- 自动查找 Piper 可执行文件 ---
+    """
+    使用 Piper 合成语音。
+
+    默认使用常驻的语音模型 (PiperVoicePool)，每个模型只加载一次；
+    resident=False 时保持旧的方式，每句话启动一个 piper 进程 (每次都重新加载模型)。
+    """
+    audio_suffix = '.wav'
+
+    def __init__(self, resident: bool = True, preload: list[str] = ()):
+        """
+        :param resident: 是否常驻语音模型。
+        :param preload: 在 start() 中预先加载的语言 (例如 ['zh'])，首句不必等待加载模型。
+        """
+        # 在 start() 中解析一次，之后的请求直接复用
+        self._executable = None
+        self.resident = resident
+        self.preload = list(preload)
+        self._voices = None
+
+    async def start(self):
+        try:
+            self._executable = self._find_executable()
+        except FileNotFoundError:
+            # 推迟到首次合成时再报错，保持原有的错误路径
+            self._executable = None
+        if not self.resident:
+            return
+        self._voices = PiperVoicePool(lambda: self._executable or self._find_executable())
+        for lang in self.preload:
+            try:
+                await self._voices.get(self._model_path(lang))
+            except Exception as e:
+                logger.warning(f"预加载 Piper 语音模型 ({lang}) 失败: {e}")
+
+    async def aclose(self):
+        if self._voices is not None:
+            await self._voices.aclose()
+            self._voices = None
+
+    @property
+    def supports_pcm_stream(self) -> bool:
+        # 流式合成依赖本进程中的常驻语音模型；只有 piper 可执行文件时改用常驻进程逐句合成到文件
+        return self.resident and self._voice_pool().in_process
+
+    def _voice_pool(self) -> PiperVoicePool:
+        if self._voices is None:
+            # 没有经过 start() (例如在独立的事件循环中使用)
+            self._voices = PiperVoicePool(lambda: self._executable or self._find_executable())
+        return self._voices
+
+    def pcm_sample_rate(self, lang: str = 'zh') -> int:
+        return self._voice_pool().sample_rate(self._model_path(lang))
+
+    async def stream_pcm(self, text: str, lang: str = 'zh'):
+        logger.info("🔄 使用 Piper-TTS 进行流式语音合成...")
+        async for chunk in self._voice_pool().stream(self._model_path(lang), text):
+            yield chunk
+
+    def _find_executable(self) -> str:
+        """自动查找 Piper 可执行文件。"""
         piper_executable = shutil.which('piper')
         logger.debug(f"shutil.which('piper') 结果: {piper_executable}")
         
@@ -98,15 +517,38 @@ class PiperTtsEngine(TtsEngine):
         if not piper_executable:
             logger.error("找不到 'piper' 可执行文件")
             raise FileNotFoundError("找不到 'piper' 可执行文件。请确保 'piper-tts' 已通过 pip 安装。")
+        return piper_executable
+
+    def voice(self, lang: str = 'zh') -> str:
+        """语音模型的文件名。"""
+        return "zh_CN-huayan-medium.onnx" if lang == 'zh' else "en_US-kristin-medium.onnx"
 
-        # --- 模型路径处理 ---
-        model_name = "zh_CN-huayan-medium.onnx" if lang == 'zh' else "en_US-kristin-medium.onnx"
-        model_path = os.path.join(SCRIPT_DIR, "models", model_name)
+    def _model_path(self, lang: str) -> str:
+        """返回指定语言的模型文件路径。"""
+        model_path = os.path.join(SCRIPT_DIR, "models", self.voice(lang))
         logger.debug(f"Piper 模型路径: {model_path}, 存在: {os.path.exists(model_path)}")
 
         if not os.path.exists(model_path):
             logger.error(f"TTS 模型文件未找到: {model_path}")
             raise FileNotFoundError(f"TTS 模型文件未找到: {model_path}")
+        return model_path
+
+    async def synthesize(self, text: str, output_path: str, lang: str = 'zh'):
+        logger.info("🔄 使用 Piper-TTS 进行语音合成...")
+        logger.debug(f"Piper-TTS 参数: lang={lang}, output={output_path}")
+
+        model_path = self._model_path(lang)
+        if self.resident:
+            try:
+                await self._voice_pool().synthesize(model_path, text, output_path)
+            except Exception as e:
+                logger.error(f"Piper-TTS 执行异常: {e}")
+                logger.error(f"异常详情:\n{traceback.format_exc()}")
+                raise
+            logger.info(f"✅ 语音已保存到: {output_path} (大小: {os.path.getsize(output_path)} bytes)")
+            return
+
+        piper_executable = self._executable or self._find_executable()
 
         command = [
             piper_executable,
@@ -173,12 +615,28 @@ def get_tts_engine(config: dict = None) -> TtsEngine:
     logger.info(f"ℹ️ 根据配置加载TTS引擎: {model_type}")
     logger.debug(f"完整配置: {config}")
 
+    # piper_resident: 常驻语音模型 (默认)，而不是每句话启动一个 piper 进程
+    piper_options = {"resident": bool(config.get("piper_resident", True)),
+                     "preload": [config.get("active_piper_model", "zh")]}
     if model_type == "piper":
         logger.debug("创建 PiperTtsEngine 实例")
-        return PiperTtsEngine()
+        return PiperTtsEngine(**piper_options)
     elif model_type == "edge":
-        logger.debug("创建 EdgeTtsEngine 实例")
-        return EdgeTtsEngine()
+        # edge_stream: 边下载边解码播放 (需要 ffmpeg)；edge_endpoint: 离线测试用的替身服务
+        edge_options = {"stream": bool(config.get("edge_stream", True)), "endpoint": config.get("edge_endpoint")}
+        if not config.get("tts_failover", True):
+            logger.debug("创建 EdgeTtsEngine 实例")
+            return EdgeTtsEngine(**edge_options)
+        # 在线失败时快速切换到 Piper：截止时间、对冲和熔断由 TtsRouter 负责，Edge 自身不再重试
+        from tts_router import (CircuitBreaker, TtsRouter, DEFAULT_DEADLINE_S, DEFAULT_HEDGE_AFTER_S,
+                                DEFAULT_FAILURE_THRESHOLD, DEFAULT_RESET_TIMEOUT_S)
+        logger.debug("创建 TtsRouter 实例 (Edge-TTS -> Piper-TTS)")
+        hedge_after_s = config.get("tts_hedge_after_s", DEFAULT_HEDGE_AFTER_S)
+        breaker = CircuitBreaker(int(config.get("tts_breaker_failures", DEFAULT_FAILURE_THRESHOLD)),
+                                 float(config.get("tts_breaker_reset_s", DEFAULT_RESET_TIMEOUT_S)))
+        return TtsRouter(EdgeTtsEngine(retries=1, **edge_options), PiperTtsEngine(**piper_options),
+                         deadline_s=float(config.get("tts_deadline_s", DEFAULT_DEADLINE_S)),
+                         hedge_after_s=None if hedge_after_s is None else float(hedge_after_s), breaker=breaker)
     else:
         logger.warning(f"未知的TTS模型类型 '{model_type}'，将默认使用 Piper-TTS。")
-        return PiperTtsEngine()
+        return PiperTtsEngine(**piper_options)
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+以内容为键的 TTS 音频缓存。
+
+同样的文字会被反复朗读：F1 悬停时的界面标签、F4 截图中反复出现的对话框文字。
+缓存键是 (引擎, 声音, 规范化后的文本, 音频格式) 的摘要，命中时完全跳过合成。
+
+两级存储：内存中按 LRU 在字节预算内保留最近的音频；磁盘层 (diskcache.DiskTier，
+位于 ~/.cache/a.m.d-helper/tts) 原子写入、按 LRU 限制总大小，重启后依然有效。
+命中与未命中计数记录在 metrics 中 (tts_cache_hits / tts_cache_disk_hits / tts_cache_misses)。
+"""
+
+import asyncio
+import hashlib
+import logging
+import threading
+import unicodedata
+from collections import OrderedDict
+
+from metrics import metrics as default_metrics
+from tts import PCM_CHUNK_BYTES, TtsEngine
+
+logger = logging.getLogger("AMD-HELPER")
+
+DEFAULT_MAX_MB = 16
+DEFAULT_DISK_MB = 128
+
+
+def normalize_text(text: str) -> str:
+    """规范化文本：NFKC (全角/半角统一) 并合并空白。不改变大小写，大小写可能影响朗读。"""
+    return " ".join(unicodedata.normalize("NFKC", text).split())
+
+
+def cache_key(engine: str, voice: str, text: str, audio_format: str) -> str:
+    h = hashlib.sha256()
+    for part in (engine, voice, audio_format, normalize_text(text)):
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+class TtsAudioCache:
+    """
+    TTS 音频缓存。
+
+    :param max_bytes: 内存中保留的音频的总字节数上限。
+    :param disk: 可选的 diskcache.DiskTier。
+    :param max_entry_bytes: 单条音频的上限，超过时不缓存。默认为两级中较大容量的 1/8。
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_MB * 1024 * 1024, disk=None, metrics=None,
+                 max_entry_bytes: int = None):
+        self.max_bytes = max_bytes
+        self.disk = disk
+        self.metrics = metrics or default_metrics
+        self.max_entry_bytes = max_entry_bytes or max(max_bytes, disk.max_bytes if disk else 0) // 8
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # 键 -> 音频字节
+        self._bytes = 0
+
+    def get(self, key: str) -> bytes | None:
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+                self._record('tts_cache_hits')
+                return data
+        if self.disk is not None:
+            data = self.disk.get(key)
+            if data:
+                with self._lock:
+                    self._insert_locked(key, data)
+                    self._record('tts_cache_disk_hits')
+                return data
+        with self._lock:
+            self._record('tts_cache_misses')
+        return None
+
+    def put(self, key: str, data: bytes):
+        if not data or len(data) > self.max_entry_bytes:
+            return
+        with self._lock:
+            self._insert_locked(key, data)
+        if self.disk is not None:
+            self.disk.put(key, data)
+
+    def _insert_locked(self, key: str, data: bytes):
+        if len(data) > self.max_bytes:
+            return
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._bytes -= len(old)
+        self._entries[key] = data
+        self._bytes += len(data)
+        while self._bytes > self.max_bytes:
+            _key, evicted = self._entries.popitem(last=False)
+            self._bytes -= len(evicted)
+        self.metrics.set_gauge('tts_cache_entries', len(self._entries))
+        self.metrics.set_gauge('tts_cache_mb', round(self._bytes / (1024 * 1024), 1))
+
+    def _record(self, counter: str):
+        """更新命中计数和命中率。"""
+        self.metrics.incr(counter)
+        hits = self.metrics.counter('tts_cache_hits') + self.metrics.counter('tts_cache_disk_hits')
+        total = hits + self.metrics.counter('tts_cache_misses')
+        self.metrics.set_gauge('tts_cache_hit_rate', round(hits / total, 3) if total else 0.0)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+
+class CachedTtsEngine(TtsEngine):
+    """
+    在 TTS 引擎前加一层音频缓存，其余接口原样转发给被包装的引擎。
+
+    :param engine: 被包装的引擎 (TtsEngine，或有相同 synthesize 接口的对象)。
+    :param cache: TtsAudioCache 实例。
+    """
+
+    def __init__(self, engine, cache: TtsAudioCache):
+        self.engine = engine
+        self.cache = cache
+
+    @property
+    def audio_suffix(self) -> str:
+        return getattr(self.engine, 'audio_suffix', '.mp3')
+
+    @property
+    def supports_pcm_stream(self) -> bool:
+        return getattr(self.engine, 'supports_pcm_stream', False)
+
+    def voice(self, lang: str = 'auto') -> str:
+        voice = getattr(self.engine, 'voice', None)
+        return voice(lang) if voice is not None else lang
+
+    def pcm_sample_rate(self, lang: str = 'auto') -> int:
+        return self.engine.pcm_sample_rate(lang)
+
+    def _key(self, text: str, lang: str, audio_format: str) -> str:
+        return cache_key(type(self.engine).__name__, self.voice(lang), text, audio_format)
+
+    async def start(self):
+        if hasattr(self.engine, 'start'):
+            await self.engine.start()
+
+    async def aclose(self):
+        if hasattr(self.engine, 'aclose'):
+            await self.engine.aclose()
+
+    async def synthesize(self, text: str, output_path: str, lang: str = 'auto'):
+        key = self._key(text, lang, self.audio_suffix)
+        data = await asyncio.to_thread(self.cache.get, key)
+        if data is not None:
+            logger.info(f"✅ 命中 TTS 缓存: {text[:30]}")
+            with open(output_path, "wb") as f:
+                f.write(data)
+            return
+        await self.engine.synthesize(text, output_path, lang=lang)
+        with open(output_path, "rb") as f:
+            data = f.read()
+        await asyncio.to_thread(self.cache.put, key, data)
+
+    async def stream_pcm(self, text: str, lang: str = 'auto'):
+        """命中时按片段产出缓存的 PCM；未命中时转发流式合成，完整结束后写入缓存。"""
+        key = self._key(text, lang, f"pcm-{self.pcm_sample_rate(lang)}")
+        data = await asyncio.to_thread(self.cache.get, key)
+        if data is not None:
+            logger.info(f"✅ 命中 TTS 缓存: {text[:30]}")
+            for offset in range(0, len(data), PCM_CHUNK_BYTES):
+                yield data[offset:offset + PCM_CHUNK_BYTES]
+            return
+        # 超过单条上限后不再收集，保持流式合成的内存占用有界
+        collected = bytearray()
+        async for chunk in self.engine.stream_pcm(text, lang=lang):
+            if collected is not None:
+                collected += chunk
+                if len(collected) > self.cache.max_entry_bytes:
+                    collected = None
+            yield chunk
+        # 中途停止 (生成器被关闭) 时不会执行到这里，不完整的音频不会进入缓存
+        if collected:
+            await asyncio.to_thread(self.cache.put, key, bytes(collected))
+
+
+def wrap_tts_cache(engine, cache: TtsAudioCache) -> TtsEngine:
+    """
+    给引擎加上音频缓存。TtsRouter 的主备引擎分别包装，
+    缓存键中的引擎和声音与实际合成这段音频的引擎一致。
+    """
+    if hasattr(engine, 'map_engines'):
+        return engine.map_engines(lambda inner: CachedTtsEngine(inner, cache))
+    return CachedTtsEngine(engine, cache)
+
+
+def build_tts_cache(config: dict):
+    """
+    根据配置创建 TTS 音频缓存，未启用时返回 None。
+
+    配置项:
+        tts_cache_mb       内存缓存容量 (MB)，0 表示不启用，默认 16
+        tts_cache_disk     是否启用磁盘层，默认 true
+        tts_cache_disk_mb  磁盘层容量 (MB)，默认 128
+    """
+    max_mb = float(config.get("tts_cache_mb", DEFAULT_MAX_MB))
+    if max_mb <= 0:
+        return None
+    disk = None
+    if config.get("tts_cache_disk", True):
+        from diskcache import DiskTier
+        disk = DiskTier("tts", int(float(config.get("tts_cache_disk_mb", DEFAULT_DISK_MB)) * 1024 * 1024))
+    return TtsAudioCache(max_bytes=int(max_mb * 1024 * 1024), disk=disk)
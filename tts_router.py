@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+在线 (Edge TTS) 与离线 (Piper) TTS 引擎之间的快速切换。
+
+网络不稳定时，Edge TTS 自身的重试 (间隔 2 秒、4 秒) 会让用户 6 秒以上听不到任何声音。
+TtsRouter 对每句话采用以下策略：
+
+- 截止时间：主引擎在 deadline_s 内没有产出第一段音频 (流式) 或没有完成合成 (文件，
+  截止时间随文本长度延长)，即视为失败，改用备用引擎。
+- 对冲：主引擎在 hedge_after_s 内没有产出第一段音频时，同时启动备用引擎，
+  先产出音频的一方获胜，另一方被取消。hedge_after_s 为 None 时不对冲。
+- 熔断：主引擎连续失败 failure_threshold 次后熔断，reset_timeout_s 内直接使用备用引擎，
+  之后放行一次试探请求，成功则恢复。
+
+策略可以用 edge_standin.py 的替身服务 (可注入延迟和错误) 离线测试：
+    python3 bench.py --suite tts-failover
+"""
+
+import asyncio
+import logging
+import os
+import tempfile
+import time
+
+from metrics import metrics as default_metrics
+from tts import TtsEngine
+
+logger = logging.getLogger("AMD-HELPER")
+
+DEFAULT_DEADLINE_S = 1.5
+DEFAULT_HEDGE_AFTER_S = 0.6
+DEFAULT_FAILURE_THRESHOLD = 3
+DEFAULT_RESET_TIMEOUT_S = 30.0
+# 文件合成要等整句下载完，截止时间和对冲时间按这个倍数放宽，
+# 再按文本长度每个字符延长 FILE_SECONDS_PER_CHAR 秒 (长句在正常网络下也需要更久才能下载完)
+FILE_DEADLINE_FACTOR = 2.0
+FILE_SECONDS_PER_CHAR = 0.05
+
+
+class PcmResampler:
+    """
+    16 位单声道 PCM 的流式线性插值重采样。
+
+    片段之间保留插值位置的小数部分和上一个样本，逐片段重采样的结果与整段一次重采样一致，
+    片段边界处没有相位跳变。
+    """
+
+    def __init__(self, from_rate: int, to_rate: int):
+        self.step = from_rate / to_rate
+        self._position = 0.0  # 下一个输出样本在输入中的位置 (以 _last 为 0)
+        self._last = None  # 上一个片段的最后一个样本
+
+    def feed(self, data: bytes) -> bytes:
+        import numpy as np
+        samples = np.frombuffer(data, dtype=np.int16)
+        if self._last is not None:
+            samples = np.concatenate((self._last, samples))
+        if len(samples) < 2:
+            self._last = samples if len(samples) else self._last
+            return b""
+        end = len(samples) - 1
+        count = int((end - self._position) // self.step) + 1 if self._position <= end else 0
+        positions = self._position + np.arange(count) * self.step
+        output = np.interp(positions, np.arange(len(samples)), samples)
+        self._position += count * self.step - end
+        self._last = samples[-1:]
+        return np.rint(output).astype(np.int16).tobytes()
+
+
+class CircuitBreaker:
+    """
+    主引擎的熔断器。
+
+    :param failure_threshold: 连续失败多少次后熔断。
+    :param reset_timeout_s: 熔断后多久放行一次试探请求。
+    """
+
+    def __init__(self, failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+                 reset_timeout_s: float = DEFAULT_RESET_TIMEOUT_S, metrics=None):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout_s = reset_timeout_s
+        self.metrics = metrics or default_metrics
+        self.failures = 0
+        self.opened_at = None
+
+    @property
+    def is_open(self) -> bool:
+        return self.opened_at is not None
+
+    def allow(self) -> bool:
+        """是否尝试主引擎。熔断超过 reset_timeout_s 后放行 (成功则恢复，失败则重新计时)。"""
+        if self.opened_at is None:
+            return True
+        if time.monotonic() - self.opened_at >= self.reset_timeout_s:
+            self.opened_at = time.monotonic()
+            logger.info("🔌 试探在线 TTS 是否恢复...")
+            return True
+        return False
+
+    def record_success(self):
+        if self.opened_at is not None:
+            logger.info("✅ 在线 TTS 已恢复")
+        self.failures = 0
+        self.opened_at = None
+        self.metrics.set_gauge('tts_breaker_open', 0)
+
+    def record_failure(self):
+        self.failures += 1
+        if self.failures >= self.failure_threshold:
+            if self.opened_at is None:
+                logger.warning(f"⚠️ 在线 TTS 连续失败 {self.failures} 次，{self.reset_timeout_s:.0f} 秒内改用离线 TTS")
+                self.metrics.incr('tts_breaker_trips')
+            self.opened_at = time.monotonic()
+            self.metrics.set_gauge('tts_breaker_open', 1)
+
+
+async def _settle(task):
+    """取消一个任务并等待它结束 (忽略其结果和异常)。"""
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+
+
+class TtsRouter(TtsEngine):
+    """
+    主备 TTS 引擎的路由。
+
+    :param primary: 主引擎 (通常是 EdgeTtsEngine，应关闭其自身的重试)。
+    :param fallback: 备用引擎 (通常是 PiperTtsEngine)。
+    :param deadline_s: 主引擎产出第一段音频的截止时间。
+    :param hedge_after_s: 多久没有音频时同时启动备用引擎，None 表示不对冲。
+    :param breaker: CircuitBreaker，默认新建。
+    """
+
+    def __init__(self, primary, fallback, deadline_s: float = DEFAULT_DEADLINE_S,
+                 hedge_after_s: float | None = DEFAULT_HEDGE_AFTER_S, breaker: CircuitBreaker = None, metrics=None):
+        self.primary = primary
+        self.fallback = fallback
+        self.deadline_s = deadline_s
+        self.hedge_after_s = hedge_after_s
+        self.metrics = metrics or default_metrics
+        self.breaker = breaker or CircuitBreaker(metrics=self.metrics)
+
+    def map_engines(self, wrap) -> "TtsRouter":
+        """返回主备引擎分别经过 wrap 包装 (例如加上音频缓存) 的路由，共享同一个熔断器。"""
+        return TtsRouter(wrap(self.primary), wrap(self.fallback), self.deadline_s, self.hedge_after_s,
+                         self.breaker, self.metrics)
+
+    @property
+    def audio_suffix(self) -> str:
+        # 备用引擎的音频也写入这个后缀的文件；pygame (SDL_mixer) 按文件内容识别格式
+        return self.primary.audio_suffix
+
+    @property
+    def supports_pcm_stream(self) -> bool:
+        return (getattr(self.primary, 'supports_pcm_stream', False)
+                and getattr(self.fallback, 'supports_pcm_stream', False))
+
+    def pcm_sample_rate(self, lang: str = 'auto') -> int:
+        # 备用引擎的 PCM 重采样到主引擎的采样率，播放中途不必切换格式
+        return self.primary.pcm_sample_rate(lang)
+
+    def voice(self, lang: str = 'auto') -> str:
+        return self.primary.voice(lang)
+
+    async def start(self):
+        await self.primary.start()
+        await self.fallback.start()
+
+    async def aclose(self):
+        await self.primary.aclose()
+        await self.fallback.aclose()
+
+    def _primary_failed(self, error: BaseException):
+        logger.warning(f"在线 TTS 失败，改用离线 TTS: {error!r}")
+        self.metrics.incr('tts_router_primary_failures')
+        self.breaker.record_failure()
+
+    async def _race(self, primary, fallback, deadline_s: float, hedge_after_s: float | None):
+        """
+        按截止时间和对冲策略在主备引擎之间竞争。
+
+        :param primary: 无参数函数，返回主引擎要等待的对象 (整句合成，或流式合成的第一个片段)。
+        :param fallback: 同上，备用引擎。
+        :param deadline_s: 主引擎的截止时间。
+        :param hedge_after_s: 启动备用引擎的时间，None 表示不对冲。
+        :return: (获胜的一方 'primary' / 'fallback', 结果)。
+        """
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        primary_task = asyncio.ensure_future(primary())
+        fallback_task = None
+        fallback_started = False
+        errors = []
+        try:
+            while primary_task is not None or fallback_task is not None:
+                elapsed = loop.time() - start
+                waits = []
+                if primary_task is not None:
+                    waits.append(deadline_s - elapsed)
+                    if not fallback_started and hedge_after_s is not None:
+                        waits.append(hedge_after_s - elapsed)
+                pending = {task for task in (primary_task, fallback_task) if task is not None}
+                done, _ = await asyncio.wait(pending, timeout=max(0.0, min(waits)) if waits else None,
+                                             return_when=asyncio.FIRST_COMPLETED)
+                if primary_task in done:
+                    task, primary_task = primary_task, None
+                    try:
+                        result = task.result()
+                    except Exception as e:
+                        # StopAsyncIteration: 流式合成没有产出任何音频，同样视为失败
+                        self._primary_failed(e)
+                        errors.append(e)
+                    else:
+                        self.breaker.record_success()
+                        self.metrics.incr('tts_router_primary_wins')
+                        return 'primary', result
+                if fallback_task in done:
+                    task, fallback_task = fallback_task, None
+                    try:
+                        result = task.result()
+                    except Exception as e:
+                        logger.warning(f"离线 TTS 失败: {e!r}")
+                        errors.append(e)
+                    else:
+                        self.metrics.incr('tts_router_fallback_wins')
+                        return 'fallback', result
+                elapsed = loop.time() - start
+                if primary_task is not None and elapsed >= deadline_s:
+                    await _settle(primary_task)
+                    primary_task = None
+                    self.metrics.incr('tts_router_deadline_exceeded')
+                    self._primary_failed(TimeoutError(f"{deadline_s:.1f} 秒内没有音频"))
+                hedge = primary_task is not None and hedge_after_s is not None and elapsed >= hedge_after_s
+                if not fallback_started and (primary_task is None or hedge):
+                    if primary_task is not None:
+                        logger.info(f"⏱️ 在线 TTS {elapsed:.2f}s 内没有音频，同时启动离线 TTS")
+                        self.metrics.incr('tts_router_hedged')
+                    fallback_task = asyncio.ensure_future(fallback())
+                    fallback_started = True
+            raise RuntimeError(f"在线和离线 TTS 均失败: {errors}")
+        finally:
+            for task in (primary_task, fallback_task):
+                if task is not None:
+                    await _settle(task)
+
+    async def synthesize(self, text: str, output_path: str, lang: str = 'auto'):
+        if not self.breaker.allow():
+            self.metrics.incr('tts_router_bypassed')
+            await self.fallback.synthesize(text, output_path, lang=lang)
+            return
+        # 备用引擎写入单独的文件，获胜后再替换，避免与被取消的主引擎写同一个文件
+        fd, fallback_path = tempfile.mkstemp(suffix=self.fallback.audio_suffix)
+        os.close(fd)
+        try:
+            extra = len(text) * FILE_SECONDS_PER_CHAR
+            winner, _ = await self._race(lambda: self.primary.synthesize(text, output_path, lang=lang),
+                                         lambda: self.fallback.synthesize(text, fallback_path, lang=lang),
+                                         self.deadline_s * FILE_DEADLINE_FACTOR + extra,
+                                         None if self.hedge_after_s is None
+                                         else self.hedge_after_s * FILE_DEADLINE_FACTOR + extra)
+            if winner == 'fallback':
+                os.replace(fallback_path, output_path)
+        finally:
+            if os.path.exists(fallback_path):
+                os.remove(fallback_path)
+
+    async def _stream(self, engine, text: str, lang: str, sample_rate: int):
+        """引擎的流式合成，按需重采样到 sample_rate。"""
+        source_rate = engine.pcm_sample_rate(lang)
+        resampler = PcmResampler(source_rate, sample_rate)
+        carry = b""
+        async for chunk in engine.stream_pcm(text, lang=lang):
+            if source_rate == sample_rate:
+                yield chunk
+                continue
+            data = carry + chunk
+            even = len(data) - len(data) % 2
+            carry = data[even:]
+            if even:
+                output = resampler.feed(data[:even])
+                if output:
+                    yield output
+
+    async def stream_pcm(self, text: str, lang: str = 'auto'):
+        sample_rate = self.pcm_sample_rate(lang)
+        if not self.breaker.allow():
+            self.metrics.incr('tts_router_bypassed')
+            async for chunk in self._stream(self.fallback, text, lang, sample_rate):
+                yield chunk
+            return
+        streams = {'primary': self._stream(self.primary, text, lang, sample_rate),
+                   'fallback': self._stream(self.fallback, text, lang, sample_rate)}
+        try:
+            winner, first = await self._race(lambda: anext(streams['primary']),
+                                             lambda: anext(streams['fallback']), self.deadline_s, self.hedge_after_s)
+            yield first
+            try:
+                async for chunk in streams[winner]:
+                    yield chunk
+            except Exception:
+                # 已经开始播放，无法无缝切换到备用引擎，只记录失败
+                if winner == 'primary':
+                    self.breaker.record_failure()
+                raise
+        finally:
+            for stream in streams.values():
+                await stream.aclose()